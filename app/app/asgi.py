@@ -7,10 +7,62 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from core.executors import database_sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
+ASGI_URLCONF = "app.asgi_urls"
+
+
+class AsyncReadASGIHandler(ASGIHandler):
+    """ASGI handler routing requests through ``app.asgi_urls``
+
+    Django 3.2 iterates streamed responses on the event loop, where content
+    generators running ORM queries, such as the recipe export, raise
+    ``SynchronousOnlyOperation``. Here the body is iterated by one thread of
+    the ``database`` pool instead, so a server-side cursor stays on the
+    connection that opened it, and every part is sent from the event loop.
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+
+        return request, error_response
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        # Django sends the start message, an empty body and the closing
+        # message. The real body goes out in between.
+        parts = iter(response)
+        response.streaming_content = ()
+        loop = asyncio.get_running_loop()
+
+        def send_parts():
+            for part in parts:
+                for chunk, _ in self.chunk_bytes(part):
+                    message = {"type": "http.response.body", "body": chunk, "more_body": True}
+                    asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        async def send_with_parts(message):
+            if message["type"] == "http.response.body":
+                await database_sync_to_async(send_parts)
+            await send(message)
+
+        await super().send_response(response, send_with_parts)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return AsyncReadASGIHandler()
+
+
 application = get_asgi_application()
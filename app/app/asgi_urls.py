@@ -0,0 +1,16 @@
+"""app URL Configuration for ASGI requests
+
+Same routes as ``app.urls`` with recipe and tag reads and the recipe export
+served by async views, see ``recipe.async_views``.
+"""
+from app.urls import urlpatterns as sync_urlpatterns
+from django.urls import include, path
+
+urlpatterns = [
+    path("api/recipes/", include("recipe.asgi_urls")),
+    *[
+        pattern
+        for pattern in sync_urlpatterns
+        if getattr(pattern, "namespace", None) != "recipes"
+    ],
+]
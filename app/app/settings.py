@@ -47,11 +47,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.timing.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.db.replicas.ReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,12 +84,60 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Per worker connection pool, see core.db.pool
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_SIZE", 10)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+            "CHECK_INTERVAL": float(os.environ.get("DB_POOL_CHECK_INTERVAL", 30)),
+            "STATS_INTERVAL": float(os.environ.get("DB_POOL_STATS_INTERVAL", 300)),
+        },
+    }
+}
+
+# Read replicas, one per comma separated host in DB_REPLICA_HOSTS, see
+# core.db.replicas. Tests read them from the default database.
+
+for number, host in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["core.db.replicas.ReplicaRouter"]
+
+DATABASE_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_SECONDS": float(os.environ.get("DB_REPLICA_STICKY_SECONDS", 10)),
+    "MAX_LAG_SECONDS": float(os.environ.get("DB_REPLICA_MAX_LAG", 5)),
+    "CHECK_INTERVAL": float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5)),
+    # Shared by all workers, so stickiness holds whichever serves the reads
+    "CACHE_ALIAS": os.environ.get("DB_REPLICA_CACHE_ALIAS", "shared"),
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/ref/settings/#caches
+# "default" is local to each worker, "shared" is seen by all of them. It is a
+# table of the primary database (python manage.py createcachetable) unless
+# SHARED_CACHE_BACKEND and SHARED_CACHE_LOCATION point at e.g. memcached.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": os.environ.get(
+            "SHARED_CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"
+        ),
+        "LOCATION": os.environ.get("SHARED_CACHE_LOCATION", "shared_cache"),
+    },
 }
 
 
@@ -110,6 +160,19 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing, PASSWORD_HASH_ITERATIONS sets the cost of new and
+# re-hashed passwords, see core.hashers
+
+PASSWORD_HASHERS = [
+    "core.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", 260000))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -138,4 +201,68 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.User"
 
 
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"}
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson based JSON handling, falling back to the stdlib without orjson
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+
+# Token authentication cache, see user.authentication.CachedTokenAuthentication
+# CACHE_ALIAS adds a shared layer in that Django cache, leave empty to disable it
+# LOCAL_TTL bounds how long other workers accept deleted tokens and inactive users
+
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 10000)),
+    "TTL": int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 300)),
+    "LOCAL_TTL": int(os.environ.get("TOKEN_AUTH_CACHE_LOCAL_TTL", 5)),
+    "CACHE_ALIAS": os.environ.get("TOKEN_AUTH_CACHE_ALIAS", ""),
+}
+
+
+# Opt-in cache of rendered recipe and tag reads, see recipe.caching
+# Entries are keyed by database versions, a cache local to each worker is safe
+
+RESPONSE_CACHE = {
+    "ENABLED": os.environ.get("RESPONSE_CACHE_ENABLED", "0") == "1",
+    "CACHE_ALIAS": os.environ.get("RESPONSE_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 3600)),
+}
+
+
+# Thread pools for blocking work, see core.executors
+
+EXECUTORS = {
+    "database": {"MAX_WORKERS": int(os.environ.get("DB_EXECUTOR_WORKERS", 8))},
+    "password": {"MAX_WORKERS": int(os.environ.get("PASSWORD_HASH_WORKERS", 2))},
+}
+
+
+# Sampled per-request SQL, serializer and render timings, see core.timing
+# SAMPLE_RATE is the share of requests measured, 0 turns measuring off
+
+REQUEST_TIMING = {
+    "SAMPLE_RATE": float(os.environ.get("REQUEST_TIMING_SAMPLE_RATE", 0)),
+    "HEADER": os.environ.get("REQUEST_TIMING_HEADER", "1") == "1",
+    "SLOW_REQUEST_MS": float(os.environ.get("SLOW_REQUEST_MS", 500)),
+    "SLOW_QUERY_MS": float(os.environ.get("SLOW_QUERY_MS", 100)),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.timing": {"handlers": ["console"], "level": "INFO"},
+        "core.db.replicas": {"handlers": ["console"], "level": "WARNING"},
+        "core.db.pool": {"handlers": ["console"], "level": "INFO"},
+    },
+}
@@ -1,14 +1,168 @@
+import json
+
 from core import models
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import ManyToManyRawIdWidget
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as translate
 
+CURSOR_VAR = "after"
+
+
+def get_planner_estimate(queryset):
+    """Return the row estimate of the query planner, None if there is none"""
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting rows exactly only up to ``exact_count_limit``
+
+    Bigger results report the planner's estimate on PostgreSQL, or the limit
+    elsewhere, and set ``estimated``. The count query never reads more than
+    ``exact_count_limit + 1`` rows.
+    """
+
+    exact_count_limit = 10000
+    estimated = False
+
+    @cached_property
+    def count(self):
+        count = self.object_list.order_by()[:self.exact_count_limit + 1].count()
+        if count <= self.exact_count_limit:
+            return count
+
+        self.estimated = True
+        return max(get_planner_estimate(self.object_list) or 0, self.exact_count_limit)
+
+
+class KeysetChangeList(ChangeList):
+    """Change list paged by ``?after=<value>`` of the keyset field, not OFFSET
+
+    Each page is one indexed range scan whatever its depth, so there are
+    next and first page links instead of page numbers. Search results ranked
+    by relevance (a ``rank`` annotation) keep their order and show the best
+    matches on one page, without a cursor.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+        # Filter, search and sort links start over from the first page
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+
+        return params
+
+    @staticmethod
+    def is_ranked(queryset) -> bool:
+        return "rank" in queryset.query.annotations
+
+    def get_ordering(self, request, queryset):
+        if self.is_ranked(queryset):
+            return ["-rank", "-pk"]
+
+        return super().get_ordering(request, queryset)
+
+    def get_results(self, request):
+        ordering = self.model_admin.keyset_ordering
+        field = ordering.lstrip("-")
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+        ranked = self.is_ranked(self.queryset)
+        queryset = self.queryset if ranked else self.queryset.order_by(ordering)
+        if self.cursor is not None and not ranked:
+            lookup = "lt" if ordering.startswith("-") else "gt"
+            try:
+                queryset = queryset.filter(**{f"{field}__{lookup}": self.cursor})
+            except (ValueError, ValidationError):
+                raise IncorrectLookupParameters
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page and not ranked
+        rows = rows[:self.list_per_page]
+
+        self.result_count = paginator.count
+        self.result_count_estimated = paginator.estimated
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or (self.cursor is not None and not ranked)
+        self.paginator = paginator
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR])
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: getattr(rows[-1], field)}) if has_next else None
+        )
+
+
+class ScalableAdminMixin:
+    """Admin whose change list cost doesn't grow with the table
+
+    Rows are ordered and paged by the indexed ``keyset_ordering`` only and
+    counts are bounded, see ``EstimatedCountPaginator``. Columns can't be
+    sorted, since any other order would need OFFSET paging.
+    """
 
-class UserAdmin(BaseUserAdmin):
+    keyset_ordering = "-pk"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    sortable_by = ()
+
+    def get_ordering(self, request):
+        return [self.keyset_ordering]
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class PrefixSearchMixin:
+    """Search for values starting with the term through ``search_lookup``
+
+    An ``istartswith`` lookup is ``UPPER(column) LIKE 'TERM%'``, served on
+    PostgreSQL by an ``UPPER(column) text_pattern_ops`` index, unlike the
+    default ``LIKE '%term%'`` which scans the table.
+    """
+
+    search_lookup = None
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        return queryset.filter(**{self.search_lookup: search_term}), False
+
+
+class UserAdmin(ScalableAdminMixin, PrefixSearchMixin, BaseUserAdmin):
     """Class to customize admin panel for user entities"""
 
     ordering = ["email"]
+    keyset_ordering = "email"
     list_display = ["email", "name", "id"]
+    search_fields = ["email"]
+    search_lookup = "email__istartswith"
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         (
@@ -38,6 +192,65 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class RecipeAdminForm(forms.ModelForm):
+    def clean(self):
+        """Reject tags of other users than the recipe's"""
+
+        cleaned_data = super().clean()
+        user = cleaned_data.get("user")
+        tags = cleaned_data.get("tags")
+        if user is not None and tags is not None and tags.exclude(user=user).exists():
+            self.add_error("tags", translate("Tags must belong to the recipe's user"))
+
+        return cleaned_data
+
+
+class RecipeAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Recipes with their user joined and tags picked by id"""
+
+    form = RecipeAdminForm
+    list_display = ["title", "user", "price", "time_minutes", "id"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    search_fields = ["title", "description"]
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        """Offer the tags, whose links have their own model, as raw ids
+
+        The form sets them with ``recipe.tags.set()``, so the link signals
+        keep usage counts and collection versions current.
+        """
+
+        if db_field.name == "tags":
+            kwargs["widget"] = ManyToManyRawIdWidget(
+                db_field.remote_field, self.admin_site, using=kwargs.get("using")
+            )
+            kwargs["required"] = False
+            return db_field.formfield(**kwargs)
+
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search with ``Recipe.objects.search``, best matches first on PostgreSQL"""
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        return queryset.search(search_term), False
+
+
+class TagAdmin(ScalableAdminMixin, PrefixSearchMixin, admin.ModelAdmin):
+    """Tags with their user joined"""
+
+    list_display = ["name", "user", "usage_count", "id"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    readonly_fields = ["usage_count"]
+    search_fields = ["name"]
+    search_lookup = "name__istartswith"
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, TagAdmin)
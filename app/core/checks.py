@@ -0,0 +1,35 @@
+"""System checks of the settings features depend on"""
+
+from core.db.replicas import get_replica_settings
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose entries no other worker process sees
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared_cache(alias) -> bool:
+    """Return whether the cache ``alias`` is configured and seen by all workers"""
+
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    return backend is not None and backend not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_replica_cache(app_configs, **kwargs):
+    config = get_replica_settings()
+    if not config["ALIASES"] or is_shared_cache(config["CACHE_ALIAS"]):
+        return []
+
+    return [
+        Error(
+            f"DATABASE_REPLICAS['CACHE_ALIAS'] {config['CACHE_ALIAS']!r} is not a cache "
+            "shared by all workers.",
+            hint="Writers would read stale replicas on the other workers. Point it at "
+            "a database, memcached or other shared cache in CACHES.",
+            id="core.E001",
+        )
+    ]
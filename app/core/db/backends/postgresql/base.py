@@ -0,0 +1,43 @@
+"""PostgreSQL backend drawing connections from a ``core.db.pool`` pool"""
+
+from core.db.pool import PooledDatabaseCreationMixin, PooledDatabaseWrapperMixin
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+
+class DatabaseCreation(PooledDatabaseCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def check_pooled_connection(self, connection) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+
+    def reset_pooled_connection(self, connection) -> bool:
+        """Roll back and ``DISCARD ALL`` session state of the last checkout
+
+        Django sets the time zone again on the next checkout. DISCARD ALL
+        can't run in a transaction, so it runs in autocommit mode.
+        """
+
+        if connection.closed:
+            return False
+
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DISCARD ALL")
+        finally:
+            connection.autocommit = autocommit
+        return True
@@ -0,0 +1,21 @@
+"""SQLite backend drawing connections from a ``core.db.pool`` pool"""
+
+from core.db.pool import PooledDatabaseCreationMixin, PooledDatabaseWrapperMixin
+from django.db.backends.sqlite3 import base, creation
+
+
+class DatabaseCreation(PooledDatabaseCreationMixin, creation.DatabaseCreation):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def check_pooled_connection(self, connection) -> bool:
+        connection.execute("SELECT 1")
+        return True
+
+    def reset_pooled_connection(self, connection) -> bool:
+        if connection.in_transaction:
+            connection.rollback()
+        return True
@@ -0,0 +1,414 @@
+"""Process wide pools of raw database connections
+
+Django opens a connection per thread on first use and closes it at the end
+of every request (``CONN_MAX_AGE = 0``). The backends in
+``core.db.backends`` hand those open/close calls to a ``ConnectionPool``
+instead, so a worker keeps at most ``MAX_SIZE`` live connections per alias
+and requests mostly skip connection setup. Connections of threads that
+exited without closing them are reclaimed when the pool runs out.
+
+Released connections are reset before the next checkout. On PostgreSQL that
+is ``DISCARD ALL``, which drops session settings, temporary tables, advisory
+locks and prepared statements. SQLite connections are only rolled back, so
+temporary tables and ``PRAGMA`` changes carry over to the next checkout.
+
+Pools are configured with a ``POOL`` entry in the database settings::
+
+    "POOL": {
+        "MAX_SIZE": 10,  # 0 disables pooling
+        "TIMEOUT": 5,  # seconds to wait for a free connection
+        "MAX_LIFETIME": 1800,  # seconds before a connection is replaced
+        "CHECK_INTERVAL": 30,  # idle seconds before a checkout is pinged
+        "STATS_INTERVAL": 300,  # seconds between stats logs, 0 disables them
+    }
+
+Every pool logs its ``stats()`` to the ``core.db.pool`` logger at most once
+per ``STATS_INTERVAL`` and with every checkout that times out.
+"""
+
+import logging
+import threading
+import time
+import weakref
+
+from django.core.signals import setting_changed
+from django.db.utils import OperationalError
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 0,
+    "TIMEOUT": 5,
+    "MAX_LIFETIME": 1800,
+    "CHECK_INTERVAL": 30,
+    "STATS_INTERVAL": 300,
+}
+
+# Longest wait between looks for connections of exited threads
+RECLAIM_INTERVAL = 0.1
+
+
+class PoolTimeout(OperationalError):
+    """No connection was released within the pool timeout"""
+
+
+class PooledConnection:
+    __slots__ = ("connection", "created_at", "released_at", "owner")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+        self.owner = None
+
+    def is_orphaned(self) -> bool:
+        """Return whether the thread that checked the connection out exited"""
+
+        owner = self.owner()
+        return owner is None or not owner.is_alive()
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of raw connections
+
+    ``check(connection)`` pings a connection that sat idle for longer than
+    ``check_interval`` before it is handed out, ``reset(connection)`` cleans
+    one up when it is returned. Either returns False to have the connection
+    closed and replaced. Checkouts remember their thread, a full pool closes
+    the connections of exited threads to make room. ``stats()`` is logged
+    under ``name`` every ``stats_interval`` seconds, never if it is 0.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        timeout: float,
+        max_lifetime: float,
+        check_interval: float,
+        check,
+        reset,
+        name: str = "",
+        stats_interval: float = 0,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.check = check
+        self.reset = reset
+        self.name = name
+        self.stats_interval = stats_interval
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._checked_out = {}
+        self._size = 0
+        self._closed = False
+        self._counters = dict.fromkeys(
+            (
+                "checkouts",
+                "waits",
+                "timeouts",
+                "created",
+                "discarded",
+                "reclaimed",
+                "peak_in_use",
+            ),
+            0,
+        )
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._stats_logged_at = time.monotonic()
+
+    def acquire(self, connect):
+        """Check out a connection, opening one with ``connect()`` if needed"""
+
+        started = time.monotonic()
+        waited = False
+        orphans = []
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise OperationalError("Connection pool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                orphans = self._take_orphans()
+                if orphans:
+                    # The slots are handed over, the first to this checkout
+                    self._size -= len(orphans) - 1
+                    self._condition.notify(len(orphans) - 1)
+                    entry = None
+                    break
+
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    logger.warning(
+                        "Connection pool %s timed out after %ss: %s",
+                        self.name,
+                        self.timeout,
+                        self.stats(),
+                    )
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout}s"
+                    )
+                waited = True
+                # Exiting threads don't notify, so look for orphans regularly
+                self._condition.wait(min(remaining, RECLAIM_INTERVAL))
+
+            self._record_checkout(time.monotonic() - started, waited)
+
+        for orphan in orphans:
+            self._close(orphan.connection)
+
+        if entry is not None and not self._is_healthy(entry):
+            self._close(entry.connection)
+            with self._condition:
+                self._counters["discarded"] += 1
+            entry = None
+
+        if entry is None:
+            try:
+                entry = PooledConnection(connect())
+            except BaseException:
+                with self._condition:
+                    self._size -= 1
+                    self._in_use_changed(-1)
+                raise
+            with self._condition:
+                self._counters["created"] += 1
+
+        entry.owner = weakref.ref(threading.current_thread())
+        with self._condition:
+            self._checked_out[id(entry.connection)] = entry
+
+        return entry.connection
+
+    def release(self, connection, discard: bool = False):
+        """Return a checked out connection, closing it if it is unusable"""
+
+        with self._condition:
+            entry = self._checked_out.pop(id(connection), None)
+        if entry is None:
+            self._close(connection)
+            return
+
+        now = time.monotonic()
+        keep = (
+            not discard
+            and not self._closed
+            and now - entry.created_at < self.max_lifetime
+            and self._call(self.reset, connection)
+        )
+        if not keep:
+            self._close(connection)
+
+        with self._condition:
+            if keep:
+                entry.released_at = now
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                self._counters["discarded"] += 1
+            self._in_use_changed(-1)
+            log_stats = (
+                self.stats_interval > 0
+                and now - self._stats_logged_at >= self.stats_interval
+            )
+            if log_stats:
+                self._stats_logged_at = now
+
+        if log_stats:
+            logger.info("Connection pool %s: %s", self.name, self.stats())
+
+    def close(self):
+        """Close idle and orphaned connections, others are closed on release"""
+
+        with self._condition:
+            self._closed = True
+            closing, self._idle = self._take_orphans() + self._idle, []
+            self._size -= len(closing)
+            self._condition.notify_all()
+
+        for entry in closing:
+            self._close(entry.connection)
+
+    def stats(self) -> dict:
+        """Snapshot of pool size, checkout wait time and saturation counters"""
+
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                **self._counters,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+            }
+
+    def _take_orphans(self) -> list:
+        """Forget the checkouts of exited threads and return them"""
+
+        orphans = [entry for entry in self._checked_out.values() if entry.is_orphaned()]
+        for entry in orphans:
+            del self._checked_out[id(entry.connection)]
+        self._counters["reclaimed"] += len(orphans)
+
+        return orphans
+
+    def _record_checkout(self, wait_time: float, waited: bool):
+        self._counters["checkouts"] += 1
+        self._counters["waits"] += waited
+        self._wait_time_total += wait_time
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+        self._in_use_changed(1)
+
+    def _in_use_changed(self, delta: int):
+        in_use = self._size - len(self._idle)
+        self._counters["peak_in_use"] = max(self._counters["peak_in_use"], in_use)
+        if delta < 0:
+            self._condition.notify()
+
+    def _is_healthy(self, entry: PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - entry.created_at >= self.max_lifetime:
+            return False
+        if now - entry.released_at < self.check_interval:
+            return True
+
+        return self._call(self.check, entry.connection)
+
+    @staticmethod
+    def _call(func, connection) -> bool:
+        try:
+            return bool(func(connection))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool_stats() -> dict:
+    """Return ``ConnectionPool.stats()`` of every pool in this process by alias"""
+
+    with _pools_lock:
+        pools = dict(_pools)
+
+    return {alias: pool.stats() for alias, (_, pool) in pools.items()}
+
+
+def close_pools(aliases=None):
+    """Close the pools of ``aliases``, of all aliases by default"""
+
+    with _pools_lock:
+        if aliases is None:
+            aliases = list(_pools)
+        pools = [_pools.pop(alias) for alias in aliases if alias in _pools]
+
+    for _, pool in pools:
+        pool.close()
+
+
+@receiver(setting_changed)
+def reset_pools(setting, **kwargs):
+    if setting == "DATABASES":
+        close_pools()
+
+
+class PooledDatabaseWrapperMixin:
+    """Route a backend's connection open/close through a ``ConnectionPool``
+
+    Backends implement ``check_pooled_connection`` and
+    ``reset_pooled_connection`` for their driver. The reset has to leave no
+    session state behind for the next checkout.
+    """
+
+    _pool = None
+
+    def get_pool(self, conn_params):
+        """Return the pool of this alias, or None when pooling is disabled
+
+        Pools are replaced when the connection parameters change, e.g. when
+        the test runner switches an alias to the test database.
+        """
+
+        config = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+        if config["MAX_SIZE"] <= 0:
+            return None
+
+        key = (conn_params, config)
+        with _pools_lock:
+            current_key, pool = _pools.get(self.alias, (None, None))
+            if current_key != key:
+                stale, pool = pool, ConnectionPool(
+                    max_size=config["MAX_SIZE"],
+                    timeout=config["TIMEOUT"],
+                    max_lifetime=config["MAX_LIFETIME"],
+                    check_interval=config["CHECK_INTERVAL"],
+                    check=self.check_pooled_connection,
+                    reset=self.reset_pooled_connection,
+                    name=self.alias,
+                    stats_interval=config["STATS_INTERVAL"],
+                )
+                _pools[self.alias] = (key, pool)
+                if stale is not None:
+                    stale.close()
+
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self._pool = self.get_pool(conn_params)
+        if self._pool is None:
+            return super().get_new_connection(conn_params)
+
+        return self._pool.acquire(lambda: self._connect_pooled(conn_params))
+
+    def _connect_pooled(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self._pool is None:
+            return super()._close()
+
+        # Django keeps referencing a connection closed inside atomic(), so
+        # it must not be handed to anybody else
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.release(self.connection, discard=self.in_atomic_block)
+
+    def check_pooled_connection(self, connection) -> bool:
+        raise NotImplementedError
+
+    def reset_pooled_connection(self, connection) -> bool:
+        raise NotImplementedError
+
+
+class PooledDatabaseCreationMixin:
+    """Close the pool of an alias before its test database is created or dropped
+
+    Connections released to the pool stay open, and databases with open
+    connections can't be dropped.
+    """
+
+    def _create_test_db(self, *args, **kwargs):
+        close_pools([self.connection.alias])
+        return super()._create_test_db(*args, **kwargs)
+
+    def _destroy_test_db(self, *args, **kwargs):
+        close_pools([self.connection.alias])
+        return super()._destroy_test_db(*args, **kwargs)
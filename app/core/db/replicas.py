@@ -0,0 +1,263 @@
+"""Routing of safe API reads to read replicas
+
+``ReplicaMiddleware`` gives every request its own routing state.
+``ReplicaReadsMixin`` views pick a replica there once a safe request is
+authenticated, and ``ReplicaRouter`` sends the ORM reads that follow to it.
+Everything else, authentication included, uses the primary. Replicas are
+configured with ``DATABASE_REPLICAS``::
+
+    DATABASE_REPLICAS = {
+        "ALIASES": ["replica_0"],  # database aliases of the replicas
+        "STICKY_SECONDS": 10,  # reads of a user stay on the primary after writes
+        "MAX_LAG_SECONDS": 5,  # replicas further behind are skipped
+        "CHECK_INTERVAL": 5,  # seconds a replica's health is trusted
+        "CACHE_ALIAS": "shared",  # cache shared by workers for stickiness
+    }
+
+A replica that can't be connected to, or lags behind, is skipped until its
+next check. Without a usable replica reads stay on the primary. Replicas
+are never migrated, they get their tables from the primary.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from core.executors import database_sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DEFAULTS = {
+    "ALIASES": [],
+    "STICKY_SECONDS": 10,
+    "MAX_LAG_SECONDS": 5,
+    "CHECK_INTERVAL": 5,
+    "CACHE_ALIAS": "shared",
+}
+
+# Seconds since the last replayed transaction, 0 when everything received
+# is replayed, as an idle primary sends nothing to replay
+POSTGRESQL_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class ReadRouting:
+    """Routing state of one request, ``alias`` is None for the primary"""
+
+    __slots__ = ("alias",)
+
+    def __init__(self):
+        self.alias = None
+
+
+_routing = ContextVar("read_routing", default=None)
+# alias -> (checked at, usable), shared by the threads of a worker
+_health = {}
+
+
+def get_replica_settings() -> dict:
+    return {**REPLICA_DEFAULTS, **getattr(settings, "DATABASE_REPLICAS", {})}
+
+
+def clear_replica_health():
+    """Forget all health checks, so replicas are checked again on next use"""
+
+    _health.clear()
+
+
+@receiver(setting_changed)
+def reset_replica_health(setting, **kwargs):
+    if setting in ("DATABASE_REPLICAS", "DATABASES"):
+        clear_replica_health()
+
+
+def get_replica_lag(connection):
+    """Return how many seconds a replica is behind, None if it can't tell"""
+
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_LAG_SQL)
+        lag = cursor.fetchone()[0]
+
+    # NULL when the server isn't replicating, then nothing is missing
+    return float(lag or 0)
+
+
+def is_usable(alias, config) -> bool:
+    """Return whether a replica is reachable and recent, checked at intervals"""
+
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is not None and now - checked[0] < config["CHECK_INTERVAL"]:
+        return checked[1]
+
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        lag = get_replica_lag(connection)
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable, reading from the primary", alias)
+        usable = False
+    else:
+        usable = lag is None or lag <= config["MAX_LAG_SECONDS"]
+        if not usable:
+            logger.warning("Replica %s lags %.1f s, reading from the primary", alias, lag)
+
+    _health[alias] = (now, usable)
+    return usable
+
+
+def choose_replica(config):
+    """Return a random usable replica alias, None if there is none"""
+
+    aliases = list(config["ALIASES"])
+    random.shuffle(aliases)
+
+    return next((alias for alias in aliases if is_usable(alias, config)), None)
+
+
+def get_pin_key(user_id) -> str:
+    return f"primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Keep the reads of a user on the primary for ``STICKY_SECONDS``"""
+
+    config = get_replica_settings()
+    if config["ALIASES"] and config["STICKY_SECONDS"] > 0:
+        caches[config["CACHE_ALIAS"]].set(
+            get_pin_key(user_id), True, timeout=config["STICKY_SECONDS"]
+        )
+
+
+def route_reads(request):
+    """Send the remaining reads of a safe, authenticated request to a replica"""
+
+    routing = _routing.get()
+    config = get_replica_settings()
+    user = request.user
+    if (
+        routing is None
+        or not config["ALIASES"]
+        or request.method not in SAFE_METHODS
+        or not user.is_authenticated
+        or caches[config["CACHE_ALIAS"]].get(get_pin_key(user.pk))
+    ):
+        return
+
+    routing.alias = choose_replica(config)
+
+
+def pin_writer(request):
+    """Pin the user of an unsafe request to the primary"""
+
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        pin_to_primary(user.pk)
+
+
+class ReplicaRouter:
+    """Database router reading from the request's replica
+
+    Writes use the primary, also for instances read from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        # Reads in a transaction must see its writes, and database caches
+        # the entries just written
+        if (
+            routing is None
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or model._meta.app_label == "django_cache"
+        ):
+            return None
+
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        """Write instances read from a replica to the primary"""
+
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in get_replica_settings()["ALIASES"]:
+            return DEFAULT_DB_ALIAS
+
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replica_settings()["ALIASES"]}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Scope read routing to a request and make writers read their writes
+
+    After an unsafe request by an authenticated user the user's reads stay
+    on the primary for ``STICKY_SECONDS``, whichever worker serves them.
+    Runs in sync and async mode.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes Django await the middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _routing.set(ReadRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if request.method not in SAFE_METHODS:
+            pin_writer(request)
+
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(ReadRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        # The user may still be lazy and the cache a database table
+        if request.method not in SAFE_METHODS:
+            await database_sync_to_async(pin_writer, request)
+
+        return response
+
+
+class ReplicaReadsMixin:
+    """DRF view mixin serving safe requests from a replica after authentication"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads(request)
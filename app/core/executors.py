@@ -0,0 +1,137 @@
+"""Bounded, metered thread pools for blocking or CPU heavy work"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+_executors = {}
+_lock = threading.Lock()
+
+
+class MeteredExecutor(ThreadPoolExecutor):
+    """Thread pool counting queued and running jobs and their queue wait"""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = ""):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._stats_lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("submitted", "completed", "queued", "running", "peak_queued"), 0
+        )
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._stats_lock:
+            self._counters["submitted"] += 1
+            self._counters["queued"] += 1
+            self._counters["peak_queued"] = max(
+                self._counters["peak_queued"], self._counters["queued"]
+            )
+
+        return super().submit(self._run, time.monotonic(), fn, *args, **kwargs)
+
+    def _run(self, submitted_at: float, fn, *args, **kwargs):
+        wait_time = time.monotonic() - submitted_at
+        with self._stats_lock:
+            self._counters["queued"] -= 1
+            self._counters["running"] += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self._counters["running"] -= 1
+                self._counters["completed"] += 1
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, running jobs and time spent queued"""
+
+        with self._stats_lock:
+            return {
+                "max_workers": self._max_workers,
+                **self._counters,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+            }
+
+
+def get_executor(name: str) -> MeteredExecutor:
+    """Return the shared pool sized by ``EXECUTORS[name]["MAX_WORKERS"]``"""
+
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = MeteredExecutor(
+                max_workers=settings.EXECUTORS[name]["MAX_WORKERS"],
+                thread_name_prefix=f"{name}-executor",
+            )
+            _executors[name] = executor
+
+    return executor
+
+
+def get_executor_stats() -> dict:
+    """Return ``MeteredExecutor.stats()`` of every started pool by name"""
+
+    with _lock:
+        executors = dict(_executors)
+
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+@receiver(setting_changed)
+def reset_executors(setting, **kwargs):
+    if setting == "EXECUTORS":
+        with _lock:
+            for executor in _executors.values():
+                executor.shutdown(wait=False)
+            _executors.clear()
+
+
+def run_in_thread(name: str, func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the named pool and wait for the result
+
+    Lets sync callers cap how many threads do some CPU heavy work at once.
+    """
+
+    return get_executor(name).submit(func, *args, **kwargs).result()
+
+
+async def run_in_executor(name: str, func, *args, **kwargs):
+    """Await ``func(*args, **kwargs)`` on the named pool
+
+    The call sees the caller's context variables, so asgiref locals such as
+    the active urlconf carry over into the pool thread.
+    """
+
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(name), call)
+
+
+def _with_connections(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def database_sync_to_async(func, *args, **kwargs):
+    """Await ORM work on the ``database`` pool
+
+    Pool threads keep their own connections between calls, so stale or
+    expired ones are closed around every call just like Django does around
+    every request.
+    """
+
+    return await run_in_executor("database", _with_connections, func, *args, **kwargs)
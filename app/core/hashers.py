@@ -0,0 +1,17 @@
+"""Password hashers with a cost tunable through settings"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 running ``PASSWORD_HASH_ITERATIONS`` iterations
+
+    Keeps Django's ``pbkdf2_sha256`` algorithm name, so existing hashes still
+    verify. Hashes made with a different iteration count are re-encoded on
+    the next successful login, see ``User.check_password``.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
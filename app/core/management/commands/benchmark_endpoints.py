@@ -0,0 +1,461 @@
+"""Django command load testing every API route through the test client"""
+
+import itertools
+import json
+import math
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import django
+from core.models import Recipe, Tag
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.authtoken.models import Token
+
+# Database hosts counted as local, "db" is the docker-compose service
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1", "db"}
+
+
+class Scenario:
+    """One kind of request, ``path``/``body`` get the fixture and a request number
+
+    Requests authenticate with the fixture user's token, or with a session
+    when ``session`` is set.
+    """
+
+    def __init__(
+        self,
+        route,
+        method,
+        path,
+        body=None,
+        content_type="application/json",
+        session=False,
+    ):
+        self.route = route
+        self.method = method
+        self.path = path
+        self.body = body
+        self.content_type = content_type
+        self.session = session
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+def recipe_payload(fixture, number):
+    return {
+        "title": f"Benchmark recipe {number}",
+        "time_minutes": 10,
+        "price": "5.25",
+        "tags": [{"name": "Vegan"}, {"name": f"Tag {number % 10}"}],
+    }
+
+
+SCENARIOS = [
+    Scenario("recipes:api-root", "get", lambda f, n: reverse("recipes:api-root")),
+    Scenario("recipes:recipe-list", "get", lambda f, n: reverse("recipes:recipe-list")),
+    Scenario(
+        "recipes:recipe-list",
+        "post",
+        lambda f, n: reverse("recipes:recipe-list"),
+        recipe_payload,
+    ),
+    Scenario(
+        "recipes:recipe-detail",
+        "get",
+        lambda f, n: reverse("recipes:recipe-detail", args=[f.recipe(n)]),
+    ),
+    Scenario(
+        "recipes:recipe-detail",
+        "patch",
+        lambda f, n: reverse("recipes:recipe-detail", args=[f.recipe(n)]),
+        lambda f, n: {"title": f"Renamed {n}", "tags": [{"name": "Vegan"}]},
+    ),
+    Scenario(
+        "recipes:recipe-detail",
+        "put",
+        lambda f, n: reverse("recipes:recipe-detail", args=[f.recipe(n)]),
+        recipe_payload,
+    ),
+    Scenario(
+        "recipes:recipe-detail",
+        "delete",
+        lambda f, n: reverse("recipes:recipe-detail", args=[f.disposable_recipes[n]]),
+    ),
+    Scenario(
+        "recipes:recipe-import",
+        "post",
+        lambda f, n: reverse("recipes:recipe-import"),
+        lambda f, n: "\n".join(
+            json.dumps(recipe_payload(f, n * 10 + row)) for row in range(10)
+        ),
+        content_type="application/x-ndjson",
+    ),
+    Scenario(
+        "recipes:recipe-batch",
+        "post",
+        lambda f, n: reverse("recipes:recipe-batch"),
+        lambda f, n: [
+            {"op": "create", "data": recipe_payload(f, n * 5 + row)} for row in range(5)
+        ]
+        + [
+            {"op": "update", "id": recipe_id, "data": {"title": f"Batch {n}"}}
+            for recipe_id in dict.fromkeys(f.recipe(n * 5 + row) for row in range(5))
+        ],
+    ),
+    Scenario("recipes:recipe-export", "get", lambda f, n: reverse("recipes:recipe-export")),
+    Scenario("recipes:recipe-stats", "get", lambda f, n: reverse("recipes:recipe-stats")),
+    Scenario("recipes:tag-list", "get", lambda f, n: reverse("recipes:tag-list")),
+    Scenario(
+        "recipes:tag-detail",
+        "get",
+        lambda f, n: reverse("recipes:tag-detail", args=[f.tag(n)]),
+    ),
+    Scenario(
+        "recipes:tag-detail",
+        "patch",
+        lambda f, n: reverse("recipes:tag-detail", args=[f.tag(n)]),
+        lambda f, n: {"name": f"Tag {n % 10}"},
+    ),
+    Scenario(
+        "recipes:tag-detail",
+        "delete",
+        lambda f, n: reverse("recipes:tag-detail", args=[f.disposable_tags[n]]),
+    ),
+    Scenario(
+        "user:create",
+        "post",
+        lambda f, n: reverse("user:create"),
+        lambda f, n: {"email": f"{f.prefix}-new-{n}@example.com", "password": f.password},
+    ),
+    Scenario(
+        "user:token",
+        "post",
+        lambda f, n: reverse("user:token"),
+        lambda f, n: {"email": f.user.email, "password": f.password},
+    ),
+    Scenario("user:me", "get", lambda f, n: reverse("user:me")),
+    Scenario(
+        "user:me", "patch", lambda f, n: reverse("user:me"), lambda f, n: {"name": f"Name {n}"}
+    ),
+    Scenario("api-schema", "get", lambda f, n: reverse("api-schema")),
+    Scenario("api-docs", "get", lambda f, n: reverse("api-docs")),
+    Scenario("admin:index", "get", lambda f, n: reverse("admin:index"), session=True),
+]
+
+
+class Fixture:
+    """Sample user, recipes and tags requests run against
+
+    The password is random and only kept in memory. The user is staff with
+    view permissions on the core models, enough for the admin index, but no
+    superuser.
+    """
+
+    def __init__(self, recipes: int, disposable: int):
+        self.prefix = f"benchmark-{uuid.uuid4().hex[:12]}"
+        self.password = secrets.token_urlsafe(32)
+        self.user = get_user_model().objects.create_user(
+            email=f"{self.prefix}@example.com", password=self.password
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.user.user_permissions.set(
+            Permission.objects.filter(
+                content_type__app_label="core", codename__startswith="view_"
+            )
+        )
+        self.token = Token.objects.create(user=self.user).key
+
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f"Tag {number}") for number in range(10)
+        ]
+        self.recipes = []
+        for number in range(recipes):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {number}",
+                time_minutes=number % 90,
+                price=Decimal("5.25"),
+                description="Benchmark recipe " * 20,
+            )
+            recipe.tags.add(self.tags[number % 10], self.tags[(number + 1) % 10])
+            self.recipes.append(recipe.id)
+
+        self.disposable_recipes = [
+            Recipe.objects.create(
+                user=self.user, title="Disposable", time_minutes=1, price=Decimal("1")
+            ).id
+            for _ in range(disposable)
+        ]
+        self.disposable_tags = [
+            Tag.objects.create(user=self.user, name=f"Disposable {number}").id
+            for number in range(disposable)
+        ]
+
+    def recipe(self, number: int) -> int:
+        return self.recipes[number % len(self.recipes)]
+
+    def tag(self, number: int) -> int:
+        return self.tags[number % len(self.tags)].id
+
+    def delete(self):
+        get_user_model().objects.filter(email__startswith=self.prefix).delete()
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` counting the queries it sees"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def is_local_database() -> bool:
+    """Whether the default database is SQLite, on a local host or a socket"""
+
+    host = connection.settings_dict["HOST"] or ""
+    return connection.vendor == "sqlite" or host in LOCAL_HOSTS or host.startswith("/")
+
+
+def percentile(ordered: list, percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+
+    index = math.ceil(percent / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, index))]
+
+
+def get_route_names(resolver=None, namespace="") -> set:
+    """Names of every route in the urlconf, prefixed by their namespace"""
+
+    names = set()
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            names |= get_route_names(pattern, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(f"{namespace}{pattern.name}")
+
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test every API route through the Django test client against the "
+        "configured database and report latency percentiles, requests per second "
+        "and queries per request. Sample data is deleted afterwards. Refuses to "
+        "run without DEBUG or against a remote database unless --allow-remote "
+        "is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=100,
+            help="Requests per scenario (default: 100)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Threads sending requests at the same time (default: 4)",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=200,
+            help="Sample recipes of the benchmark user (default: 200)",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Only run scenarios whose name contains this, may be repeated",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header of the requests, must be allowed (default: localhost)",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+        parser.add_argument(
+            "--compare",
+            help="Print the change against a JSON file written by an earlier run",
+        )
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="Fail when a p95 latency grew by more than this many percent "
+            "compared to --compare",
+        )
+        parser.add_argument(
+            "--allow-remote",
+            action="store_true",
+            help="Run even without DEBUG or against a database on another host",
+        )
+
+    def handle(self, *args, **options):
+        if not options["allow_remote"] and not (settings.DEBUG and is_local_database()):
+            raise CommandError(
+                "The benchmark writes a staff user and sample data to the database. "
+                "It only runs with DEBUG against a local database, pass "
+                "--allow-remote to run it anyway."
+            )
+
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["scenarios"]
+            or any(part in scenario.name for part in options["scenarios"])
+        ]
+        self.warn_uncovered_routes()
+        if connection.vendor == "sqlite" and options["concurrency"] > 1:
+            self.stderr.write(
+                "SQLite serialises writes, concurrent write scenarios may fail with "
+                "'database is locked'. Use --concurrency 1 or PostgreSQL."
+            )
+
+        fixture = Fixture(options["recipes"], options["requests"])
+        try:
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                results = [
+                    self.run(scenario, fixture, executor, options) for scenario in scenarios
+                ]
+        finally:
+            fixture.delete()
+
+        report = {
+            "meta": {
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "recipes": options["recipes"],
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["compare"]:
+            self.compare(results, options["compare"], options["max_regression"])
+
+    def warn_uncovered_routes(self):
+        covered = {scenario.route for scenario in SCENARIOS}
+        uncovered = sorted(
+            name
+            for name in get_route_names() - covered
+            if not name.startswith("admin:")
+        )
+        if uncovered:
+            self.stderr.write(f"Routes without a scenario: {', '.join(uncovered)}")
+
+    def run(self, scenario: Scenario, fixture: Fixture, executor, options) -> dict:
+        numbers = itertools.count()
+        local = threading.local()
+
+        def get_client():
+            if not hasattr(local, "client"):
+                if scenario.session:
+                    local.client = Client(HTTP_HOST=options["host"])
+                    local.client.force_login(fixture.user)
+                else:
+                    local.client = Client(
+                        HTTP_HOST=options["host"],
+                        HTTP_AUTHORIZATION=f"Token {fixture.token}",
+                    )
+                local.client.raise_request_exception = False
+
+            return local.client
+
+        def send(_):
+            client = get_client()
+            number = next(numbers)
+            path = scenario.path(fixture, number)
+            kwargs = {}
+            if scenario.body is not None:
+                kwargs = {
+                    "data": scenario.body(fixture, number),
+                    "content_type": scenario.content_type,
+                }
+
+            counter = QueryCounter()
+            started = time.perf_counter()
+            try:
+                with connection.execute_wrapper(counter):
+                    response = getattr(client, scenario.method)(path, **kwargs)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+            finally:
+                # The test client keeps connections open across requests,
+                # close them like request_finished does
+                connection.close()
+            latency = time.perf_counter() - started
+
+            return latency, counter.count, response.status_code
+
+        started = time.perf_counter()
+        samples = list(executor.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _, _ in samples)
+        result = {
+            "name": scenario.name,
+            "requests": len(samples),
+            "errors": sum(status >= 400 for _, _, status in samples),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "requests_per_second": round(len(samples) / elapsed, 1),
+            "queries_per_request": round(
+                sum(queries for _, queries, _ in samples) / len(samples), 2
+            ),
+        }
+        self.stdout.write(
+            f"{result['name']:<32} p50 {result['p50_ms']:8.2f} ms  "
+            f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+            f"{result['requests_per_second']:8.1f} req/s  "
+            f"{result['queries_per_request']:6.2f} queries  {result['errors']} errors"
+        )
+
+        return result
+
+    def compare(self, results: list, path: str, max_regression):
+        with open(path) as previous_file:
+            previous = {result["name"]: result for result in json.load(previous_file)["results"]}
+
+        regressions = []
+        for result in results:
+            before = previous.get(result["name"])
+            if before is None or not before["p95_ms"]:
+                continue
+
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            self.stdout.write(
+                f"{result['name']:<32} p95 {change:+7.1f}%  "
+                f"queries {result['queries_per_request'] - before['queries_per_request']:+.2f}"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(result["name"])
+
+        if regressions:
+            raise CommandError(f"p95 latency regressed: {', '.join(regressions)}")
@@ -0,0 +1,91 @@
+"""Django command to measure JSON rendering and parsing throughput"""
+
+import io
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def build_payload(size: int) -> dict:
+    """A recipe list page with ``size`` results"""
+
+    return {
+        "next": None,
+        "previous": None,
+        "results": [
+            {
+                "id": number,
+                "title": f"Recipe {number} – crème brûlée",
+                "time_minutes": number % 90,
+                "price": Decimal(number % 5000) / 100,
+                "link": f"https://example.com/recipes/{number}",
+                "updated_at": datetime(2024, 1, 1, 12, number % 60, tzinfo=timezone.utc),
+                "tags": [{"name": "Vegan", "id": 1}, {"name": "Dessert", "id": 2}],
+            }
+            for number in range(size)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSON renderer and parser with the orjson based ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=500,
+            help="Recipes per rendered page (default: 500)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=200,
+            help="Renders and parses per measurement (default: 200)",
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write("orjson is not installed, both paths use the stdlib")
+
+        payload = build_payload(options["size"])
+        repeat = options["repeat"]
+        body = JSONRenderer().render(payload)
+        self.stdout.write(f"{options['size']} recipes per page, {len(body)} bytes")
+
+        cases = {
+            "render": (
+                lambda: JSONRenderer().render(payload),
+                lambda: FastJSONRenderer().render(payload),
+            ),
+            "parse": (
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+            ),
+        }
+        for name, (stdlib, fast) in cases.items():
+            slow_rate = self.measure(stdlib, repeat)
+            fast_rate = self.measure(fast, repeat)
+            self.stdout.write(
+                f"{name:>6}: stdlib {slow_rate:9.1f}/s "
+                f"({slow_rate * len(body) / 2 ** 20:7.1f} MiB/s), "
+                f"fast {fast_rate:9.1f}/s ({fast_rate * len(body) / 2 ** 20:7.1f} MiB/s), "
+                f"{fast_rate / slow_rate:5.1f}x"
+            )
+
+        identical = FastJSONRenderer().render(payload) == body
+        self.stdout.write(f"rendered output {'identical' if identical else 'DIFFERENT'}")
+
+    @staticmethod
+    def measure(func, repeat: int) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+
+        return repeat / (time.perf_counter() - started)
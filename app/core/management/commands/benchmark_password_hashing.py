@@ -0,0 +1,70 @@
+"""Django command to measure password hashing throughput"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.executors import get_executor, run_in_thread
+from core.hashers import PBKDF2PasswordHasher
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = "Measure password hashes per second through the password executor"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            action="append",
+            help="PBKDF2 iterations to measure, may be repeated "
+            "(default: PASSWORD_HASH_ITERATIONS)",
+        )
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=20,
+            help="Hashes per measurement (default: 20)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Callers hashing at the same time (default: 4)",
+        )
+
+    def handle(self, *args, **options):
+        hasher = PBKDF2PasswordHasher()
+        salt = hasher.salt()
+        count = options["count"]
+        workers = get_executor("password").stats()["max_workers"]
+
+        self.stdout.write(
+            f"{count} hashes per run, {options['concurrency']} callers, "
+            f"{workers} password executor workers"
+        )
+        for iterations in options["iterations"] or [settings.PASSWORD_HASH_ITERATIONS]:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as callers:
+                hashes = [
+                    callers.submit(
+                        run_in_thread, "password", hasher.encode, PASSWORD, salt, iterations
+                    )
+                    for _ in range(count)
+                ]
+                for future in hashes:
+                    future.result()
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{iterations:>9} iterations: {count / elapsed:9.1f} hashes/s "
+                f"({elapsed / count * 1000:.2f} ms per hash)"
+            )
+
+        stats = get_executor("password").stats()
+        self.stdout.write(
+            f"peak queue depth {stats['peak_queued']}, "
+            f"max queue wait {stats['wait_time_max'] * 1000:.2f} ms"
+        )
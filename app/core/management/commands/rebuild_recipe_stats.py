@@ -0,0 +1,41 @@
+"""Django command recomputing the recipe stats of users from their recipes"""
+
+from core.models import RecipeStats
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute RecipeStats from the recipes. Users are rebuilt in batches "
+        "of primary keys, each batch in its own transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users rebuilt per transaction (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        rebuilt = 0
+
+        while True:
+            batch = list(
+                get_user_model()
+                .objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            RecipeStats.objects.rebuild(batch)
+            rebuilt += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Recipe stats of {rebuilt} users rebuilt"))
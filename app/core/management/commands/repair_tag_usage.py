@@ -0,0 +1,80 @@
+"""Django command recomputing tag usage counters from the tag links"""
+
+from core.models import CollectionVersion, RecipeTag, Tag
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def get_usage_subquery():
+    return Coalesce(
+        Subquery(
+            RecipeTag.objects.filter(tag_id=OuterRef("pk"))
+            .order_by()
+            .values("tag_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Tag.usage_count from the recipe tag links. Tags are checked "
+        "in batches of primary keys and only drifted ones are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Tags checked per query (default: 5000)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many counters drifted",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        repaired = 0
+
+        while True:
+            batch = list(
+                Tag.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            drifted = list(
+                Tag.objects.filter(pk__in=batch)
+                .annotate(actual=get_usage_subquery())
+                .exclude(usage_count=F("actual"))
+                .values_list("pk", "user_id")
+            )
+            repaired += len(drifted)
+            if drifted and not options["dry_run"]:
+                self.repair(drifted)
+
+        verb = "drifted" if options["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"{repaired} tag usage counts {verb}"))
+
+    @staticmethod
+    def repair(drifted):
+        with transaction.atomic():
+            Tag.objects.filter(pk__in=[pk for pk, _ in drifted]).update(
+                usage_count=get_usage_subquery(),
+                version=F("version") + 1,
+                updated_at=timezone.now(),
+            )
+            for user_id in {user_id for _, user_id in drifted}:
+                CollectionVersion.objects.bump(user_id, [CollectionVersion.TAGS])
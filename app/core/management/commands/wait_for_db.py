@@ -1,19 +1,141 @@
 """Django command to wait for the database to be available"""
 
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2Error
 
+INITIAL_DELAY = 0.05
+# Seconds every attempt is given, so --timeout=0 still checks once
+MIN_ATTEMPT_TIMEOUT = 1
+
+
+class MigrationsPending(Exception):
+    """The database is reachable but has unapplied migrations"""
+
+
+def limit_connect_timeout(connection, timeout: float):
+    """Make PostgreSQL connection attempts give up after ``timeout`` seconds
+
+    Without it a host dropping packets blocks until the OS gives up. Only
+    this thread's connection is changed, the settings stay untouched.
+    """
+
+    if connection.vendor != "postgresql":
+        return
+
+    options = connection.settings_dict.get("OPTIONS", {})
+    seconds = math.ceil(timeout)
+    # 0 means no timeout to libpq
+    if int(options.get("connect_timeout", 0)) > 0:
+        seconds = min(seconds, int(options["connect_timeout"]))
+    connection.settings_dict = {
+        **connection.settings_dict,
+        "OPTIONS": {**options, "connect_timeout": seconds},
+    }
+
 
 class Command(BaseCommand):
+    help = "Wait until every database accepts connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Database alias to wait for, may be repeated (default: all)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up (default: 60)",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=1,
+            help="Longest pause between attempts in seconds (default: 1)",
+        )
+        parser.add_argument(
+            "--migrations",
+            action="store_true",
+            help="Also wait until all migrations are applied",
+        )
+
     def handle(self, *args, **options):
+        pending = options["databases"] or list(connections)
+        deadline = time.monotonic() + options["timeout"]
+        delay = INITIAL_DELAY
+
         self.stdout.write("Waiting for database...")
+        executor = ThreadPoolExecutor(max_workers=len(pending))
         try:
-            self.check(databases=["default"])  # type: ignore
-        except (OperationalError, Psycopg2Error):
-            time.sleep(1)
-            self.handle()
-        else:
-            self.stdout.write(self.style.SUCCESS("Database available!"))
+            while True:
+                timeout = max(deadline - time.monotonic(), MIN_ATTEMPT_TIMEOUT)
+                errors = self.probe_all(executor, pending, options["migrations"], timeout)
+                if not errors:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        "Database unavailable: "
+                        + ", ".join(f"{alias} ({error})" for alias, error in errors.items())
+                    )
+
+                pending = list(errors)
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, options["max_delay"])
+        finally:
+            # Probes stuck past the deadline are left behind
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS("Database available!"))
+
+    def probe_all(self, executor, aliases: list, migrations: bool, timeout: float) -> dict:
+        """Probe the aliases at once, return why the unready ones are not ready
+
+        Probes without an answer within ``timeout`` seconds count as failed.
+        """
+
+        futures = {
+            executor.submit(self.probe, alias, migrations, timeout): alias for alias in aliases
+        }
+        done, _ = wait(futures, timeout=timeout)
+
+        errors = {}
+        for future, alias in futures.items():
+            error = future.result() if future in done else f"no answer within {timeout:.1f}s"
+            if error:
+                errors[alias] = error
+
+        return errors
+
+    def probe(self, alias: str, migrations: bool, timeout: float):
+        """Return why ``alias`` is not ready yet, or None when it is"""
+
+        try:
+            limit_connect_timeout(connections[alias], timeout)
+            self.check_database(alias, migrations)
+        except (OperationalError, Psycopg2Error, MigrationsPending) as error:
+            return error
+        finally:
+            connections[alias].close()
+
+        return None
+
+    def check_database(self, alias: str, migrations: bool):
+        connection = connections[alias]
+        connection.ensure_connection()
+
+        if migrations:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            if plan:
+                raise MigrationsPending(f"{len(plan)} unapplied migrations")
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:03
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Relink recipes to the oldest of same-named tags and drop the others"""
+
+    Tag = apps.get_model("core", "Tag")
+    RecipeTag = apps.get_model("core", "Recipe").tags.through
+
+    duplicates = (
+        Tag.objects.values("user_id", "name")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+
+    for group in duplicates:
+        keep_id = group["keep_id"]
+        tag_ids = list(
+            Tag.objects.filter(user_id=group["user_id"], name=group["name"])
+            .exclude(id=keep_id)
+            .values_list("id", flat=True)
+        )
+        recipe_ids = set(
+            RecipeTag.objects.filter(tag_id__in=tag_ids)
+            .exclude(recipe_id__in=RecipeTag.objects.filter(tag_id=keep_id).values("recipe_id"))
+            .values_list("recipe_id", flat=True)
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe_id=recipe_id, tag_id=keep_id) for recipe_id in recipe_ids
+        )
+        Tag.objects.filter(id__in=tag_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tag_usage(apps, schema_editor):
+    """Fill the counters of existing tags with one UPDATE"""
+
+    Tag = apps.get_model("core", "Tag")
+    RecipeTag = apps.get_model("core", "RecipeTag")
+
+    usage = (
+        RecipeTag.objects.filter(tag_id=OuterRef("pk"))
+        .order_by()
+        .values("tag_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Tag.objects.update(usage_count=Coalesce(Subquery(usage), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipetag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_tag_usage, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-usage_count', 'name'], name='core_tag_user_usage_idx'),
+        ),
+    ]
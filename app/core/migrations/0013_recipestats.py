@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:54
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+
+def fill_recipe_stats(apps, schema_editor):
+    """Summarise the recipes of every user that has some"""
+
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeStats = apps.get_model("core", "RecipeStats")
+
+    totals = (
+        Recipe.objects.order_by()
+        .values("user_id")
+        .annotate(
+            recipe_count=Count("id"),
+            price_total=Sum("price"),
+            time_minutes_total=Sum("time_minutes"),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+    )
+    RecipeStats.objects.bulk_create(
+        (RecipeStats(**row) for row in totals.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_tag_usage_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to='core.user')),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_recipe_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:22
+
+from django.db import migrations
+
+CREATE_PREFIX_INDEXES = """
+CREATE INDEX core_user_upper_email_like_idx ON core_user (UPPER(email) text_pattern_ops);
+CREATE INDEX core_tag_upper_name_like_idx ON core_tag (UPPER(name) text_pattern_ops);
+"""
+
+DROP_PREFIX_INDEXES = """
+DROP INDEX IF EXISTS core_user_upper_email_like_idx;
+DROP INDEX IF EXISTS core_tag_upper_name_like_idx;
+"""
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """Serve UPPER(column) LIKE 'TERM%', which plain btree indexes can't"""
+
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_PREFIX_INDEXES)
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_PREFIX_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_upper_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='core_user_upper_email_idx',
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,11 +1,33 @@
 """Database Models"""
+from core.executors import run_in_thread
+from core.signals import collection_changed
 from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
-from django.db import models
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, NullIf
+from django.utils import timezone
+
+
+SEARCH_CONFIG = "english"
 
 
 class UserManager(BaseUserManager):
@@ -36,6 +58,8 @@ class UserManager(BaseUserManager):
 class User(AbstractBaseUser, PermissionsMixin):
     """User ORM object"""
 
+    # Prefix searched by the admin through an UPPER(email) text_pattern_ops
+    # index, created on PostgreSQL only by migration 0015
     email = models.EmailField(max_length=255, unique=True)
     name = models.CharField(max_length=255, null=True)
     is_active = models.BooleanField(default=True)
@@ -44,27 +68,454 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = "email"
 
+    def set_password(self, raw_password):
+        """Hash on the bounded ``password`` executor, see core.executors"""
+
+        self.password = run_in_thread("password", make_password, raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password) -> bool:
+        """Verify on the ``password`` executor, re-hashing outdated hashes"""
+
+        outdated = []
+        valid = run_in_thread(
+            "password", check_password, raw_password, self.password, outdated.append
+        )
+        if valid and outdated:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return valid
+
+
+class VersionedModel(models.Model):
+    """Base for objects exposing a version and modification time to clients"""
+
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "version", "updated_at"}
+
+        super().save(*args, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    def search(self, text: str):
+        """Filter recipes matching all words of text in title or description
+
+        PostgreSQL ranks matches of the trigger-maintained ``search_vector``
+        served by a GIN index, title words weighing more than description
+        ones. The ``rank`` is cast to double precision so it survives a round
+        trip through a pagination cursor unchanged. Other databases fall back
+        to substring matching, newest first.
+        """
+
+        if connections[self.db].vendor == "postgresql":
+            query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+            return (
+                self.filter(search_vector=query)
+                .annotate(rank=Cast(SearchRank(F("search_vector"), query), models.FloatField()))
+                .order_by("-rank", "-id")
+            )
+
+        condition = Q()
+        for word in text.split():
+            condition &= Q(title__icontains=word) | Q(description__icontains=word)
+
+        return self.filter(condition).order_by("-id")
+
+    def with_tags(self, tag_ids, match_all: bool = False):
+        """Filter recipes carrying any (or all) of the given tags
+
+        Both variants are one semi-join over the ``(tag_id, recipe_id)``
+        index of the link table, so no recipe is returned twice. Matching
+        all tags groups the links by recipe and keeps groups of full size.
+        """
+
+        tag_ids = set(tag_ids)
+        links = RecipeTag.objects.filter(tag_id__in=tag_ids)
+        if match_all:
+            links = (
+                links.values("recipe_id")
+                .annotate(matched=Count("tag_id"))
+                .filter(matched=len(tag_ids))
+            )
+
+        return self.filter(id__in=links.values("recipe_id"))
 
-class Recipe(models.Model):
+    def delete_unsignalled(self) -> int:
+        """Action to delete the recipes with one ``DELETE`` and no signals
+
+        For bulk writers that delete the tag links first and update tag
+        usage counts, recipe stats and collection versions themselves, which
+        the delete receivers would otherwise do once per recipe. Refuses to
+        run when another model references recipes, as its rows would neither
+        cascade nor be checked. Returns the number of deleted recipes.
+        """
+
+        unhandled = sorted(
+            relation.related_model._meta.label
+            for relation in self.model._meta.related_objects
+            if relation.related_model is not RecipeTag
+        )
+        if unhandled:
+            raise TypeError(
+                f"Cannot delete recipes without the collector, referenced by {unhandled}"
+            )
+
+        return self._raw_delete(self.db)
+
+
+class Recipe(VersionedModel):
     """Recipe ORM object"""
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    tags = models.ManyToManyField("Tag")
+    tags = models.ManyToManyField("Tag", through="RecipeTag")
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     description = models.TextField(blank=True)
     link = models.CharField(max_length=255, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta(VersionedModel.Meta):
+        indexes = [models.Index(fields=["user", "id"], name="core_recipe_user_id_idx")]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded values RecipeStats sums up"""
+
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in RecipeStats.SOURCE_FIELDS):
+            instance._stats_values = instance.get_stats_values()
+
+        return instance
+
+    def get_stats_values(self) -> tuple:
+        return tuple(
+            self._meta.get_field(name).to_python(getattr(self, name))
+            for name in RecipeStats.SOURCE_FIELDS
+        )
+
+
+class RecipeTag(models.Model):
+    """Link between a recipe and one of its tags"""
+
+    id = models.AutoField(primary_key=True)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
+    tag = models.ForeignKey("Tag", on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "core_recipe_tags"
+        unique_together = [["recipe", "tag"]]
+        indexes = [
+            models.Index(fields=["tag", "recipe"], name="core_recipetag_tag_recipe_idx")
+        ]
+
+
+class TagQuerySet(models.QuerySet):
+    def change_usage(self, delta) -> int:
+        """Add ``delta``, a number or expression, to the usage counters
+
+        Also bumps their versions, since the count is part of the rendered
+        tag. Returns the number of tags changed.
+        """
+
+        return self.update(
+            usage_count=F("usage_count") + delta,
+            version=F("version") + 1,
+            updated_at=timezone.now(),
+        )
+
+
+class TagManager(models.Manager.from_queryset(TagQuerySet)):
+    def get_or_create_for_names(self, user, names) -> dict:
+        """Action to fetch user tags by name, creating missing ones in bulk
+
+        Costs one SELECT when all tags exist, otherwise an INSERT that skips
+        rows created concurrently and a SELECT of the inserted ones.
+        """
+
+        names = list(dict.fromkeys(names))
+        tags = {tag.name: tag for tag in self.filter(user=user, name__in=names)}
+        missing = [name for name in names if name not in tags]
+
+        if missing:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            tags.update(
+                (tag.name, tag) for tag in self.filter(user=user, name__in=missing)
+            )
+            CollectionVersion.objects.bump(user.pk, [CollectionVersion.TAGS])
 
-class Tag(models.Model):
+        return tags
+
+    def change_usage_counts(self, changes: dict):
+        """Action to add ``changes`` (tag id to delta) to the usage counters
+
+        All tags change with one UPDATE. Writes of tag links that bypass m2m
+        signals have to call this themselves, and bump the tag collection.
+        """
+
+        by_delta = {}
+        for tag_id, delta in changes.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(tag_id)
+        if not by_delta:
+            return
+
+        tag_ids = [tag_id for ids in by_delta.values() for tag_id in ids]
+        if len(by_delta) == 1:
+            delta = next(iter(by_delta))
+        else:
+            delta = Case(
+                *[When(id__in=ids, then=Value(delta)) for delta, ids in by_delta.items()],
+                default=Value(0),
+            )
+
+        self.filter(id__in=tag_ids).change_usage(delta)
+
+
+class Tag(VersionedModel):
     """Tag ORM object"""
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Prefix searched by the admin through an UPPER(name) text_pattern_ops
+    # index, created on PostgreSQL only by migration 0015
     name = models.CharField(max_length=100)
+    # Number of recipes using the tag, see TagManager.change_usage_counts
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+    objects: TagManager = TagManager()
+
+    class Meta(VersionedModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="core_tag_unique_user_name"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-usage_count", "name"], name="core_tag_user_usage_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+    def save(self, *args, **kwargs):
+        """Never write back the counter, it only changes through F() updates"""
+
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "usage_count"
+            ]
+
+        super().save(*args, **kwargs)
+
+
+class CollectionVersionManager(models.Manager):
+    def bump(self, user_id, collections):
+        """Action to mark collections of a user as changed
+
+        Writes that bypass model signals (bulk inserts and updates) have to
+        call this themselves.
+        """
+
+        now = timezone.now()
+        updated = self.filter(user_id=user_id, collection__in=collections).update(
+            version=F("version") + 1, updated_at=now
+        )
+
+        if updated < len(collections):
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, collection=collection, updated_at=now)
+                    for collection in collections
+                ],
+                ignore_conflicts=True,
+            )
+
+        collection_changed.send(
+            sender=self.model, user_id=user_id, collections=tuple(collections)
+        )
+
+
+class CollectionVersion(models.Model):
+    """Version of all recipes or all tags of a user, bumped on every change"""
+
+    RECIPES = "recipes"
+    TAGS = "tags"
+    COLLECTION_CHOICES = [(RECIPES, "Recipes"), (TAGS, "Tags")]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    collection = models.CharField(max_length=20, choices=COLLECTION_CHOICES)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+    objects: CollectionVersionManager = CollectionVersionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "collection"],
+                name="core_collectionversion_unique_user_collection",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.collection} v{self.version}"
+
+
+class RecipeStatsManager(models.Manager):
+    def with_averages(self):
+        """Annotate ``average_price`` and ``average_time_minutes``
+
+        Averages divide the totals in the database, like ``Avg`` does, so
+        they come out with the same precision: exact numerics on PostgreSQL,
+        floats on SQLite.
+        """
+
+        count = NullIf(F("recipe_count"), 0)
+        if connections[self.db].vendor == "postgresql":
+            numeric = models.DecimalField(max_digits=20, decimal_places=0)
+            time_total = Cast("time_minutes_total", numeric)
+        else:
+            time_total = Cast("time_minutes_total", models.FloatField())
+
+        return self.annotate(
+            average_price=ExpressionWrapper(
+                F("price_total") / count, output_field=models.DecimalField()
+            ),
+            average_time_minutes=ExpressionWrapper(
+                time_total / count, output_field=models.FloatField()
+            ),
+        )
+
+    def change(self, user_id, added=(), removed=()):
+        """Account for added and removed ``(price, time_minutes)`` of a user's recipes
+
+        Call it once the recipes are written. Everything changes with one
+        UPDATE, which recomputes minimum and maximum from the recipes only
+        when a removed value may have been one of them. A missing row is
+        rebuilt.
+        """
+
+        added = list(added)
+        removed = list(removed)
+        changes = {
+            "recipe_count": F("recipe_count") + len(added) - len(removed),
+            "price_total": F("price_total")
+            + sum(price for price, _ in added)
+            - sum(price for price, _ in removed),
+            "time_minutes_total": F("time_minutes_total")
+            + sum(minutes for _, minutes in added)
+            - sum(minutes for _, minutes in removed),
+            "updated_at": timezone.now(),
+        }
+        min_price, max_price = F("min_price"), F("max_price")
+        if added:
+            # Typed, since SQLite gets decimals as text, which MIN/MAX rank
+            # above any number
+            field = self.model._meta.get_field("min_price")
+            lowest = Cast(Value(min(price for price, _ in added)), field)
+            highest = Cast(Value(max(price for price, _ in added)), field)
+            min_price = Least(Coalesce("min_price", lowest), lowest)
+            max_price = Greatest(Coalesce("max_price", highest), highest)
+        if removed:
+            prices = Recipe.objects.filter(user_id=user_id).order_by().values("user_id")
+            min_price = Case(
+                When(
+                    min_price__gte=min(price for price, _ in removed),
+                    then=Subquery(prices.annotate(value=Min("price")).values("value")),
+                ),
+                default=min_price,
+            )
+            max_price = Case(
+                When(
+                    max_price__lte=max(price for price, _ in removed),
+                    then=Subquery(prices.annotate(value=Max("price")).values("value")),
+                ),
+                default=max_price,
+            )
+
+        updated = self.filter(user_id=user_id).update(
+            min_price=min_price, max_price=max_price, **changes
+        )
+        if not updated:
+            self.rebuild([user_id])
+
+    def rebuild(self, user_ids):
+        """Action to recompute the rows of ``user_ids`` from their recipes"""
+
+        totals = {
+            row["user_id"]: row
+            for row in Recipe.objects.filter(user_id__in=user_ids)
+            .order_by()
+            .values("user_id")
+            .annotate(
+                recipe_count=Count("id"),
+                price_total=Sum("price"),
+                time_minutes_total=Sum("time_minutes"),
+                min_price=Min("price"),
+                max_price=Max("price"),
+            )
+        }
+        rows = [
+            self.model(
+                user_id=user_id,
+                **{
+                    key: value
+                    for key, value in totals.get(user_id, {}).items()
+                    if key != "user_id"
+                },
+            )
+            for user_id in user_ids
+        ]
+
+        with transaction.atomic(using=self.db):
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create(rows)
+
+
+class RecipeStats(models.Model):
+    """Running totals of a user's recipes behind the stats endpoint
+
+    Kept up to date by the recipe signals and by bulk writers through
+    ``RecipeStats.objects.change``, see ``rebuild_recipe_stats`` if they
+    drift.
+    """
+
+    SOURCE_FIELDS = ("price", "time_minutes")
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recipe_stats",
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    time_minutes_total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    objects: RecipeStatsManager = RecipeStatsManager()
+
+    def __str__(self) -> str:
+        return f"{self.recipe_count} recipes of user {self.user_id}"
@@ -0,0 +1,40 @@
+"""JSON parser using orjson when it is installed"""
+
+import io
+import re
+
+from core.renderers import FastJSONRenderer, orjson
+from django.conf import settings
+from rest_framework import parsers
+
+# orjson reads integers beyond 64 bits as floats, 2 ** 63 has 19 digits
+LONG_DIGITS = re.compile(rb"\d{19}")
+
+
+class FastJSONParser(parsers.JSONParser):
+    """Drop-in ``JSONParser`` decoding UTF-8 bodies with orjson
+
+    Bodies orjson rejects are parsed again by DRF, so they get its result
+    or its error: numbers such as ``1e400`` and lone surrogates are
+    accepted, NaN and Infinity are rejected in strict mode. Bodies with a
+    run of 19 digits are parsed by DRF too, since orjson would turn integers
+    beyond 64 bits into floats. Other encodings, non-strict mode or a
+    missing orjson use the stdlib path.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_DIGITS.search(body) is None:
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(io.BytesIO(body), media_type, parser_context)
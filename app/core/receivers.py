@@ -0,0 +1,179 @@
+"""Signal handlers keeping object and collection versions up to date"""
+
+import threading
+
+from core.models import CollectionVersion, Recipe, RecipeStats, RecipeTag, Tag, User
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+RECIPE_COLLECTIONS = [CollectionVersion.RECIPES]
+ALL_COLLECTIONS = [CollectionVersion.RECIPES, CollectionVersion.TAGS]
+
+
+_deleting = threading.local()
+
+
+def get_deleting_user_ids() -> set:
+    if not hasattr(_deleting, "user_ids"):
+        _deleting.user_ids = set()
+
+    return _deleting.user_ids
+
+
+def bump_collections(user_id, collections):
+    """Bump collection versions, unless the user is being deleted
+
+    Deleting a user cascades to its recipes and tags after its collection
+    versions are gone, bumping would recreate rows pointing at the user.
+    """
+
+    if user_id not in get_deleting_user_ids():
+        CollectionVersion.objects.bump(user_id, collections)
+
+
+def bump_recipes(recipes):
+    """Bump versions of recipes whose rendered tags changed"""
+
+    recipes.update(version=F("version") + 1, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    if getattr(instance, "_tag_usage_changed", False):
+        bump_collections(instance.user_id, ALL_COLLECTIONS)
+    else:
+        bump_collections(instance.user_id, RECIPE_COLLECTIONS)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    """A renamed tag changes every recipe it is attached to"""
+
+    if not created:
+        bump_recipes(Recipe.objects.filter(tags=instance))
+
+    bump_collections(instance.user_id, ALL_COLLECTIONS)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    """Recipes lose the tag through a cascade that sends no m2m signal"""
+
+    bump_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    bump_collections(instance.user_id, ALL_COLLECTIONS)
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump recipes gaining or losing tags, ``instance`` is a Tag if reversed"""
+
+    changed = action == "post_clear" or (
+        action in ("post_add", "post_remove") and bool(pk_set)
+    )
+
+    if reverse and action == "pre_clear":
+        # The recipes can't be found anymore once the links are gone.
+        bump_recipes(Recipe.objects.filter(tags=instance))
+    elif reverse and changed and pk_set:
+        bump_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif not reverse and changed:
+        bump_recipes(Recipe.objects.filter(pk=instance.pk))
+        instance.version += 1
+    else:
+        return
+
+    # Tags render their usage count, which changed as well.
+    bump_collections(instance.user_id, ALL_COLLECTIONS)
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def tag_usage_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep ``Tag.usage_count`` in step with links added and removed
+
+    Added ids are only the new links, removals are counted before the links
+    go away as ``pk_set`` may name ones that don't exist.
+    """
+
+    if action == "post_add" and pk_set:
+        if reverse:
+            Tag.objects.filter(pk=instance.pk).change_usage(len(pk_set))
+        else:
+            Tag.objects.filter(pk__in=pk_set).change_usage(1)
+    elif action == "pre_remove" and pk_set:
+        if reverse:
+            links = RecipeTag.objects.filter(tag=instance, recipe_id__in=pk_set)
+            Tag.objects.filter(pk=instance.pk).change_usage(-links.count())
+        else:
+            Tag.objects.filter(recipetag__recipe=instance, pk__in=pk_set).change_usage(-1)
+    elif action == "pre_clear":
+        if reverse:
+            links = RecipeTag.objects.filter(tag=instance)
+            Tag.objects.filter(pk=instance.pk).change_usage(-links.count())
+        else:
+            Tag.objects.filter(recipetag__recipe=instance).change_usage(-1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Recipes lose their tag links through a cascade that sends no m2m signal"""
+
+    if instance.user_id not in get_deleting_user_ids():
+        changed = Tag.objects.filter(recipetag__recipe=instance).change_usage(-1)
+        # Read by recipe_changed, which bumps the tag collection as well
+        instance._tag_usage_changed = bool(changed)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_stats_saved(sender, instance, created, **kwargs):
+    """Move the recipe's price and time into, or within, its user's stats"""
+
+    values = instance.get_stats_values()
+    previous = getattr(instance, "_stats_values", None)
+
+    if created:
+        RecipeStats.objects.change(instance.user_id, added=[values])
+    elif previous is None:
+        # Saved without its previous values loaded, nothing to subtract
+        RecipeStats.objects.rebuild([instance.user_id])
+    elif previous != values:
+        RecipeStats.objects.change(instance.user_id, added=[values], removed=[previous])
+
+    instance._stats_values = values
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_stats_deleted(sender, instance, **kwargs):
+    """Take a deleted recipe out of its user's stats"""
+
+    if instance.user_id in get_deleting_user_ids():
+        return
+
+    if set(RecipeStats.SOURCE_FIELDS) & instance.get_deferred_fields():
+        RecipeStats.objects.rebuild([instance.user_id])
+    else:
+        RecipeStats.objects.change(instance.user_id, removed=[instance.get_stats_values()])
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw, **kwargs):
+    """Start the stats of new users, saving their first recipe a rebuild"""
+
+    if created and not raw:
+        RecipeStats.objects.create(user=instance)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    get_deleting_user_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    get_deleting_user_ids().discard(instance.pk)
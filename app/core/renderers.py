@@ -0,0 +1,71 @@
+"""JSON renderer using orjson when it is installed"""
+
+import math
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+def has_non_finite_float(value) -> bool:
+    """Whether NaN or an infinity is nested in dicts, lists or tuples of ``value``"""
+
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(has_non_finite_float(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(has_non_finite_float(item) for item in value)
+
+    return False
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """Drop-in ``JSONRenderer`` encoding with orjson
+
+    Produces the same bytes as DRF for compact, unicode output: Decimals,
+    lazy strings and other types orjson does not know go through DRF's
+    encoder, datetimes in UTC end with ``Z`` and U+2028/U+2029 are escaped.
+    Pretty printing, ASCII output or a missing orjson use the stdlib path.
+
+    orjson writes NaN and infinities as ``null`` and fails on integers
+    beyond 64 bits. Data with either is rendered by DRF instead, which
+    raises on NaN or writes it depending on ``STRICT_JSON``. Only data whose
+    output has a ``null`` is searched for NaN. The search doesn't see floats
+    returned by DRF's encoder for other types, such as Decimals when
+    ``COERCE_DECIMAL_TO_STRING`` is off.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=JSONEncoder().default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib handles
+            return super().render(data, accepted_media_type, renderer_context)
+        if b"null" in ret and has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+
+        return ret
@@ -0,0 +1,6 @@
+"""Custom signals of the core app"""
+
+from django.dispatch import Signal
+
+# Sent with user_id and collections whenever a CollectionVersion is bumped
+collection_changed = Signal()
@@ -0,0 +1,49 @@
+"""Helpers asserting that endpoints stay within a SQL query budget"""
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin failing when a block of code runs too many queries
+
+    Unlike ``assertNumQueries`` the budget is an upper bound, so adding an
+    index or dropping a query never breaks the test, while an N+1 does.
+    """
+
+    dataset_sizes = (1, 10, 50)
+
+    @contextmanager
+    def assertQueryBudget(self, budget: int):
+        """Fail if the wrapped block executes more than ``budget`` queries"""
+
+        with CaptureQueriesContext(connection) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget is {budget}\n\nCaptured:\n{queries}"
+            )
+
+    def assertQueryBudgetHolds(self, budget: int, seed, request):
+        """Fail if ``request()`` goes over budget while ``seed(size)`` grows data
+
+        ``seed`` is called before each measurement with the next size from
+        ``dataset_sizes`` and should add that many rows. ``request`` has to
+        return a response, which must not be an error.
+        """
+
+        for size in self.dataset_sizes:
+            seed(size)
+
+            with self.assertQueryBudget(budget):
+                response = request()
+
+            self.assertLess(response.status_code, 400, getattr(response, "data", None))
@@ -1,6 +1,15 @@
+from decimal import Decimal
+from unittest import mock
+
+from core.admin import EstimatedCountPaginator
+from core.models import Recipe, RecipeQuerySet, Tag
 from django.contrib.auth import get_user_model  # noqa
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 from django.test import TestCase  # noqa
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 
@@ -41,3 +50,149 @@ class AdminSiteTests(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
+
+
+class ScalableAdminTests(TestCase):
+    """Test recipe and tag change lists are paged by keyset with bounded costs"""
+
+    def setUp(self):
+        user_manager = get_user_model().objects
+        self.client = Client()
+        self.admin = user_manager.create_superuser(
+            email="admin@example.com", password="somepassword1234"
+        )
+        self.user = user_manager.create_user(email="user@example.com", password="testpass123")
+        self.client.force_login(self.admin)
+
+    def create_recipes(self, count):
+        return [
+            Recipe.objects.create(
+                user=self.user, title=f"Recipe {number}", time_minutes=5, price=Decimal("1.00")
+            )
+            for number in range(count)
+        ]
+
+    def test_changelist_query_count(self):
+        """Test users are joined and more rows don't add queries"""
+
+        url = reverse("admin:core_recipe_changelist")
+
+        def get_query_count():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.create_recipes(2)
+        few = get_query_count()
+        self.create_recipes(30)
+
+        self.assertEqual(get_query_count(), few)
+
+    def test_keyset_pages(self):
+        """Test next links walk all recipes, newest first, without offsets"""
+
+        recipes = self.create_recipes(5)
+        url = reverse("admin:core_recipe_changelist")
+        seen = []
+
+        with mock.patch("core.admin.RecipeAdmin.list_per_page", 2):
+            response = self.client.get(url)
+            while True:
+                seen += [recipe.pk for recipe in response.context["cl"].result_list]
+                next_url = response.context["cl"].next_page_url
+                if next_url is None:
+                    break
+                response = self.client.get(url + next_url)
+
+        self.assertEqual(seen, [recipe.pk for recipe in reversed(recipes)])
+        self.assertContains(response, "First page")
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are reported like bad filters"""
+
+        response = self.client.get(reverse("admin:core_recipe_changelist"), {"after": "x"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("e=1", response.url)
+
+    def test_estimated_count(self):
+        """Test counts stop being exact past the limit"""
+
+        self.create_recipes(3)
+
+        with mock.patch.object(EstimatedCountPaginator, "exact_count_limit", 2):
+            response = self.client.get(reverse("admin:core_recipe_changelist"))
+
+        self.assertTrue(response.context["cl"].result_count_estimated)
+        self.assertContains(response, "~2 recipes")
+
+    def search(self, url_name, term, **params):
+        response = self.client.get(reverse(url_name), {"q": term, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    def test_search(self):
+        """Test searching recipes, and tags and users by case-insensitive prefix"""
+
+        self.create_recipes(2)
+        Tag.objects.create(user=self.user, name="Plant based")
+        Tag.objects.create(user=self.user, name="Plant")
+        Tag.objects.create(user=self.user, name="Houseplant")
+
+        recipes = self.search("admin:core_recipe_changelist", "Recipe 1")
+        tags = self.search("admin:core_tag_changelist", "PLANT")
+        users = self.search("admin:core_user_changelist", "USER@")
+
+        self.assertEqual([recipe.title for recipe in recipes.result_list], ["Recipe 1"])
+        self.assertEqual([tag.name for tag in tags.result_list], ["Plant", "Plant based"])
+        self.assertEqual(list(users.result_list), [self.user])
+        self.assertEqual(list(self.search("admin:core_tag_changelist", "based").result_list), [])
+
+    def test_ranked_search_keeps_rank_order(self):
+        """Test ranked recipe matches are listed by rank, not by the keyset"""
+
+        search = RecipeQuerySet.search
+        for minutes in (5, 30, 10):
+            Recipe.objects.create(
+                user=self.user, title="Curry", time_minutes=minutes, price=Decimal("1.00")
+            )
+
+        def ranked_search(queryset, text):
+            return search(queryset, text).annotate(
+                rank=Cast(F("time_minutes"), FloatField())
+            ).order_by("-rank", "-id")
+
+        with mock.patch.object(RecipeQuerySet, "search", ranked_search), \
+                mock.patch("core.admin.RecipeAdmin.list_per_page", 2):
+            changelist = self.search("admin:core_recipe_changelist", "curry")
+            with_cursor = self.search("admin:core_recipe_changelist", "curry", after=1)
+
+        for result in (changelist, with_cursor):
+            self.assertEqual([recipe.time_minutes for recipe in result.result_list], [30, 10])
+            self.assertIsNone(result.next_page_url)
+
+    def test_change_recipe_tags(self):
+        """Test tags picked by id are set through the link signals"""
+
+        recipe = self.create_recipes(1)[0]
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        other = Tag.objects.create(user=self.admin, name="Other")
+        url = reverse("admin:core_recipe_change", args=[recipe.pk])
+        payload = {
+            "user": self.user.pk,
+            "title": recipe.title,
+            "time_minutes": 5,
+            "price": "1.00",
+            "tags": f"{vegan.pk},{other.pk}",
+        }
+
+        rejected = self.client.post(url, payload)
+        payload["tags"] = str(vegan.pk)
+        response = self.client.post(url, payload)
+
+        self.assertEqual(rejected.status_code, 200)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(recipe.tags.all()), [vegan])
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.usage_count, 1)
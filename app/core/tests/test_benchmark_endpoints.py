@@ -0,0 +1,165 @@
+"""Tests for the endpoint benchmark command"""
+
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from core.management.commands.benchmark_endpoints import Fixture
+from core.models import Recipe
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.test import TransactionTestCase, override_settings
+
+
+class BenchmarkEndpointsTests(TransactionTestCase):
+    """Test running scenarios, writing and comparing results"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "results.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, *args, allow_remote=True):
+        # Tests run without DEBUG
+        if allow_remote:
+            args += ("--allow-remote",)
+        out = StringIO()
+        call_command(
+            "benchmark_endpoints",
+            "--requests=3",
+            "--recipes=3",
+            "--concurrency=1",
+            "--host=testserver",
+            "--scenario=recipes:recipe-",
+            *args,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_writes_results(self):
+        """Test every scenario is measured without errors and data is removed"""
+
+        self.benchmark(f"--output={self.output}")
+
+        with open(self.output) as output:
+            report = json.load(output)
+        results = {result["name"]: result for result in report["results"]}
+        self.assertIn("get recipes:recipe-list", results)
+        self.assertIn("delete recipes:recipe-detail", results)
+        for result in results.values():
+            self.assertEqual(result["requests"], 3)
+            self.assertEqual(result["errors"], 0, result["name"])
+            self.assertGreater(result["queries_per_request"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_compare_fails_on_regression(self):
+        """Test a p95 regression beyond the limit fails the command"""
+
+        report = {
+            "meta": {},
+            "results": [
+                {"name": "get recipes:recipe-list", "p95_ms": 0.001, "queries_per_request": 0}
+            ],
+        }
+        with open(self.output, "w") as output:
+            json.dump(report, output)
+
+        out = self.benchmark("--scenario=get recipes:recipe-list", f"--compare={self.output}")
+        self.assertIn("get recipes:recipe-list", out)
+
+        with self.assertRaises(CommandError):
+            self.benchmark(
+                "--scenario=get recipes:recipe-list",
+                f"--compare={self.output}",
+                "--max-regression=10",
+            )
+
+    def test_closes_worker_connections(self):
+        """Test the worker threads close their database connections"""
+
+        opened = []
+        wrapper_class = type(connections[DEFAULT_DB_ALIAS])
+        close = wrapper_class.close
+
+        def record(sender, connection, **kwargs):
+            if threading.current_thread() is not threading.main_thread():
+                opened.append(connection)
+
+        connection_created.connect(record)
+        try:
+            # SQLite keeps in-memory test databases open, so watch the calls
+            with mock.patch.object(
+                wrapper_class, "close", autospec=True, side_effect=close
+            ) as closed:
+                self.benchmark("--scenario=get recipes:recipe-list", "--concurrency=2")
+        finally:
+            connection_created.disconnect(record)
+
+        self.assertTrue(opened)
+        closed_connections = [call.args[0] for call in closed.call_args_list]
+        for worker_connection in opened:
+            self.assertIn(worker_connection, closed_connections)
+
+    def test_session_and_password_scenarios(self):
+        """Test the admin and token scenarios pass with the random password"""
+
+        self.benchmark(
+            "--scenario=admin:index", "--scenario=user:token", f"--output={self.output}"
+        )
+
+        with open(self.output) as output:
+            results = {result["name"]: result for result in json.load(output)["results"]}
+        for name in ("get admin:index", "post user:token"):
+            self.assertEqual(results[name]["errors"], 0, name)
+
+    def test_fixture_user(self):
+        """Test the sample user is staff, no superuser, with a random password"""
+
+        first, second = Fixture(recipes=1, disposable=0), Fixture(recipes=1, disposable=0)
+
+        self.assertNotEqual(first.password, second.password)
+        self.assertTrue(first.user.check_password(first.password))
+        self.assertTrue(first.user.is_staff)
+        self.assertFalse(first.user.is_superuser)
+        self.assertTrue(first.user.has_perm("core.view_recipe"))
+        self.assertFalse(first.user.has_perm("core.change_recipe"))
+
+    def test_refuses_without_debug(self):
+        """Test the command refuses to run without DEBUG unless allowed"""
+
+        with self.assertRaisesMessage(CommandError, "--allow-remote"):
+            self.benchmark(allow_remote=False)
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    @override_settings(DEBUG=True)
+    def test_runs_with_debug_locally(self):
+        """Test the command runs with DEBUG against a local database"""
+
+        out = self.benchmark("--scenario=get recipes:recipe-list", allow_remote=False)
+
+        self.assertIn("get recipes:recipe-list", out)
+
+    @override_settings(DEBUG=True)
+    def test_refuses_remote_database(self):
+        """Test the command refuses a database on another host unless allowed"""
+
+        database = connections[DEFAULT_DB_ALIAS]
+        settings_dict = {**database.settings_dict, "HOST": "db.example.com"}
+        with mock.patch.object(database, "vendor", "postgresql"), \
+                mock.patch.object(database, "settings_dict", settings_dict):
+            with self.assertRaisesMessage(CommandError, "--allow-remote"):
+                self.benchmark(allow_remote=False)
+
+        self.assertFalse(get_user_model().objects.exists())
@@ -1,32 +1,131 @@
 """Test custom Django management commands"""
 
 
-from unittest.mock import patch
+import threading
+import time
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
-from django.core.management import call_command
-from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.core.management import CommandError, call_command
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import SimpleTestCase, TestCase
 from psycopg2 import OperationalError as Psycopg2Error
 
 
-@patch("core.management.commands.wait_for_db.Command.check")
+@patch("core.management.commands.wait_for_db.Command.check_database")
 class CommandTests(SimpleTestCase):
     def test_wait_for_db_ready(self, patched_check):
         """Test waiting for database if db is ready"""
-        patched_check.return_value = True
+        patched_check.return_value = None
 
-        call_command("wait_for_db")
+        with patch("time.sleep") as patched_sleep:
+            call_command("wait_for_db", stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=["default"])
+        patched_check.assert_called_once_with("default", False)
+        patched_sleep.assert_not_called()
 
     @patch("time.sleep")
-    def test_wait_for_db_delay(self, _, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test waiting for db when getting Operational Error"""
         patched_check.side_effect = (
-            [Psycopg2Error] * 2 + [OperationalError] * 3 + [True]
+            [Psycopg2Error] * 2 + [OperationalError] * 3 + [None]
         )
 
-        call_command("wait_for_db")
+        call_command("wait_for_db", stdout=StringIO())
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=["default"])
+        patched_check.assert_called_with("default", False)
+
+    @patch("time.sleep")
+    def test_wait_for_db_backoff(self, patched_sleep, patched_check):
+        """Test pauses start short and double up to the maximum delay"""
+        patched_check.side_effect = [OperationalError] * 6 + [None]
+
+        call_command("wait_for_db", "--max-delay=0.3", stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays, [0.05, 0.1, 0.2, 0.3, 0.3, 0.3])
+
+    @patch("time.sleep")
+    def test_wait_for_db_deadline(self, patched_sleep, patched_check):
+        """Test giving up once the timeout is spent"""
+        patched_check.side_effect = OperationalError("connection refused")
+
+        with self.assertRaisesMessage(CommandError, "default (connection refused)"):
+            call_command("wait_for_db", "--timeout=0", stdout=StringIO())
+
+        patched_sleep.assert_not_called()
+
+    @patch("time.sleep")
+    def test_wait_for_db_all_databases(self, patched_sleep, patched_check):
+        """Test every alias is checked and only failing ones are retried"""
+
+        def check(alias, migrations):
+            if alias == "replica" and patched_check.call_count < 4:
+                raise OperationalError
+
+        patched_check.side_effect = check
+        databases = MagicMock()
+        databases.__iter__.return_value = iter(["default", "replica"])
+
+        with patch("core.management.commands.wait_for_db.connections", databases):
+            call_command("wait_for_db", stdout=StringIO())
+
+        aliases = [call.args[0] for call in patched_check.call_args_list]
+        self.assertEqual(sorted(aliases[:2]), ["default", "replica"])
+        self.assertEqual(aliases[2:], ["replica", "replica"])
+
+    @patch("core.management.commands.wait_for_db.MIN_ATTEMPT_TIMEOUT", 0.1)
+    def test_wait_for_db_stuck_probe(self, patched_check):
+        """Test a probe that never answers doesn't hold the command past its timeout"""
+        released = threading.Event()
+        self.addCleanup(released.set)
+        patched_check.side_effect = lambda alias, migrations: released.wait()
+
+        started = time.monotonic()
+        with self.assertRaisesMessage(CommandError, "default (no answer within"):
+            call_command("wait_for_db", "--timeout=0.2", stdout=StringIO())
+
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_wait_for_db_connect_timeout(self, patched_check):
+        """Test PostgreSQL connection attempts give up at the deadline"""
+        databases = ConnectionHandler(
+            {
+                "default": {
+                    "ENGINE": "django.db.backends.postgresql",
+                    "NAME": "db",
+                    "OPTIONS": {"sslmode": "prefer"},
+                },
+            }
+        )
+        params = []
+        patched_check.side_effect = lambda alias, migrations: params.append(
+            databases[alias].get_connection_params()
+        )
+
+        with patch("core.management.commands.wait_for_db.connections", databases):
+            call_command("wait_for_db", "--timeout=2.5", stdout=StringIO())
+
+        self.assertEqual(params[0]["connect_timeout"], 3)
+        self.assertEqual(params[0]["sslmode"], "prefer")
+        self.assertNotIn("connect_timeout", databases.settings["default"]["OPTIONS"])
+
+
+class WaitForMigrationsTests(TestCase):
+    """Test waiting for migrations against the test database"""
+
+    def test_migrations_applied(self):
+        """Test the command returns when no migration is pending"""
+
+        call_command("wait_for_db", "--migrations", "--timeout=0", stdout=StringIO())
+
+    @patch("django.db.migrations.executor.MigrationExecutor.migration_plan")
+    def test_migrations_pending(self, patched_plan):
+        """Test unapplied migrations keep the database not ready"""
+        patched_plan.return_value = [("migration", False)]
+
+        with self.assertRaisesMessage(CommandError, "1 unapplied migrations"):
+            call_command(
+                "wait_for_db", "--migrations", "--timeout=0", stdout=StringIO()
+            )
@@ -0,0 +1,277 @@
+"""Tests for the database connection pool"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from core.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout, close_pools, get_pool_stats
+from django.core.signals import setting_changed
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+
+def create_pool(**params):
+    defaults = {
+        "max_size": 2,
+        "timeout": 1,
+        "max_lifetime": 60,
+        "check_interval": 60,
+        "check": lambda connection: connection.execute("SELECT 1"),
+        "reset": lambda connection: True,
+    }
+    defaults.update(params)
+
+    return ConnectionPool(**defaults)
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the pool with in-memory SQLite connections"""
+
+    def test_released_connection_is_reused(self):
+        """Test a released connection is handed out again"""
+
+        pool = create_pool()
+
+        connection = pool.acquire(connect)
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(connect), connection)
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+
+    def test_pool_is_bounded(self):
+        """Test checkouts beyond the size time out"""
+
+        pool = create_pool(max_size=1, timeout=0.05, name="default")
+        pool.acquire(connect)
+
+        with self.assertRaises(PoolTimeout), self.assertLogs("core.db.pool", "WARNING") as logs:
+            pool.acquire(connect)
+
+        self.assertIn("Connection pool default timed out", logs.output[0])
+        self.assertIn("'timeouts': 1", logs.output[0])
+
+        stats = pool.stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["peak_in_use"], 1)
+
+    def test_waiting_checkout(self):
+        """Test a checkout waits for a release and records the wait"""
+
+        pool = create_pool(max_size=1)
+        connection = pool.acquire(connect)
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+
+        self.assertIs(pool.acquire(connect), connection)
+
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_time_max"], 0)
+
+    def test_broken_connection_replaced(self):
+        """Test an idle connection failing its check is replaced"""
+
+        pool = create_pool(check_interval=0)
+        connection = pool.acquire(connect)
+        pool.release(connection)
+        connection.close()
+
+        replacement = pool.acquire(connect)
+
+        self.assertIsNot(replacement, connection)
+        self.assertEqual(pool.stats()["discarded"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_failed_reset_closes_connection(self):
+        """Test a connection failing its reset is not pooled"""
+
+        pool = create_pool(reset=lambda connection: False)
+        pool.release(pool.acquire(connect))
+
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+    def test_exited_thread_connection_reclaimed(self):
+        """Test a connection kept by an exited thread is closed to make room"""
+
+        pool = create_pool(max_size=1)
+        kept = []
+        thread = threading.Thread(target=lambda: kept.append(pool.acquire(connect)))
+        thread.start()
+        thread.join()
+
+        connection = pool.acquire(connect)
+
+        self.assertIsNot(connection, kept[0])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            kept[0].execute("SELECT 1")
+        stats = pool.stats()
+        self.assertEqual(stats["reclaimed"], 1)
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_waiting_checkout_reclaims(self):
+        """Test a waiting checkout gets the slot of a thread exiting meanwhile"""
+
+        pool = create_pool(max_size=1)
+        release = threading.Event()
+
+        def hold():
+            pool.acquire(connect)
+            release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        threading.Timer(0.05, release.set).start()
+
+        pool.acquire(connect)
+
+        thread.join()
+        self.assertEqual(pool.stats()["reclaimed"], 1)
+        self.assertEqual(pool.stats()["waits"], 1)
+
+    def test_close_reclaims(self):
+        """Test closing a pool also closes connections of exited threads"""
+
+        pool = create_pool()
+        thread = threading.Thread(target=pool.acquire, args=[connect])
+        thread.start()
+        thread.join()
+
+        pool.close()
+
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def test_expired_connection_replaced(self):
+        """Test connections are not reused past their lifetime"""
+
+        pool = create_pool(max_lifetime=0)
+        connection = pool.acquire(connect)
+        pool.release(connection)
+
+        self.assertIsNot(pool.acquire(connect), connection)
+
+    def test_stats_logged_every_interval(self):
+        """Test releases log the stats once per interval"""
+
+        pool = create_pool(name="default", stats_interval=0.05)
+        connection = pool.acquire(connect)
+        time.sleep(0.06)
+
+        with self.assertLogs("core.db.pool", "INFO") as logs:
+            pool.release(connection)
+            pool.release(pool.acquire(connect))
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Connection pool default: {'max_size': 2", logs.output[0])
+
+
+class PostgresResetTests(SimpleTestCase):
+    """Test released PostgreSQL connections keep no session state"""
+
+    def test_reset_discards_session_state(self):
+        """Test the reset rolls back and runs DISCARD ALL outside a transaction"""
+
+        connection = mock.MagicMock(closed=0, autocommit=False)
+        connection.get_transaction_status.return_value = (
+            extensions.TRANSACTION_STATUS_INTRANS
+        )
+        cursor = connection.cursor.return_value.__enter__.return_value
+        autocommit = []
+        cursor.execute.side_effect = lambda sql: autocommit.append(connection.autocommit)
+
+        reset = PostgresDatabaseWrapper.reset_pooled_connection(None, connection)
+
+        self.assertTrue(reset)
+        connection.rollback.assert_called_once_with()
+        cursor.execute.assert_called_once_with("DISCARD ALL")
+        self.assertEqual(autocommit, [True])
+        self.assertFalse(connection.autocommit)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the pooled SQLite backend"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.connections = ConnectionHandler(
+            {
+                "default": {},
+                "pooled": {
+                    "ENGINE": "core.db.backends.sqlite3",
+                    "NAME": self.path,
+                    "POOL": {"MAX_SIZE": 2},
+                },
+            }
+        )
+
+    def tearDown(self):
+        self.connections.close_all()
+        close_pools()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def query(self):
+        with self.connections["pooled"].cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()
+
+    def test_connections_are_pooled(self):
+        """Test closing a connection returns it to the pool"""
+
+        self.assertEqual(self.query(), (1,))
+        self.connections["pooled"].close()
+        self.assertEqual(self.query(), (1,))
+        self.connections["pooled"].close()
+
+        stats = get_pool_stats()["pooled"]
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_close_in_transaction_discards(self):
+        """Test a connection closed inside atomic() is not reused"""
+
+        connection = self.connections["pooled"]
+        connection.set_autocommit(False)
+        self.query()
+        connection.in_atomic_block = True
+        connection.close()
+        connection.in_atomic_block = False
+
+        self.assertEqual(get_pool_stats()["pooled"]["size"], 0)
+
+    def test_destroy_test_db_closes_pool(self):
+        """Test the pool is closed before its test database is dropped"""
+
+        self.query()
+        self.connections["pooled"].close()
+        self.assertEqual(get_pool_stats()["pooled"]["idle"], 1)
+
+        self.connections["pooled"].creation._destroy_test_db(self.path, verbosity=0)
+
+        self.assertNotIn("pooled", get_pool_stats())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_databases_setting_change_closes_pools(self):
+        """Test changing DATABASES closes the pools"""
+
+        self.query()
+        self.connections["pooled"].close()
+
+        setting_changed.send(sender=None, setting="DATABASES", value={}, enter=True)
+
+        self.assertNotIn("pooled", get_pool_stats())
@@ -0,0 +1,75 @@
+"""Tests for password hashing"""
+
+from io import StringIO
+
+from core.executors import get_executor
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+def get_iterations(encoded: str) -> int:
+    return int(encoded.split("$")[1])
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PasswordHashingTests(TestCase):
+    """Test hashing runs on the password executor with a tunable cost"""
+
+    def test_hashing_uses_executor(self):
+        """Test creating a user and logging in hash on the password executor"""
+
+        submitted = get_executor("password").stats()["submitted"]
+
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpass123"
+        )
+
+        self.assertTrue(user.check_password("testpass123"))
+        self.assertFalse(user.check_password("wrongpass"))
+        self.assertEqual(get_executor("password").stats()["submitted"], submitted + 3)
+
+    def test_configured_iterations(self):
+        """Test new hashes use PASSWORD_HASH_ITERATIONS"""
+
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpass123"
+        )
+
+        self.assertEqual(identify_hasher(user.password).algorithm, "pbkdf2_sha256")
+        self.assertEqual(get_iterations(user.password), 1000)
+
+    def test_upgrade_on_login(self):
+        """Test a hash with another cost is re-encoded on successful login"""
+
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpass123"
+        )
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertFalse(user.check_password("wrongpass"))
+            user.refresh_from_db()
+            self.assertEqual(get_iterations(user.password), 1000)
+
+            self.assertTrue(user.check_password("testpass123"))
+            user.refresh_from_db()
+            self.assertEqual(get_iterations(user.password), 2000)
+            self.assertTrue(user.check_password("testpass123"))
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports hashes per second per cost"""
+
+        out = StringIO()
+
+        call_command(
+            "benchmark_password_hashing",
+            "--iterations=1000",
+            "--iterations=2000",
+            "--count=4",
+            stdout=out,
+        )
+
+        self.assertIn("1000 iterations", out.getvalue())
+        self.assertIn("2000 iterations", out.getvalue())
+        self.assertIn("hashes/s", out.getvalue())
@@ -0,0 +1,142 @@
+"""Tests for the orjson based renderer and parser"""
+
+import io
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+PAYLOAD = OrderedDict(
+    [
+        ("id", 1),
+        ("price", Decimal("5.25")),
+        ("title", "Crème brûlée \u2028 \u2029"),
+        ("created", datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)),
+        ("local", datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2)))),
+        ("day", date(2024, 1, 2)),
+        ("message", gettext_lazy("Not found.")),
+        ("tags", [{"name": "Vegan", "id": 1}]),
+        ("link", None),
+    ]
+)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test rendering matches DRF's renderer byte for byte"""
+
+    def test_same_output_as_drf(self):
+        """Test Decimals, datetimes, lazy strings and separators match"""
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD)
+        )
+
+    def test_indent_uses_stdlib(self):
+        """Test pretty printing still works"""
+
+        rendered = FastJSONRenderer().render(
+            {"id": 1}, "application/json; indent=4", {}
+        )
+
+        self.assertEqual(rendered, b'{\n    "id": 1\n}')
+
+    def test_big_integers(self):
+        """Test integers orjson cannot encode fall back to the stdlib"""
+
+        self.assertEqual(FastJSONRenderer().render({"id": 2 ** 70}), b'{"id":%d}' % 2 ** 70)
+
+    def test_non_finite_floats(self):
+        """Test NaN and infinities are rejected, or written when not strict"""
+
+        data = {"price": 1.5, "averages": [None, float("nan")], "max": float("inf")}
+        with self.assertRaisesMessage(ValueError, "Out of range float values"):
+            JSONRenderer().render(data)
+
+        with self.assertRaisesMessage(ValueError, "Out of range float values"):
+            FastJSONRenderer().render(data)
+        with patch.object(FastJSONRenderer, "strict", False), \
+                patch.object(JSONRenderer, "strict", False):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render({"price": None, "max": 1.5}), b'{"price":null,"max":1.5}'
+        )
+
+    def test_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed"""
+
+        with patch("core.renderers.orjson", None):
+            rendered = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(rendered, JSONRenderer().render(PAYLOAD))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test parsing matches DRF's parser"""
+
+    def parse(self, body: bytes, parser=None):
+        return (parser or FastJSONParser()).parse(io.BytesIO(body))
+
+    def test_same_result_as_drf(self):
+        """Test parsed data equals DRF's"""
+
+        body = '{"title": "Crème", "price": 5.25, "tags": [{"name": "x"}]}'.encode()
+
+        self.assertEqual(self.parse(body), self.parse(body, JSONParser()))
+
+    def test_invalid_json(self):
+        """Test malformed bodies and NaN raise DRF's parse error"""
+
+        for body in (b"{", b"", b'{"price": NaN}', b'{"price": -Infinity}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as drf_error:
+                    self.parse(body, JSONParser())
+                with self.assertRaises(ParseError) as error:
+                    self.parse(body)
+
+                self.assertEqual(error.exception.detail, drf_error.exception.detail)
+
+    def test_values_orjson_rejects(self):
+        """Test big integers and numbers, and lone surrogates parse like DRF"""
+
+        bodies = (
+            b'{"id": 123456789012345678901234567890}',
+            b'{"id": -9223372036854775809}',
+            b'{"price": 1e400}',
+            b'{"title": "\\ud800"}',
+        )
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.parse(body), self.parse(body, JSONParser()))
+
+        self.assertIsInstance(self.parse(b"[123456789012345678901234567890]")[0], int)
+
+    def test_other_encoding_uses_stdlib(self):
+        """Test bodies that are not UTF-8 are decoded by the stdlib"""
+
+        data = FastJSONParser().parse(
+            io.BytesIO('{"title": "Crème"}'.encode("latin-1")),
+            parser_context={"encoding": "latin-1"},
+        )
+
+        self.assertEqual(data, {"title": "Crème"})
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports both paths"""
+
+        out = StringIO()
+
+        call_command("benchmark_json", "--size=5", "--repeat=2", stdout=out)
+
+        self.assertIn("render:", out.getvalue())
+        self.assertIn("parse:", out.getvalue())
+        self.assertIn("rendered output identical", out.getvalue())
@@ -2,9 +2,11 @@
 Test user model
 """
 from decimal import Decimal
+from unittest import mock
 
 from core import models
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
 
@@ -75,3 +77,105 @@ class ModelTest(TestCase):
         tag = models.Tag.objects.create(user=user, name="A Tag name")
 
         self.assertEqual(str(tag), tag.name)
+
+    def test_tag_name_unique_per_user(self):
+        """Test a user can't have two tags with the same name"""
+
+        user = get_user_model().objects.create_user("test6@example.com", "testpass1234")
+        other_user = get_user_model().objects.create_user(
+            "test7@example.com", "testpass1234"
+        )
+        models.Tag.objects.create(user=user, name="Vegan")
+        models.Tag.objects.create(user=other_user, name="Vegan")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Vegan")
+
+    def test_get_or_create_tags_for_names(self):
+        """Test resolving tag names reuses existing tags and creates missing"""
+
+        user = get_user_model().objects.create_user("test8@example.com", "testpass1234")
+        existing = models.Tag.objects.create(user=user, name="Vegan")
+
+        with self.assertNumQueries(4):
+            tags = models.Tag.objects.get_or_create_for_names(
+                user, ["Vegan", "Dinner", "Dinner", "Quick"]
+            )
+
+        self.assertEqual(list(tags), ["Vegan", "Dinner", "Quick"])
+        self.assertEqual(tags["Vegan"], existing)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 3)
+
+    def test_recipe_version_bumped_on_change(self):
+        """Test saving a recipe or changing its tags bumps its version"""
+
+        user = get_user_model().objects.create_user("test9@example.com", "testpass1234")
+        recipe = models.Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+        tag = models.Tag.objects.create(user=user, name="Dinner")
+
+        recipe.title = "Hot soup"
+        recipe.save()
+        recipe.tags.add(tag)
+        tag.name = "Supper"
+        tag.save()
+        recipe.refresh_from_db()
+
+        self.assertEqual(recipe.version, 4)
+
+    def test_collection_version_bumped_on_change(self):
+        """Test changes to recipes and tags bump the user's collections"""
+
+        user = get_user_model().objects.create_user("test10@example.com", "testpass1234")
+        recipe = models.Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+        models.Tag.objects.create(user=user, name="Dinner").delete()
+        recipe.delete()
+
+        versions = dict(
+            models.CollectionVersion.objects.filter(user=user).values_list(
+                "collection", "version"
+            )
+        )
+
+        self.assertEqual(versions, {"recipes": 4, "tags": 2})
+
+    def test_delete_user_with_recipes(self):
+        """Test deleting a user does not recreate its collection versions"""
+
+        user = get_user_model().objects.create_user("test11@example.com", "testpass1234")
+        recipe = models.Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+        recipe.tags.add(models.Tag.objects.create(user=user, name="Dinner"))
+
+        user.delete()
+
+        self.assertFalse(models.CollectionVersion.objects.filter(user_id=user.id).exists())
+        connection.check_constraints()
+
+    def test_delete_recipes_unsignalled(self):
+        """Test recipes are deleted without running the delete receivers"""
+
+        user = get_user_model().objects.create_user("test12@example.com", "testpass1234")
+        recipe = models.Recipe.objects.create(
+            user=user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+
+        with self.assertNumQueries(1):
+            deleted = models.Recipe.objects.filter(id=recipe.id).delete_unsignalled()
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(models.Recipe.objects.exists())
+        self.assertEqual(models.RecipeStats.objects.get(user=user).recipe_count, 1)
+
+    def test_delete_recipes_unsignalled_refuses_references(self):
+        """Test the unsignalled delete refuses models it wouldn't cascade to"""
+
+        relation = mock.Mock(related_model=models.Tag)
+
+        with mock.patch.object(models.Recipe._meta, "related_objects", [relation]):
+            with self.assertRaisesMessage(TypeError, "core.Tag"):
+                models.Recipe.objects.all().delete_unsignalled()
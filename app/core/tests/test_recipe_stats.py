@@ -0,0 +1,137 @@
+"""Tests for the incrementally maintained recipe stats"""
+
+import json
+from decimal import Decimal
+from io import StringIO
+
+from core.models import Recipe, RecipeStats
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.test import TestCase
+from recipe.batch import RecipeBatch
+from recipe.transfer import ROW_READERS, RecipeImporter
+
+
+def create_recipe(user, price, time_minutes=5):
+    return Recipe.objects.create(
+        user=user, title="Sample", time_minutes=time_minutes, price=Decimal(price)
+    )
+
+
+class RecipeStatsTests(TestCase):
+    """Test stats match aggregates over the recipes after every kind of write"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("test@example.com", "testpass123")
+
+    def assertStatsMatchRecipes(self, user=None):
+        user = user or self.user
+        expected = Recipe.objects.filter(user=user).aggregate(
+            recipe_count=Count("id"),
+            price_total=Sum("price"),
+            time_minutes_total=Sum("time_minutes"),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+        stats = RecipeStats.objects.get(user=user)
+
+        self.assertEqual(
+            {key: getattr(stats, key) for key in expected},
+            {
+                **expected,
+                "price_total": expected["price_total"] or 0,
+                "time_minutes_total": expected["time_minutes_total"] or 0,
+            },
+        )
+
+    def test_new_user(self):
+        """Test users start with empty stats"""
+
+        stats = RecipeStats.objects.with_averages().get(user=self.user)
+
+        self.assertEqual(stats.recipe_count, 0)
+        self.assertIsNone(stats.min_price)
+        self.assertIsNone(stats.average_price)
+        self.assertIsNone(stats.average_time_minutes)
+
+    def test_create_update_delete(self):
+        """Test saving and deleting recipes, including the minimum and maximum"""
+
+        cheap = create_recipe(self.user, "1.00", 10)
+        dear = create_recipe(self.user, "9.99", 20)
+        create_recipe(self.user, "4.50", 30)
+        self.assertStatsMatchRecipes()
+
+        cheap.price = Decimal("3.00")
+        cheap.save()
+        dear.time_minutes = 1
+        dear.save()
+        self.assertStatsMatchRecipes()
+
+        dear.delete()
+        self.assertStatsMatchRecipes()
+
+        Recipe.objects.all().delete()
+        self.assertStatsMatchRecipes()
+
+    def test_deferred_save(self):
+        """Test saving recipes loaded without the stats fields"""
+
+        recipe = create_recipe(self.user, "2.00")
+        recipe = Recipe.objects.only("id", "title").get(pk=recipe.pk)
+
+        recipe.price = Decimal("6.00")
+        recipe.save()
+
+        self.assertStatsMatchRecipes()
+
+    def test_bulk_writers(self):
+        """Test import and batch keep the stats exact"""
+
+        soup = create_recipe(self.user, "1.00")
+        stew = create_recipe(self.user, "8.00")
+        rows = [
+            json.dumps({"title": "Imported", "time_minutes": 7, "price": price})
+            for price in ("0.50", "12.25")
+        ]
+        RecipeImporter(self.user, {}).run(ROW_READERS["application/x-ndjson"](rows))
+        self.assertStatsMatchRecipes()
+
+        _, applied = RecipeBatch(self.user, {}).run(
+            [
+                {"op": "create", "data": {"title": "New", "time_minutes": 3, "price": "0.25"}},
+                {"op": "update", "id": soup.id, "data": {"price": "99.00"}},
+                {"op": "delete", "id": stew.id},
+            ]
+        )
+        self.assertTrue(applied)
+        self.assertStatsMatchRecipes()
+
+    def test_averages_match_aggregates(self):
+        """Test averages have the precision of Avg over the recipes"""
+
+        for price, minutes in (("1.00", 3), ("2.00", 4), ("2.01", 4)):
+            create_recipe(self.user, price, minutes)
+
+        stats = RecipeStats.objects.with_averages().get(user=self.user)
+        expected = Recipe.objects.aggregate(Avg("price"), Avg("time_minutes"))
+
+        self.assertEqual(str(stats.average_price), str(expected["price__avg"]))
+        self.assertEqual(stats.average_time_minutes, expected["time_minutes__avg"])
+
+    def test_rebuild_command(self):
+        """Test drifted and missing stats are recomputed"""
+
+        other = get_user_model().objects.create_user("other@example.com", "testpass123")
+        create_recipe(self.user, "3.00")
+        create_recipe(other, "4.00")
+        RecipeStats.objects.filter(user=self.user).update(recipe_count=9, min_price=None)
+        RecipeStats.objects.filter(user=other).delete()
+        out = StringIO()
+
+        call_command("rebuild_recipe_stats", "--batch-size=1", stdout=out)
+
+        self.assertIn("Recipe stats of 2 users rebuilt", out.getvalue())
+        self.assertStatsMatchRecipes()
+        self.assertStatsMatchRecipes(other)
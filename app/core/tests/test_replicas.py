@@ -0,0 +1,286 @@
+"""Tests for read replica routing, with an SQLite database as replica"""
+
+import asyncio
+import time
+from decimal import Decimal
+from unittest import mock
+
+from app.asgi import ASGI_URLCONF
+from asgiref.sync import sync_to_async
+from core.checks import check_replica_cache
+from core.db.replicas import ReplicaRouter, clear_replica_health, get_pin_key
+from core.models import Recipe
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test import AsyncClient, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from recipe import async_views
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+REPLICA = "replica_test"
+RECIPES_URL = reverse("recipes:recipe-list")
+REPLICA_SETTINGS = {
+    "ALIASES": [REPLICA],
+    "STICKY_SECONDS": 10,
+    "MAX_LAG_SECONDS": 5,
+    "CHECK_INTERVAL": 60,
+    "CACHE_ALIAS": "shared",
+}
+
+
+class ReplicaTestMixin:
+    """Register an in-memory SQLite replica around the tests of a class
+
+    Only for these tests and so unknown to the test runner. Nothing
+    replicates into it, rows are copied by the tests.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Named, so the connections of all threads share it
+        connections.databases[REPLICA] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"file:{REPLICA}_{cls.__name__}?mode=memory&cache=shared",
+        }
+        # The router keeps real replicas from being migrated
+        with override_settings(DATABASE_ROUTERS=[]):
+            call_command("migrate", database=REPLICA, verbosity=0)
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def tearDown(self):
+        # The runner's flush skips the tables the router doesn't migrate
+        with override_settings(DATABASE_ROUTERS=[]):
+            call_command(
+                "flush",
+                database=REPLICA,
+                interactive=False,
+                inhibit_post_migrate=True,
+                verbosity=0,
+            )
+        super().tearDown()
+
+    def replicate(self, title="On replica"):
+        """Copy the user and a recipe to the replica, without signals"""
+
+        get_user_model().objects.using(REPLICA).bulk_create([self.user])
+        Recipe.objects.using(REPLICA).bulk_create(
+            [Recipe(user=self.user, title=title, time_minutes=5, price=Decimal("1.00"))]
+        )
+
+
+@override_settings(DATABASE_REPLICAS=REPLICA_SETTINGS)
+class ReplicaRoutingTests(ReplicaTestMixin, TransactionTestCase):
+    """Test safe API requests read from the replica unless it can't be trusted"""
+
+    databases = {DEFAULT_DB_ALIAS}
+
+    def setUp(self):
+        caches["shared"].clear()
+        clear_replica_health()
+        self.user = get_user_model().objects.create_user("test@example.com", "testpass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title="On primary", time_minutes=5, price=Decimal("1.00")
+        )
+
+    def get_titles(self):
+        response = self.client.get(RECIPES_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [recipe["title"] for recipe in response.data["results"]]
+
+    def test_safe_requests_read_replica(self):
+        """Test lists and details of recipes, tags and the user use the replica"""
+
+        self.replicate()
+
+        self.assertEqual(self.get_titles(), ["On replica"])
+        self.assertEqual(
+            self.client.get(reverse("recipes:tag-list")).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(self.client.get(reverse("user:me")).status_code, status.HTTP_200_OK)
+
+    def test_writes_pin_user_to_primary(self):
+        """Test writers read the primary until the sticky window ends"""
+
+        self.replicate()
+        payload = {"title": "Written", "time_minutes": 5, "price": "2.00"}
+
+        response = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Recipe.objects.using(REPLICA).filter(title="Written").exists())
+        self.assertEqual(self.get_titles(), ["Written", "On primary"])
+
+        caches["shared"].clear()
+        self.assertEqual(self.get_titles(), ["On replica"])
+
+    def test_unreachable_replica(self):
+        """Test reads fall back to the primary and the failure is remembered"""
+
+        with mock.patch.object(
+            connections[REPLICA], "ensure_connection", side_effect=OperationalError
+        ) as ensure_connection:
+            self.assertEqual(self.get_titles(), ["On primary"])
+            self.assertEqual(self.get_titles(), ["On primary"])
+
+        self.assertEqual(ensure_connection.call_count, 1)
+
+    def test_lagging_replica(self):
+        """Test replicas further behind than MAX_LAG_SECONDS are skipped"""
+
+        self.replicate()
+
+        with mock.patch("core.db.replicas.get_replica_lag", return_value=30):
+            self.assertEqual(self.get_titles(), ["On primary"])
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": []})
+    def test_no_replicas(self):
+        """Test everything reads the primary without replicas"""
+
+        self.replicate()
+
+        self.assertEqual(self.get_titles(), ["On primary"])
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """Test the router outside of requests"""
+
+    databases = {DEFAULT_DB_ALIAS}
+
+    def test_outside_request(self):
+        """Test the router leaves reads and writes outside requests alone"""
+
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(Recipe))
+        self.assertIsNone(router.db_for_write(Recipe))
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [REPLICA]})
+    def test_write_replica_instance(self):
+        """Test instances read from a replica are written to the primary"""
+
+        recipe = Recipe(title="Read")
+        recipe._state.db = REPLICA
+
+        self.assertEqual(ReplicaRouter().db_for_write(Recipe, instance=recipe), DEFAULT_DB_ALIAS)
+
+    def test_reads_in_transaction(self):
+        """Test reads in a transaction use the primary"""
+
+        router = ReplicaRouter()
+
+        with mock.patch("core.db.replicas._routing") as routing:
+            routing.get.return_value.alias = REPLICA
+            self.assertEqual(router.db_for_read(Recipe), REPLICA)
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Recipe))
+
+    def test_cache_table_read_from_primary(self):
+        """Test database cache entries are read from the primary"""
+
+        with mock.patch("core.db.replicas._routing") as routing:
+            routing.get.return_value.alias = REPLICA
+            model = caches["shared"].cache_model_class
+            self.assertIsNone(ReplicaRouter().db_for_read(model))
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [REPLICA]})
+    def test_only_primary_migrated(self):
+        """Test replicas are never migrated"""
+
+        router = ReplicaRouter()
+
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, "core", "recipe"))
+        self.assertFalse(router.allow_migrate(REPLICA, "core", "recipe"))
+
+
+@override_settings(ROOT_URLCONF=ASGI_URLCONF, DATABASE_REPLICAS=REPLICA_SETTINGS)
+class AsyncReplicaTests(ReplicaTestMixin, TransactionTestCase):
+    """Test the middleware under ASGI"""
+
+    databases = {DEFAULT_DB_ALIAS}
+
+    def setUp(self):
+        caches["shared"].clear()
+        clear_replica_health()
+        self.user = get_user_model().objects.create_user("test@example.com", "testpass123")
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Token {Token.objects.create(user=self.user).key}"}
+
+    async def test_concurrent_reads(self):
+        """Test reads from the replica are not handled one at a time"""
+
+        await sync_to_async(self.replicate)()
+        render = async_views._render
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.3)
+            return render(*args, **kwargs)
+
+        started = time.perf_counter()
+        with mock.patch("recipe.async_views._render", side_effect=slow_render):
+            responses = await asyncio.gather(
+                *[self.client.get(RECIPES_URL, **self.headers) for _ in range(4)]
+            )
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.9)
+        for response in responses:
+            self.assertEqual(response.json()["results"][0]["title"], "On replica")
+
+    async def test_writes_pin_user_to_primary(self):
+        """Test writes over ASGI pin the writer to the primary"""
+
+        response = await self.client.post(
+            RECIPES_URL,
+            {"title": "Written", "time_minutes": 5, "price": "2.00"},
+            content_type="application/json",
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pinned = await sync_to_async(caches["shared"].get)(get_pin_key(self.user.pk))
+        self.assertTrue(pinned)
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    """Test the check of the cache keeping writers on the primary"""
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [REPLICA], "CACHE_ALIAS": "default"})
+    def test_process_local_cache(self):
+        """Test a cache local to each worker is refused"""
+
+        errors = check_replica_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["core.E001"])
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [REPLICA], "CACHE_ALIAS": "missing"})
+    def test_missing_cache(self):
+        """Test an unknown cache alias is refused"""
+
+        self.assertEqual(len(check_replica_cache(None)), 1)
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [REPLICA], "CACHE_ALIAS": "shared"})
+    def test_shared_cache(self):
+        """Test a cache shared by the workers passes"""
+
+        self.assertEqual(check_replica_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": [], "CACHE_ALIAS": "default"})
+    def test_no_replicas(self):
+        """Test any cache passes without replicas"""
+
+        self.assertEqual(check_replica_cache(None), [])
@@ -0,0 +1,103 @@
+"""Tests for the denormalized tag usage counters"""
+
+from decimal import Decimal
+from io import StringIO
+
+from core.models import Recipe, RecipeTag, Tag
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+
+class TagUsageCountTests(TestCase):
+    """Test counters follow tag links changed through the ORM"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("test@example.com", "testpass123")
+        self.vegan, self.quick, self.cheap = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Vegan", "Quick", "Cheap")
+        ]
+        self.soup, self.salad = [
+            Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=Decimal("2.00")
+            )
+            for title in ("Soup", "Salad")
+        ]
+
+    def assertCountsMatchLinks(self):
+        actual = dict(
+            Tag.objects.annotate(total=Count("recipetag")).values_list("id", "total")
+        )
+
+        self.assertEqual(dict(Tag.objects.values_list("id", "usage_count")), actual)
+
+    def get_count(self, tag):
+        return Tag.objects.get(pk=tag.pk).usage_count
+
+    def test_add_remove_clear(self):
+        """Test adding, removing and clearing tags of a recipe"""
+
+        self.soup.tags.add(self.vegan, self.quick)
+        self.soup.tags.add(self.vegan)
+        self.salad.tags.add(self.vegan)
+        self.assertEqual(self.get_count(self.vegan), 2)
+
+        self.soup.tags.remove(self.quick, self.cheap)
+        self.assertCountsMatchLinks()
+
+        self.soup.tags.clear()
+        self.assertEqual(self.get_count(self.vegan), 1)
+        self.assertCountsMatchLinks()
+
+    def test_reverse_relation(self):
+        """Test changing the recipes of a tag"""
+
+        self.vegan.recipe_set.add(self.soup, self.salad)
+        self.assertEqual(self.get_count(self.vegan), 2)
+
+        self.vegan.recipe_set.remove(self.soup)
+        self.assertEqual(self.get_count(self.vegan), 1)
+
+        self.vegan.recipe_set.clear()
+        self.assertEqual(self.get_count(self.vegan), 0)
+
+    def test_recipe_deleted(self):
+        """Test deleting recipes, one and in bulk, lowers the counts"""
+
+        self.soup.tags.add(self.vegan, self.quick)
+        self.salad.tags.add(self.vegan)
+
+        self.soup.delete()
+        self.assertCountsMatchLinks()
+
+        Recipe.objects.all().delete()
+        self.assertEqual(self.get_count(self.vegan), 0)
+
+    def test_tag_save_keeps_count(self):
+        """Test saving a stale tag instance doesn't overwrite its count"""
+
+        stale = Tag.objects.get(pk=self.vegan.pk)
+        self.soup.tags.add(self.vegan)
+
+        stale.name = "Plant based"
+        stale.save()
+
+        self.assertEqual(self.get_count(self.vegan), 1)
+
+    def test_repair_command(self):
+        """Test drifted counters are recomputed"""
+
+        self.soup.tags.add(self.vegan, self.quick)
+        RecipeTag.objects.create(recipe=self.salad, tag=self.vegan)
+        Tag.objects.filter(pk=self.cheap.pk).update(usage_count=7)
+        out = StringIO()
+
+        call_command("repair_tag_usage", "--dry-run", stdout=out)
+        self.assertIn("2 tag usage counts drifted", out.getvalue())
+        self.assertEqual(self.get_count(self.cheap), 7)
+
+        call_command("repair_tag_usage", "--batch-size=2", stdout=out)
+        self.assertIn("2 tag usage counts repaired", out.getvalue())
+        self.assertCountsMatchLinks()
@@ -0,0 +1,144 @@
+"""Tests for the sampled request timing middleware"""
+
+import asyncio
+import time
+from decimal import Decimal
+from unittest import mock
+
+from app.asgi import ASGI_URLCONF
+from core.models import Recipe, Tag
+from core.timing import get_current_timings
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from recipe import async_views
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+
+SAMPLED = {
+    "SAMPLE_RATE": 1.0,
+    "HEADER": True,
+    "SLOW_REQUEST_MS": 60000,
+    "SLOW_QUERY_MS": 60000,
+}
+
+
+def parse_server_timing(header: str) -> dict:
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+
+    return metrics
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    """Test timings, headers and slow logs of sampled requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+        recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price=Decimal("5.00")
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+    def test_not_sampled_by_default(self):
+        """Test requests are not measured when sampling is off"""
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertIsNone(get_current_timings())
+
+    @override_settings(REQUEST_TIMING=SAMPLED)
+    def test_server_timing_header(self):
+        """Test queries, serializer and render time are reported"""
+
+        response = self.client.get(RECIPES_URL)
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(list(metrics), ["db", "serialize", "render", "total"])
+        self.assertEqual(metrics["db"]["desc"], '"3 queries"')
+        self.assertGreater(float(metrics["serialize"]["dur"]), 0)
+        self.assertGreater(float(metrics["render"]["dur"]), 0)
+        self.assertIsNone(get_current_timings())
+
+    @override_settings(REQUEST_TIMING={**SAMPLED, "HEADER": False})
+    def test_header_disabled(self):
+        """Test the header can be turned off"""
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(REQUEST_TIMING={**SAMPLED, "SLOW_REQUEST_MS": 0})
+    def test_slow_request_logged(self):
+        """Test slow requests are logged with the view and their timings"""
+
+        with self.assertLogs("core.timing", "WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        record = logs.records[-1]
+        self.assertIn("RecipeViewSet.list", record.getMessage())
+        self.assertEqual(record.view, "RecipeViewSet.list")
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.queries, 3)
+        self.assertIn("serialize_ms", record.__dict__)
+
+    @override_settings(REQUEST_TIMING={**SAMPLED, "SLOW_QUERY_MS": 0})
+    def test_slow_query_logged(self):
+        """Test slow queries are logged with the view and their SQL"""
+
+        with self.assertLogs("core.timing", "WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertTrue(logs.records)
+        for record in logs.records:
+            self.assertEqual(record.view, "RecipeViewSet.list")
+            self.assertIn("SELECT", record.sql)
+
+
+@override_settings(
+    ROOT_URLCONF=ASGI_URLCONF,
+    MIDDLEWARE=["core.timing.RequestTimingMiddleware"],
+    REQUEST_TIMING=SAMPLED,
+)
+class AsyncRequestTimingTests(TransactionTestCase):
+    """Test sampled ASGI requests"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        Recipe.objects.create(user=user, title="Curry", time_minutes=30, price=Decimal("5.00"))
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Token {Token.objects.create(user=user).key}"}
+
+    async def test_concurrent_requests(self):
+        """Test requests are measured without being handled one at a time"""
+
+        render = async_views._render
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.3)
+            return render(*args, **kwargs)
+
+        started = time.perf_counter()
+        with mock.patch("recipe.async_views._render", side_effect=slow_render):
+            responses = await asyncio.gather(
+                *[self.client.get(RECIPES_URL, **self.headers) for _ in range(4)]
+            )
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.9)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            metrics = parse_server_timing(response["Server-Timing"])
+            self.assertNotEqual(metrics["db"]["desc"], '"0 queries"')
@@ -0,0 +1,247 @@
+"""Sampled per-request timings reported as Server-Timing and slow logs
+
+A sampled request counts its SQL queries and their time on every database
+connection, in whichever thread they run, measures serializer and render
+time and reports them in a ``Server-Timing`` header. Requests and queries
+slower than the configured thresholds are logged with the view that
+handled them. Requests that are not sampled pass straight through. The
+middleware runs in sync and async mode, so ASGI requests don't queue up
+for a sync thread.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Durations in seconds measured while handling one request"""
+
+    def __init__(self, request):
+        self.request = request
+        self.view = None
+        self.queries = 0
+        self.durations = dict.fromkeys(("db", "serialize", "render"), 0.0)
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - started
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper counting and timing queries"""
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.durations["db"] += duration
+            if duration * 1000 >= settings.REQUEST_TIMING["SLOW_QUERY_MS"]:
+                logger.warning(
+                    "Slow query in %s: %.1f ms",
+                    self.view,
+                    duration * 1000,
+                    extra={
+                        "view": self.view,
+                        "database": context["connection"].alias,
+                        "duration_ms": round(duration * 1000, 3),
+                        "sql": sql,
+                        "many": many,
+                    },
+                )
+
+    def get_server_timing(self, total: float) -> str:
+        metrics = [f'db;dur={self.durations["db"] * 1000:.3f};desc="{self.queries} queries"']
+        metrics += [
+            f"{name};dur={self.durations[name] * 1000:.3f}" for name in ("serialize", "render")
+        ]
+        metrics.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(metrics)
+
+
+def _execute(execute, sql, params, many, context):
+    """Execute wrapper of every connection, timing queries of sampled requests"""
+
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    return timings(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def watch_connection(sender, connection, **kwargs):
+    """Route the queries of a connection through ``_execute``"""
+
+    # First, as execute_wrapper() blocks remove the last wrapper on exit
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+def get_current_timings():
+    """Return the timings of the sampled request being handled, if any"""
+
+    return _current.get()
+
+
+def measure(name: str):
+    """Add the time of the block to the current request's ``name`` duration"""
+
+    timings = _current.get()
+    if timings is None:
+        return contextlib.nullcontext()
+
+    return timings.measure(name)
+
+
+def get_view_name(view_func, request) -> str:
+    """Name views like ``RecipeViewSet.list`` or ``MangeUserView.get``"""
+
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{getattr(view_func, '__qualname__', view_func)}"
+
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{view_class.__name__}.{actions.get(method, method)}"
+
+
+class TimedSerializerMixin:
+    """Count the time spent building ``serializer.data`` as serialize time"""
+
+    @property
+    def data(self):
+        with measure("serialize"):
+            return super().data
+
+
+class RequestTimingMiddleware:
+    """Measure a sample of requests, see ``settings.REQUEST_TIMING``"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes Django await the middleware, and its hooks, which don't
+            # block, without a hop to a thread
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self._process_view_async
+            self.process_template_response = self._process_template_response_async
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = self.start(request)
+        if timings is None:
+            return self.get_response(request)
+
+        # Connections opened before this module was imported
+        for connection in connections.all():
+            watch_connection(None, connection)
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start(request)
+        if timings is None:
+            return await self.get_response(request)
+
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        return self.finish(request, response, timings)
+
+    @staticmethod
+    def start(request):
+        """Return timings for a sampled request, None for the others"""
+
+        config = settings.REQUEST_TIMING
+        if not config["SAMPLE_RATE"] or random.random() >= config["SAMPLE_RATE"]:
+            return None
+
+        return RequestTimings(request)
+
+    @staticmethod
+    def finish(request, response, timings):
+        config = settings.REQUEST_TIMING
+        total = time.perf_counter() - timings.started
+        if config["HEADER"]:
+            response["Server-Timing"] = timings.get_server_timing(total)
+        if total * 1000 >= config["SLOW_REQUEST_MS"]:
+            logger.warning(
+                "Slow request %s %s in %s: %.1f ms, %d queries",
+                request.method,
+                request.path,
+                timings.view,
+                total * 1000,
+                timings.queries,
+                extra={
+                    "view": timings.view,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round(total * 1000, 3),
+                    "queries": timings.queries,
+                    **{
+                        f"{name}_ms": round(duration * 1000, 3)
+                        for name, duration in timings.durations.items()
+                    },
+                },
+            )
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.view = get_view_name(view_func, request)
+
+    def process_template_response(self, request, response):
+        """Time rendering, which Django runs after this hook"""
+
+        timings = _current.get()
+        if timings is not None:
+            render = response.render
+
+            def timed_render():
+                with timings.measure("render"):
+                    return render()
+
+            response.render = timed_render
+
+        return response
+
+    async def _process_view_async(self, *args):
+        return type(self).process_view(self, *args)
+
+    async def _process_template_response_async(self, *args):
+        return type(self).process_template_response(self, *args)
@@ -0,0 +1,9 @@
+"""URL mappings for recipe app served over ASGI"""
+
+from django.urls import include, path
+from recipe.async_views import async_urlpatterns
+from recipe.urls import router
+
+app_name = "recipes"
+
+urlpatterns = [path("", include(async_urlpatterns(router.urls)))]
@@ -0,0 +1,63 @@
+"""Async entry points for recipe and tag reads served over ASGI
+
+Django 3.2 has no async ORM, so a read cannot await its queries directly.
+Instead the whole sync read, rendering included, runs in one hop on the
+bounded ``database`` pool of ``core.executors`` while the event loop keeps
+receiving requests and sending responses. The body of a streamed read, the
+export, is iterated on the same pool by ``app.asgi.AsyncReadASGIHandler``.
+Writes keep Django's default thread sensitive handling.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from core.executors import database_sync_to_async
+from rest_framework.permissions import SAFE_METHODS
+
+ASYNC_ROUTES = (
+    "recipe-list",
+    "recipe-detail",
+    "recipe-export",
+    "tag-list",
+    "tag-detail",
+)
+
+
+def _render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, "render", None)):
+        response.render()
+
+    return response
+
+
+def as_async_view(view):
+    """Wrap a sync DRF view so safe methods run on the database pool"""
+
+    write = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await database_sync_to_async(_render, view, request, *args, **kwargs)
+
+        return await write(request, *args, **kwargs)
+
+    return async_view
+
+
+def async_urlpatterns(urlpatterns, names=ASYNC_ROUTES):
+    """Copy ``urlpatterns`` replacing the views of the named routes"""
+
+    patterns = []
+    for pattern in urlpatterns:
+        if getattr(pattern, "name", None) in names:
+            pattern = type(pattern)(
+                pattern.pattern,
+                as_async_view(pattern.callback),
+                pattern.default_args,
+                pattern.name,
+            )
+        patterns.append(pattern)
+
+    return patterns
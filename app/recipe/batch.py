@@ -0,0 +1,248 @@
+"""Batches of recipe creates, updates and deletes applied in one transaction"""
+
+from collections import Counter, defaultdict
+
+from core.models import CollectionVersion, Recipe, RecipeStats, RecipeTag, Tag
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as translate
+from recipe.serializers import RecipeDetailsSerializer
+from recipe.transfer import bulk_create_recipes
+from rest_framework import status
+
+MAX_BATCH_OPERATIONS = 1000
+OPERATIONS = ("create", "update", "delete")
+STATUSES = {
+    "create": status.HTTP_201_CREATED,
+    "update": status.HTTP_200_OK,
+    "delete": status.HTTP_204_NO_CONTENT,
+}
+
+
+class RecipeBatch:
+    """Validate a list of operations together and apply them all or none
+
+    Operations look like ``{"op": "create", "data": {...}}``,
+    ``{"op": "update", "id": 1, "data": {...}}`` and
+    ``{"op": "delete", "id": 1}``. Updates are partial and, like single
+    updates, replace the tags when a non-empty list is given. The number of
+    queries does not grow with the batch: one lookup of the targets, one
+    tag lookup/insert, a bulk insert of new recipes (one insert per recipe
+    on backends that don't return primary keys), one bulk update, one
+    statement each for removed and added tag links and one ``DELETE`` of
+    the deleted recipes.
+    """
+
+    def __init__(self, user, context):
+        self.user = user
+        self.context = context
+
+    def run(self, operations) -> tuple:
+        """Return per-operation results and whether the batch was applied"""
+
+        if not isinstance(operations, list) or not operations:
+            return [self._error(translate("Expected a non-empty list"))], False
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return [
+                self._error(
+                    translate("At most %(limit)d operations are allowed")
+                    % {"limit": MAX_BATCH_OPERATIONS}
+                )
+            ], False
+
+        results, validated = self._validate(operations)
+        if any("errors" in result for result in results):
+            return results, False
+
+        with transaction.atomic():
+            created = iter(self._apply(validated))
+
+        for result, (op, _, _) in zip(results, validated):
+            if op == "create":
+                result["id"] = next(created).id
+            result["status"] = STATUSES[op]
+
+        return results, True
+
+    @staticmethod
+    def _error(message, code=status.HTTP_400_BAD_REQUEST, field="non_field_errors"):
+        return {"status": code, "errors": {field: [message]}}
+
+    def _validate(self, operations):
+        """Return a result per operation and the validated operations"""
+
+        ids = [
+            item.get("id")
+            for item in operations
+            if isinstance(item, dict) and item.get("op") in ("update", "delete")
+        ]
+        targets = {
+            recipe.id: recipe
+            for recipe in Recipe.objects.filter(
+                user=self.user, id__in=[pk for pk in ids if type(pk) is int]
+            ).defer("search_vector")
+        }
+
+        results = []
+        validated = []
+        seen = set()
+        for item in operations:
+            result = self._check(item, targets, seen)
+            results.append(result)
+            if "errors" in result:
+                continue
+
+            recipe = targets.get(item.get("id"))
+            if item["op"] == "delete":
+                validated.append(("delete", recipe, None))
+                continue
+
+            serializer = RecipeDetailsSerializer(
+                recipe,
+                data=item.get("data"),
+                partial=item["op"] == "update",
+                context=self.context,
+            )
+            if serializer.is_valid():
+                validated.append((item["op"], recipe, serializer.validated_data))
+            else:
+                result.update(status=status.HTTP_400_BAD_REQUEST, errors=serializer.errors)
+
+        return results, validated
+
+    def _check(self, item, targets, seen) -> dict:
+        """Return the result of an operation, with errors if it is malformed"""
+
+        if not isinstance(item, dict):
+            return self._error(translate("Expected an object"))
+
+        op = item.get("op")
+        if op not in OPERATIONS:
+            return {
+                "op": op,
+                **self._error(translate("Choose one of: create, update, delete"), field="op"),
+            }
+        if op == "create":
+            return {"op": op}
+
+        pk = item.get("id")
+        if type(pk) is not int or pk not in targets:
+            return {
+                "op": op,
+                "id": pk,
+                **self._error(translate("Not found."), status.HTTP_404_NOT_FOUND, "id"),
+            }
+        if pk in seen:
+            return {
+                "op": op,
+                "id": pk,
+                **self._error(
+                    translate("Recipe appears in more than one operation"), field="id"
+                ),
+            }
+        seen.add(pk)
+
+        return {"op": op, "id": pk}
+
+    def _apply(self, validated) -> list:
+        """Write the validated operations, return the created recipes"""
+
+        created = [data for op, _, data in validated if op == "create"]
+        updated = [(recipe, data) for op, recipe, data in validated if op == "update"]
+        deleted = [recipe.id for op, recipe, _ in validated if op == "delete"]
+
+        tags = Tag.objects.get_or_create_for_names(
+            self.user,
+            sorted(
+                {
+                    tag["name"]
+                    for data in created + [data for _, data in updated]
+                    for tag in data.get("tags") or []
+                }
+            ),
+        )
+
+        recipes = [
+            Recipe(user=self.user, **{key: value for key, value in data.items() if key != "tags"})
+            for data in created
+        ]
+        bulk_create_recipes(recipes)
+        links = [
+            RecipeTag(recipe_id=recipe.id, tag_id=tags[name].id)
+            for recipe, data in zip(recipes, created)
+            for name in dict.fromkeys(tag["name"] for tag in data.get("tags") or [])
+        ]
+        usage = Counter()
+        if updated:
+            links += self._update(updated, tags, usage)
+        usage.update(link.tag_id for link in links)
+        RecipeTag.objects.bulk_create(links, ignore_conflicts=True)
+
+        changed = [
+            (recipe._stats_values, recipe.get_stats_values()) for recipe, _ in updated
+        ]
+        changed = [(old, new) for old, new in changed if old != new]
+        stats = {"added": [new for _, new in changed], "removed": [old for old, _ in changed]}
+
+        if deleted:
+            doomed_links = RecipeTag.objects.filter(recipe_id__in=deleted)
+            usage.subtract(doomed_links.values_list("tag_id", flat=True))
+            doomed_links.delete()
+            Recipe.objects.filter(user=self.user, id__in=deleted).delete_unsignalled()
+            stats["removed"] += [
+                recipe.get_stats_values() for op, recipe, _ in validated if op == "delete"
+            ]
+
+        if stats["added"] or stats["removed"]:
+            RecipeStats.objects.change(self.user.pk, **stats)
+
+        Tag.objects.change_usage_counts(usage)
+        CollectionVersion.objects.bump(
+            self.user.pk, [CollectionVersion.RECIPES, CollectionVersion.TAGS]
+        )
+
+        return recipes
+
+    def _update(self, updated, tags, usage) -> list:
+        """Bulk update recipes and drop removed tag links, return new links
+
+        Removed links are subtracted from the ``usage`` counter.
+        """
+
+        now = timezone.now()
+        fields = {"version", "updated_at"}
+        for recipe, data in updated:
+            for key, value in data.items():
+                if key != "tags":
+                    setattr(recipe, key, value)
+                    fields.add(key)
+            recipe.version += 1
+            recipe.updated_at = now
+        Recipe.objects.bulk_update([recipe for recipe, _ in updated], sorted(fields))
+
+        retagged = {
+            recipe.id: {tag["name"] for tag in data["tags"]}
+            for recipe, data in updated
+            if data.get("tags")
+        }
+        current = defaultdict(dict)
+        for link_id, recipe_id, tag_id, name in RecipeTag.objects.filter(
+            recipe_id__in=list(retagged)
+        ).values_list("id", "recipe_id", "tag_id", "tag__name"):
+            current[recipe_id][name] = (link_id, tag_id)
+
+        removed = [
+            link
+            for recipe_id, names in retagged.items()
+            for name, link in current[recipe_id].items()
+            if name not in names
+        ]
+        if removed:
+            RecipeTag.objects.filter(id__in=[link_id for link_id, _ in removed]).delete()
+            usage.subtract(tag_id for _, tag_id in removed)
+
+        return [
+            RecipeTag(recipe_id=recipe_id, tag_id=tags[name].id)
+            for recipe_id, names in retagged.items()
+            for name in sorted(names - current[recipe_id].keys())
+        ]
@@ -0,0 +1,76 @@
+"""Per-user response cache for recipe REST API reads
+
+Rendered responses are keyed by the version of what they show, the same
+database versions the ETags of ``recipe.conditional`` come from. A write
+bumps them when it commits, so every worker misses its stale responses from
+then on, without waiting for a TTL or an invalidation message.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from recipe.conditional import get_collection_version, get_fingerprint, get_object_version
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE["CACHE_ALIAS"]]
+
+
+def get_version(request, resource, pk):
+    """Return the version of a collection name or of a model's object ``pk``"""
+
+    if isinstance(resource, str):
+        return get_collection_version(request, resource)
+
+    return get_object_version(request, resource, pk)
+
+
+def cached_response(resource):
+    """Decorate a list or retrieve action to serve it from the response cache
+
+    ``resource`` is the collection name of a list action or the model of a
+    retrieve action. Responses are keyed by user, version of the resource,
+    action, full path and negotiated renderer. Only successful responses
+    are stored.
+    """
+
+    label = resource if isinstance(resource, str) else resource._meta.label
+
+    def decorator(action):
+        @wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            config = settings.RESPONSE_CACHE
+            if not config["ENABLED"]:
+                return action(view, request, *args, **kwargs)
+
+            version = get_version(request, resource, kwargs.get("pk"))
+            if version is None:
+                return action(view, request, *args, **kwargs)
+
+            cache = get_cache()
+            key = "response:{}:{}:{}".format(
+                request.user.pk, view.action, get_fingerprint(request, label, *version)
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = action(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key,
+                        (rendered.content, rendered["Content-Type"]),
+                        timeout=config["TIMEOUT"],
+                    )
+                )
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+"""Conditional GET support for recipe REST API
+
+ETags and Last-Modified dates come from version columns, so an unchanged
+resource is answered with 304 Not Modified before any serializer runs.
+"""
+
+import hashlib
+
+from core.models import CollectionVersion
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def get_fingerprint(request, *parts) -> str:
+    """Hash version parts together with everything shaping the response"""
+
+    renderer = getattr(request, "accepted_renderer", None)
+    key = ":".join(
+        str(part)
+        for part in (*parts, request.get_full_path(), getattr(renderer, "format", ""))
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def get_collection_version(request, collection):
+    """Return ``(version, updated_at)`` of a collection, queried once per request"""
+
+    attribute = f"_{collection}_collection_version"
+    if not hasattr(request, attribute):
+        version = (
+            CollectionVersion.objects.filter(user=request.user, collection=collection)
+            .values_list("version", "updated_at")
+            .first()
+        )
+        setattr(request, attribute, version or (0, None))
+
+    return getattr(request, attribute)
+
+
+def get_object_version(request, model, pk):
+    """Return ``(version, updated_at)`` of a user's object or None if missing"""
+
+    attribute = f"_{model._meta.model_name}_{pk}_version"
+    if not hasattr(request, attribute):
+        try:
+            version = (
+                model.objects.filter(user=request.user, pk=pk)
+                .values_list("version", "updated_at")
+                .first()
+            )
+        except (TypeError, ValueError):
+            version = None
+        setattr(request, attribute, version)
+
+    return getattr(request, attribute)
+
+
+def collection_condition(collection: str):
+    """Decorate a list action to honour If-None-Match / If-Modified-Since"""
+
+    def etag(request, *args, **kwargs):
+        version, updated_at = get_collection_version(request, collection)
+        return get_fingerprint(request, request.user.pk, collection, version, updated_at)
+
+    def last_modified(request, *args, **kwargs):
+        return get_collection_version(request, collection)[1]
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
+
+
+def object_condition(model):
+    """Decorate a retrieve action to honour If-None-Match / If-Modified-Since"""
+
+    def etag(request, pk=None, *args, **kwargs):
+        version = get_object_version(request, model, pk)
+        return version and get_fingerprint(request, model._meta.label, pk, *version)
+
+    def last_modified(request, pk=None, *args, **kwargs):
+        version = get_object_version(request, model, pk)
+        return version and version[1]
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
@@ -0,0 +1,114 @@
+"""Django command comparing the instance and values() list serializers"""
+
+import time
+import uuid
+from decimal import Decimal
+
+from core.models import Recipe, RecipeTag, Tag
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipe.serializers import RecipeSerializer
+from recipe.transfer import IMPORT_BATCH_SIZE, bulk_create_recipes
+from recipe.views import TAGS_PREFETCH
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+COLUMNS = [field for field in RecipeSerializer.Meta.fields if field != "tags"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render recipe lists through model instances and through values() rows "
+        "and compare time and output. Sample data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000, 100000],
+            help="Numbers of recipes to render (default: 1000 10000 100000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per measurement, the fastest one counts (default: 3)",
+        )
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=2,
+            help="Tags per recipe (default: 2)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(max(options["sizes"]), options["tags"])
+
+            for size in options["sizes"]:
+                instances = Recipe.objects.filter(user=user).order_by("-id")[:size]
+                rows = Recipe.objects.filter(user=user).order_by("-id")[:size]
+
+                slow, slow_output = self.measure(
+                    options["repeat"],
+                    lambda: serializers.ListSerializer(
+                        instances.only(*COLUMNS).prefetch_related(TAGS_PREFETCH),
+                        child=RecipeSerializer(),
+                    ).data,
+                )
+                fast, fast_output = self.measure(
+                    options["repeat"],
+                    lambda: RecipeSerializer(rows.values("id", *COLUMNS), many=True).data,
+                )
+
+                self.stdout.write(
+                    f"{size:>7} rows: instances {slow * 1000:9.1f} ms, "
+                    f"values {fast * 1000:9.1f} ms, {slow / fast:5.1f}x faster, "
+                    f"output {'identical' if slow_output == fast_output else 'DIFFERENT'}"
+                )
+
+            transaction.set_rollback(True)
+
+    def seed(self, size: int, tags_per_recipe: int):
+        self.stdout.write(f"Creating {size} sample recipes...")
+        user = get_user_model().objects.create(
+            email=f"benchmark-{uuid.uuid4().hex}@example.com"
+        )
+        Tag.objects.bulk_create([Tag(user=user, name=f"Tag {number}") for number in range(10)])
+        tags = list(Tag.objects.filter(user=user))
+
+        for start in range(0, size, IMPORT_BATCH_SIZE):
+            recipes = [
+                Recipe(
+                    user=user,
+                    title=f"Recipe {number}",
+                    time_minutes=number % 90,
+                    price=Decimal(number % 5000) / 100,
+                    link=f"https://example.com/recipes/{number}",
+                )
+                for number in range(start, min(start + IMPORT_BATCH_SIZE, size))
+            ]
+            bulk_create_recipes(recipes)
+            RecipeTag.objects.bulk_create(
+                [
+                    RecipeTag(recipe_id=recipe.id, tag_id=tags[(recipe.id + offset) % 10].id)
+                    for recipe in recipes
+                    for offset in range(min(tags_per_recipe, len(tags)))
+                ]
+            )
+
+        return user
+
+    @staticmethod
+    def measure(repeat: int, serialize):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = JSONRenderer().render(serialize())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best, output
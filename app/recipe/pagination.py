@@ -0,0 +1,55 @@
+"""Pagination classes for recipe REST API"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over the newest recipes first
+
+    Pages are fetched with ``id < cursor`` on the ``(user_id, id)`` index,
+    so deep pages cost the same as the first one.
+    """
+
+    ordering = "-id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class TagCursorPagination(CursorPagination):
+    """Keyset pagination over tags in alphabetical order
+
+    Tag names are unique per user, so ``name`` alone positions the cursor
+    and the ``(user_id, name)`` unique index serves every page.
+    """
+
+    ordering = ("name", "id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class TagPopularityCursorPagination(TagCursorPagination):
+    """Keyset pagination over tags used by the most recipes first
+
+    Counts repeat, so the cursor keeps an offset within equal counts. The
+    ``(user_id, -usage_count, name)`` index serves the ordering.
+    """
+
+    ordering = ("-usage_count", "name", "id")
+
+
+class RecipeSearchCursorPagination(RecipeCursorPagination):
+    """Keyset pagination over search results, best match first
+
+    Ranked results are paged on ``(-rank, -id)`` with ``rank < cursor``.
+    Ranks repeat, so the cursor keeps an offset within equal ranks. No page
+    counts the matches. Searches without a rank, on databases other than
+    PostgreSQL, are paged newest first.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if "rank" in queryset.query.annotations:
+            return ("-rank", "-id")
+
+        return super().get_ordering(request, queryset, view)
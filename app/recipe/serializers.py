@@ -1,19 +1,147 @@
 """Serializers for Recipe REST API"""
 
-from core.models import Recipe, Tag
+from collections import OrderedDict, defaultdict
+
+from core.models import Recipe, RecipeStats, RecipeTag, Tag
+from core.timing import TimedSerializerMixin
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as translate
 from rest_framework import serializers
 
+RELATED_ROWS_BATCH_SIZE = 500
+
+
+class ValuesListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer rendering ``values()`` rows without model instances
+
+    Plain fields are converted with their own ``to_representation`` and
+    nested many-to-many serializers are filled from one query per batch of
+    rows, ordered by the nested serializer's ``Meta.ordering``. The output
+    is the same as rendering instances with their related objects in that
+    order. Rows need the primary key, instances are rendered as usual.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.Manager) else data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        pk_name = self.child.Meta.model._meta.pk.attname
+        pks = [row[pk_name] for row in rows]
+        related = {
+            field.field_name: self.get_related_rows(field, pks)
+            for field in self.child._readable_fields
+            if isinstance(field, serializers.ListSerializer)
+        }
+
+        render = get_row_renderer(self.child, related, pk_name)
+        return [render(row) for row in rows]
+
+    def get_related_rows(self, field, pks) -> dict:
+        """Map each primary key in ``pks`` to its rendered related rows"""
+
+        relation = self.child.Meta.model._meta.get_field(field.source)
+        source = f"{relation.m2m_field_name()}_id"
+        target = relation.m2m_reverse_field_name()
+        sources = [child.source for child in field.child._readable_fields]
+        ordering = getattr(field.child.Meta, "ordering", ["pk"])
+        render = get_row_renderer(field.child)
+
+        related = defaultdict(list)
+        for start in range(0, len(pks), RELATED_ROWS_BATCH_SIZE):
+            links = (
+                relation.remote_field.through.objects.filter(
+                    **{f"{source}__in": pks[start:start + RELATED_ROWS_BATCH_SIZE]}
+                )
+                .order_by(*[f"{target}__{name}" for name in ordering])
+                .values_list(source, *[f"{target}__{name}" for name in sources])
+            )
+            for owner, *values in links:
+                related[owner].append(render(dict(zip(sources, values))))
+
+        return related
+
+
+def get_row_renderer(serializer, related=None, pk_name=None):
+    """Return a function rendering a row like ``serializer.to_representation``
+
+    Nested list fields are looked up by ``row[pk_name]`` in ``related``.
+    """
+
+    fields = [
+        (
+            field.field_name,
+            field.source,
+            field.to_representation,
+            isinstance(field, serializers.ListSerializer),
+        )
+        for field in serializer._readable_fields
+    ]
+
+    def render(row: dict) -> OrderedDict:
+        output = OrderedDict()
+        for name, source, to_representation, is_related in fields:
+            if is_related:
+                output[name] = related[name].get(row[pk_name], [])
+                continue
+
+            value = row[source]
+            output[name] = None if value is None else to_representation(value)
+
+        return output
+
+    return render
+
+
+class SparseFieldsMixin:
+    """Render only the serializer fields named in the ``fields`` argument"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag views"""
 
     class Meta:
         model = Tag
         fields = ["name", "id"]
         read_only_fields = ["id"]
+        list_serializer_class = ValuesListSerializer
+        # Order of tags nested in recipes, the order the unique (recipe, tag)
+        # index returned them in before it was spelled out
+        ordering = ["id"]
+
+    def validate_name(self, value):
+        """Reject renaming a tag to a name the owner already uses"""
+
+        if self.instance is not None:
+            is_taken = (
+                Tag.objects.filter(user_id=self.instance.user_id, name=value)
+                .exclude(id=self.instance.id)
+                .exists()
+            )
+            if is_taken:
+                raise serializers.ValidationError(
+                    translate("Tag with this name already exists"), code="unique"
+                )
+
+        return value
+
+
+class TagUsageSerializer(TagSerializer):
+    """Serializer for tag views, adding how many recipes use each tag"""
 
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ["usage_count"]
+        read_only_fields = TagSerializer.Meta.read_only_fields + ["usage_count"]
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for recipes"""
 
     tags = TagSerializer(many=True, required=False)
@@ -22,32 +150,81 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ["id", "title", "time_minutes", "price", "link", "tags"]
         read_only_fields = ["id"]
+        list_serializer_class = ValuesListSerializer
 
     def create(self, validated_data):
         """Create a recipe with create tags within"""
 
         tags = validated_data.pop("tags", [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, recipe)
 
         return recipe
 
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags", None)
-        if tags:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+        with transaction.atomic():
+            if tags:
+                self._update_tags(tags, instance)
 
-        self._set_value_to_instance(instance, validated_data)
+            self._set_value_to_instance(instance, validated_data)
 
-        instance.save()
+            instance.save()
         return instance
 
     def _get_or_create_tags(self, tags, recipe):
+        """Attach tags by name, resolving all of them in one round trip"""
+
+        if not tags:
+            return
+
         current_user = self.context["request"].user
-        for tag in tags:
-            tag_entity, _ = Tag.objects.get_or_create(user=current_user, **tag)
-            recipe.tags.add(tag_entity)
+        tag_entities = Tag.objects.get_or_create_for_names(
+            current_user, [tag["name"] for tag in tags]
+        )
+        recipe.tags.add(*tag_entities.values())
+
+    def _update_tags(self, tags, recipe):
+        """Apply only the difference between the current and the given tags
+
+        Unchanged links are left alone, removed ones are deleted and new ones
+        inserted in one statement each, and only names the recipe doesn't
+        carry yet are resolved. The links are written directly, so the usage
+        counts are updated here. The caller saves the recipe, which bumps its
+        version and the recipe and tag collections.
+
+        The recipe row is locked first, so concurrent updates of its tags
+        take turns. Each one reads the links left by the previous one, and
+        the usage deltas match the rows it actually deletes and inserts. A
+        link added behind the lock's back fails the update instead of being
+        counted twice.
+        """
+
+        names = {tag["name"] for tag in tags}
+        list(Recipe.objects.select_for_update().filter(pk=recipe.pk).values_list("pk"))
+        current = dict(recipe.tags.values_list("name", "id"))
+        changes = {}
+
+        removed = [tag_id for name, tag_id in current.items() if name not in names]
+        if removed:
+            RecipeTag.objects.filter(recipe=recipe, tag_id__in=removed).delete()
+            changes.update(dict.fromkeys(removed, -1))
+
+        added = names - current.keys()
+        if added:
+            tag_entities = Tag.objects.get_or_create_for_names(
+                self.context["request"].user, sorted(added)
+            )
+            RecipeTag.objects.bulk_create(
+                [RecipeTag(recipe=recipe, tag=tag) for tag in tag_entities.values()]
+            )
+            changes.update(dict.fromkeys([tag.id for tag in tag_entities.values()], 1))
+
+        if changes:
+            Tag.objects.change_usage_counts(changes)
+            # Makes saving the recipe bump the tag collection too
+            recipe._tag_usage_changed = True
 
     def _set_value_to_instance(self, instance, validate_data):
         for key, value in validate_data.items():
@@ -59,3 +236,30 @@ class RecipeDetailsSerializer(RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ["description"]
+
+
+class RecipeStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for the recipe stats of a user, with the most used tags
+
+    Expects an instance from ``RecipeStats.objects.with_averages()`` and the
+    tag histogram as ``values()`` rows in ``tags``. Averages keep the
+    precision the database computed them with, like ``Avg`` would.
+    """
+
+    average_price = serializers.DecimalField(
+        max_digits=None, decimal_places=None, read_only=True, allow_null=True
+    )
+    average_time_minutes = serializers.FloatField(read_only=True, allow_null=True)
+    tags = TagUsageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = RecipeStats
+        fields = [
+            "recipe_count",
+            "average_price",
+            "min_price",
+            "max_price",
+            "average_time_minutes",
+            "tags",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,170 @@
+"""Tests for the async recipe read path served over ASGI"""
+
+import asyncio
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.asgi import ASGI_URLCONF, AsyncReadASGIHandler, application
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from recipe.views import RecipeViewSet
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+EXPORT_URL = reverse("recipes:recipe-export")
+
+
+def get_detail_url(recipe_id):
+    return reverse("recipes:recipe-detail", args=[recipe_id])
+
+
+class AsyncRoutingTests(TransactionTestCase):
+    """Test ASGI requests are routed to the async views"""
+
+    def test_asgi_requests_use_async_urlconf(self):
+        """Test the ASGI handler switches requests to the async urlconf"""
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": RECIPES_URL,
+            "query_string": b"",
+            "headers": [],
+        }
+
+        request, error_response = AsyncReadASGIHandler().create_request(scope, None)
+
+        self.assertIsNone(error_response)
+        self.assertEqual(request.urlconf, ASGI_URLCONF)
+
+    def test_only_reads_are_async(self):
+        """Test list, detail and export routes are async, other routes stay sync"""
+
+        for url in (RECIPES_URL, get_detail_url(1), TAGS_URL, EXPORT_URL):
+            self.assertTrue(
+                asyncio.iscoroutinefunction(resolve(url, ASGI_URLCONF).func)
+            )
+
+        batch = resolve(reverse("recipes:recipe-batch"), ASGI_URLCONF)
+        self.assertFalse(asyncio.iscoroutinefunction(batch.func))
+
+
+@override_settings(ROOT_URLCONF=ASGI_URLCONF)
+class AsyncReadApiTests(TransactionTestCase):
+    """Test recipe and tag endpoints through the async views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Token {token.key}"}
+
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price=Decimal("5.00")
+        )
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.recipe.tags.add(self.tag)
+
+    async def test_list_and_retrieve(self):
+        """Test reads return the same payload as the sync views"""
+
+        list_response = await self.client.get(RECIPES_URL, **self.headers)
+        detail_response = await self.client.get(
+            get_detail_url(self.recipe.id), **self.headers
+        )
+
+        self.assertEqual(list_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list_response.json()["results"][0]["title"], "Curry")
+        self.assertEqual(detail_response.json()["tags"], [{"name": "Vegan", "id": self.tag.id}])
+
+    async def test_concurrent_reads(self):
+        """Test concurrent reads are all answered"""
+
+        responses = await asyncio.gather(
+            *[self.client.get(TAGS_URL, **self.headers) for _ in range(10)]
+        )
+
+        self.assertEqual(
+            {response.status_code for response in responses}, {status.HTTP_200_OK}
+        )
+
+    async def test_unauthenticated_read(self):
+        """Test async reads still require authentication"""
+
+        response = await self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_writes_stay_sync(self):
+        """Test writes through the async urlconf still work"""
+
+        response = await self.client.post(
+            RECIPES_URL,
+            {"title": "Soup", "time_minutes": 10, "price": "2.00"},
+            content_type="application/json",
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        count = await sync_to_async(Recipe.objects.filter(user=self.user).count)()
+        self.assertEqual(count, 2)
+
+
+class AsyncStreamingTests(TransactionTestCase):
+    """Test streamed responses end to end through the ASGI application"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.token = Token.objects.create(user=self.user)
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f"Recipe {number}", time_minutes=5, price=1)
+            for number in range(5)
+        )
+
+    @patch.object(RecipeViewSet, "export_chunk_size", 2)
+    async def test_streamed_export(self):
+        """Test every chunk of the export is sent before the closing message"""
+
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": EXPORT_URL,
+                "query_string": b"",
+                "server": ("testserver", 80),
+                "headers": [(b"authorization", f"Token {self.token.key}".encode())],
+            },
+        )
+        await communicator.send_input({"type": "http.request"})
+
+        start = await communicator.receive_output(timeout=5)
+        messages = []
+        while not messages or messages[-1].get("more_body"):
+            messages.append(await communicator.receive_output(timeout=5))
+        await communicator.wait(timeout=5)
+        lines = b"".join(message.get("body", b"") for message in messages).splitlines()
+
+        self.assertEqual(start["type"], "http.response.start")
+        self.assertEqual(start["status"], status.HTTP_200_OK)
+        self.assertIn(
+            (b"Content-Disposition", b'attachment; filename="recipes.ndjson"'),
+            start["headers"],
+        )
+        self.assertEqual(len(messages), 4)
+        self.assertEqual(messages[-1], {"type": "http.response.body"})
+        self.assertEqual(
+            [json.loads(line)["title"] for line in lines],
+            [f"Recipe {number}" for number in range(5)],
+        )
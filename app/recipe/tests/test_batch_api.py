@@ -0,0 +1,175 @@
+"""Tests for the recipe batch endpoint"""
+
+from decimal import Decimal
+
+from core.models import CollectionVersion, Recipe, RecipeTag, Tag
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipe.batch import MAX_BATCH_OPERATIONS
+from rest_framework import status
+from rest_framework.test import APIClient
+
+BATCH_URL = reverse("recipes:recipe-batch")
+
+
+def create_recipe(user, title="Curry", **params):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=Decimal("5.00"), **params
+    )
+
+
+def create_payload(number):
+    return {
+        "op": "create",
+        "data": {
+            "title": f"New {number}",
+            "time_minutes": 5,
+            "price": "2.50",
+            "tags": [{"name": "Vegan"}, {"name": f"Tag {number}"}],
+        },
+    }
+
+
+class RecipeBatchApiTests(TestCase):
+    """Test applying batches of operations"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def post(self, operations):
+        return self.client.post(BATCH_URL, operations, format="json")
+
+    def test_create_update_delete(self):
+        """Test all operations are applied and reported in order"""
+
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        soup = create_recipe(self.user, "Soup")
+        soup.tags.add(vegan, Tag.objects.create(user=self.user, name="Winter"))
+        stew = create_recipe(self.user, "Stew")
+        version = CollectionVersion.objects.get(
+            user=self.user, collection=CollectionVersion.RECIPES
+        ).version
+
+        response = self.post(
+            [
+                create_payload(1),
+                {
+                    "op": "update",
+                    "id": soup.id,
+                    "data": {"title": "Hot soup", "tags": [{"name": "Vegan"}, {"name": "Hot"}]},
+                },
+                {"op": "delete", "id": stew.id},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        created = Recipe.objects.get(title="New 1")
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"op": "create", "id": created.id, "status": 201},
+                {"op": "update", "id": soup.id, "status": 200},
+                {"op": "delete", "id": stew.id, "status": 204},
+            ],
+        )
+        self.assertEqual(
+            sorted(created.tags.values_list("name", flat=True)), ["Tag 1", "Vegan"]
+        )
+        soup.refresh_from_db()
+        self.assertEqual(soup.title, "Hot soup")
+        self.assertEqual(soup.version, 3)
+        self.assertEqual(sorted(soup.tags.values_list("name", flat=True)), ["Hot", "Vegan"])
+        self.assertFalse(Recipe.objects.filter(id=stew.id).exists())
+        self.assertFalse(RecipeTag.objects.filter(recipe_id=stew.id).exists())
+        self.assertGreater(
+            CollectionVersion.objects.get(
+                user=self.user, collection=CollectionVersion.RECIPES
+            ).version,
+            version,
+        )
+
+    def test_partial_update_keeps_tags(self):
+        """Test updates without tags leave the tags alone"""
+
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+        response = self.post([{"op": "update", "id": recipe.id, "data": {"time_minutes": 7}}])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.time_minutes, 7)
+        self.assertEqual(recipe.title, "Curry")
+        self.assertEqual(list(recipe.tags.values_list("name", flat=True)), ["Vegan"])
+
+    def test_invalid_batch_applies_nothing(self):
+        """Test one invalid operation rejects the whole batch with per-item errors"""
+
+        recipe = create_recipe(self.user)
+        other = create_recipe(
+            get_user_model().objects.create_user("other@example.com", "somepassword")
+        )
+
+        response = self.post(
+            [
+                create_payload(1),
+                {"op": "update", "id": recipe.id, "data": {"price": "not a price"}},
+                {"op": "delete", "id": other.id},
+                {"op": "delete", "id": recipe.id},
+                {"op": "rename"},
+                "delete",
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = response.data["results"]
+        self.assertEqual(results[0], {"op": "create"})
+        self.assertIn("price", results[1]["errors"])
+        self.assertEqual(results[2]["status"], 404)
+        self.assertEqual(results[3]["status"], 400)
+        self.assertIn("op", results[4]["errors"])
+        self.assertIn("non_field_errors", results[5]["errors"])
+        self.assertFalse(Recipe.objects.filter(title="New 1").exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_batch_must_be_list(self):
+        """Test empty, oversized and non-list bodies are rejected"""
+
+        for payload in ([], {"op": "create"}, [{"op": "delete", "id": 1}] * 1001):
+            response = self.post(payload)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MAX_BATCH_OPERATIONS, 1000)
+
+    def test_query_count_constant(self):
+        """Test batch size doesn't change the number of queries"""
+
+        def run(size):
+            recipes = [create_recipe(self.user, f"Recipe {size} {n}") for n in range(size * 2)]
+            operations = [create_payload(f"{size} {n}") for n in range(size)]
+            operations += [
+                {"op": "update", "id": recipe.id, "data": {"tags": [{"name": "Vegan"}]}}
+                for recipe in recipes[:size]
+            ]
+            operations += [{"op": "delete", "id": recipe.id} for recipe in recipes[size:]]
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(operations)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            # Without ids from bulk inserts recipes are saved one by one,
+            # each save bumping the collection and updating the stats
+            if not connection.features.can_return_rows_from_bulk_insert:
+                return len(queries) - 3 * size
+
+            return len(queries)
+
+        run(1)
+        self.assertEqual(run(2), run(20))
@@ -0,0 +1,128 @@
+"""Tests for the recipe API response cache"""
+
+from decimal import Decimal
+from unittest import mock
+
+from core.models import Recipe, Tag
+from core.signals import collection_changed
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+CACHE_ENABLED = {"ENABLED": True, "CACHE_ALIAS": "default", "TIMEOUT": 60}
+
+
+def get_recipe_url(recipe_id):
+    return reverse("recipes:recipe-detail", args=[recipe_id])
+
+
+@override_settings(RESPONSE_CACHE=CACHE_ENABLED)
+class ResponseCacheTests(TestCase):
+    """Test cached reads and their invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+
+    def assertCached(self, url, **params):
+        """Assert a repeated request is served without touching the recipes"""
+
+        response = self.client.get(url, params)
+
+        with self.assertNumQueries(1):
+            cached_response = self.client.get(url, params)
+
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response["Content-Type"], response["Content-Type"])
+        return cached_response
+
+    def test_list_and_detail_cached(self):
+        """Test list and detail responses are served from the cache"""
+
+        self.assertCached(RECIPES_URL)
+        self.assertCached(RECIPES_URL, page_size=1)
+        self.assertCached(get_recipe_url(self.recipe.id))
+        self.assertCached(TAGS_URL)
+
+    def test_write_invalidates_list(self):
+        """Test a change through the API is visible on the next read"""
+
+        self.assertCached(RECIPES_URL)
+        self.client.patch(get_recipe_url(self.recipe.id), {"title": "Hot soup"})
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.data["results"][0]["title"], "Hot soup")
+
+    def test_write_on_other_worker(self):
+        """Test a change whose signals ran in another process is visible"""
+
+        self.assertCached(RECIPES_URL)
+        self.assertCached(get_recipe_url(self.recipe.id))
+        with mock.patch.object(collection_changed, "send"):
+            self.client.patch(get_recipe_url(self.recipe.id), {"title": "Hot soup"})
+
+        list_response = self.client.get(RECIPES_URL)
+        detail_response = self.client.get(get_recipe_url(self.recipe.id))
+
+        self.assertEqual(list_response.data["results"][0]["title"], "Hot soup")
+        self.assertEqual(detail_response.data["title"], "Hot soup")
+
+    def test_tag_change_invalidates_recipes(self):
+        """Test renaming a tag drops cached recipes rendering it"""
+
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        self.recipe.tags.add(tag)
+        self.assertCached(get_recipe_url(self.recipe.id))
+
+        tag.name = "Supper"
+        tag.save()
+        response = self.client.get(get_recipe_url(self.recipe.id))
+
+        self.assertEqual(response.data["tags"][0]["name"], "Supper")
+
+    def test_cache_per_user(self):
+        """Test users never see each other's cached responses"""
+
+        self.assertCached(RECIPES_URL)
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(other_user)
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+    def test_errors_not_cached(self):
+        """Test missing objects are looked up again"""
+
+        url = get_recipe_url(self.recipe.id + 100)
+        self.client.get(url)
+        Recipe.objects.filter(id=self.recipe.id).update(id=self.recipe.id + 100)
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(RESPONSE_CACHE={**CACHE_ENABLED, "ENABLED": False})
+    def test_cache_disabled(self):
+        """Test nothing is cached unless enabled"""
+
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
@@ -0,0 +1,129 @@
+"""Tests for conditional GET on recipe REST API"""
+
+from decimal import Decimal
+
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+
+
+def get_recipe_url(recipe_id):
+    return reverse("recipes:recipe-detail", args=[recipe_id])
+
+
+def get_tag_url(tag_id):
+    return reverse("recipes:tag-detail", args=[tag_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling of list and detail endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=Decimal("1.50")
+        )
+        self.tag = Tag.objects.create(user=self.user, name="Dinner")
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unchanged_list_not_modified(self):
+        """Test a list is answered with 304 while the ETag still matches"""
+
+        for url in [RECIPES_URL, TAGS_URL]:
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("Last-Modified", response)
+            self.assertNotModified(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_list_not_modified_since(self):
+        """Test a list is answered with 304 for a current If-Modified-Since"""
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertNotModified(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+
+    def test_list_etag_changes_with_query(self):
+        """Test different pages of a list don't share an ETag"""
+
+        response = self.client.get(RECIPES_URL)
+        paged_response = self.client.get(RECIPES_URL, {"page_size": 1})
+
+        self.assertNotEqual(response["ETag"], paged_response["ETag"])
+
+    def test_changed_recipe_list_modified(self):
+        """Test creating a recipe or renaming a tag invalidates the list ETag"""
+
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        Recipe.objects.create(
+            user=self.user, title="Salad", time_minutes=5, price=Decimal("1.50")
+        )
+        response = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        self.tag.name = "Supper"
+        self.tag.save()
+        response = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_other_user_change_keeps_list_etag(self):
+        """Test changes of another user don't invalidate the list ETag"""
+
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com", password="somepassword"
+        )
+        Recipe.objects.create(
+            user=other_user, title="Salad", time_minutes=5, price=Decimal("1.50")
+        )
+
+        self.assertNotModified(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_detail_not_modified(self):
+        """Test details are answered with 304 while the ETag still matches"""
+
+        for url in [get_recipe_url(self.recipe.id), get_tag_url(self.tag.id)]:
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotModified(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_recipe_tags_change_detail_modified(self):
+        """Test adding a tag to a recipe invalidates the detail ETag"""
+
+        url = get_recipe_url(self.recipe.id)
+        etag = self.client.get(url)["ETag"]
+        self.recipe.tags.add(self.tag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["tags"], [{"name": "Dinner", "id": self.tag.id}])
+
+    def test_missing_detail_not_found(self):
+        """Test conditional headers don't hide a missing object"""
+
+        response = self.client.get(get_recipe_url(self.recipe.id + 100))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
@@ -0,0 +1,97 @@
+"""Tests for the values() based list serialization"""
+
+from decimal import Decimal
+from io import StringIO
+
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from recipe.serializers import RecipeSerializer, TagSerializer
+from recipe.views import TAGS_PREFETCH
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+COLUMNS = ["id", "title", "time_minutes", "price", "link"]
+
+
+def render_instances(queryset, child):
+    return JSONRenderer().render(serializers.ListSerializer(queryset, child=child).data)
+
+
+class ValuesListSerializerTests(TestCase):
+    """Test rendering rows gives the same bytes as rendering instances"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        dessert = Tag.objects.create(user=self.user, name="Dessert")
+
+        sorbet = Recipe.objects.create(
+            user=self.user, title="Sorbet", time_minutes=5, price=Decimal("3")
+        )
+        sorbet.tags.add(vegan, dessert)
+        Recipe.objects.create(
+            user=self.user,
+            title="Soup",
+            time_minutes=20,
+            price=Decimal("2.5"),
+            link="https://example.com/soup",
+        )
+
+    def test_recipe_rows_match_instances(self):
+        """Test recipes, nested tags and empty values render identically"""
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+
+        rows = RecipeSerializer(recipes.values(*COLUMNS), many=True).data
+        expected = render_instances(
+            recipes.prefetch_related(TAGS_PREFETCH), RecipeSerializer()
+        )
+
+        self.assertEqual(JSONRenderer().render(rows), expected)
+        self.assertEqual([tag["name"] for tag in rows[1]["tags"]], ["Vegan", "Dessert"])
+
+    def test_sparse_rows_match_instances(self):
+        """Test rows honour sparse fieldsets"""
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+
+        rows = RecipeSerializer(recipes.values("id", "title"), many=True, fields=["title"])
+
+        self.assertEqual(
+            JSONRenderer().render(rows.data),
+            render_instances(recipes, RecipeSerializer(fields=["title"])),
+        )
+
+    def test_tag_rows_match_instances(self):
+        """Test tags render identically"""
+
+        tags = Tag.objects.filter(user=self.user).order_by("name")
+
+        rows = TagSerializer(tags.values("name", "id"), many=True).data
+
+        self.assertEqual(JSONRenderer().render(rows), render_instances(tags, TagSerializer()))
+
+    def test_instances_still_supported(self):
+        """Test the list serializer still renders model instances"""
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+
+        data = RecipeSerializer(recipes, many=True).data
+
+        self.assertEqual([recipe["title"] for recipe in data], ["Soup", "Sorbet"])
+
+    def test_benchmark_command(self):
+        """Test the benchmark compares both paths"""
+
+        out = StringIO()
+
+        call_command(
+            "benchmark_list_serialization", "--sizes", "3", "10", "--repeat=1", stdout=out
+        )
+
+        self.assertEqual(out.getvalue().count("output identical"), 2)
+        self.assertFalse(Recipe.objects.filter(title="Recipe 0").exists())
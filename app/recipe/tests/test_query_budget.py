@@ -0,0 +1,156 @@
+"""Tests for SQL query budgets of the recipe API"""
+
+from decimal import Decimal
+from itertools import count
+
+from core.models import Recipe, Tag
+from core.tests.query_budget import QueryBudgetMixin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+
+
+def get_recipe_url(recipe_id):
+    return reverse("recipes:recipe-detail", args=[recipe_id])
+
+
+def get_tag_url(tag_id):
+    return reverse("recipes:tag-detail", args=[tag_id])
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test recipe and tag endpoints don't scale queries with data size"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.sequence = count()
+
+    def seed(self, size):
+        """Create ``size`` recipes, each with two tags"""
+
+        for _ in range(size):
+            number = next(self.sequence)
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {number}",
+                time_minutes=10,
+                price=Decimal("5.50"),
+                description="Sample description",
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"First {number}"),
+                Tag.objects.create(user=self.user, name=f"Second {number}"),
+            )
+
+        self.recipe = Recipe.objects.filter(user=self.user).last()
+        self.tag = Tag.objects.filter(user=self.user).last()
+
+    def test_list_recipes(self):
+        """Test listing recipes takes auth, version, recipes and tags queries"""
+
+        self.assertQueryBudgetHolds(
+            4, self.seed, lambda: self.client.get(RECIPES_URL)
+        )
+
+    def test_retrieve_recipe(self):
+        """Test retrieving a recipe takes auth, version, recipe and tags queries"""
+
+        self.assertQueryBudgetHolds(
+            4, self.seed, lambda: self.client.get(get_recipe_url(self.recipe.id))
+        )
+
+    def test_create_recipe(self):
+        """Test creating a recipe with tags has a fixed query cost"""
+
+        def request():
+            payload = {
+                "title": f"Created {next(self.sequence)}",
+                "time_minutes": 5,
+                "price": "2.50",
+                "tags": [{"name": "First 0"}, {"name": "Brand new"}],
+            }
+            return self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertQueryBudgetHolds(16, self.seed, request)
+
+    def test_update_recipe(self):
+        """Test updating a recipe has a fixed query cost"""
+
+        payload = {"title": "Updated", "tags": [{"name": "First 0"}]}
+        self.assertQueryBudgetHolds(
+            12,
+            self.seed,
+            lambda: self.client.patch(
+                get_recipe_url(self.recipe.id), payload, format="json"
+            ),
+        )
+
+    def test_update_recipe_same_tags(self):
+        """Test resending the current tags doesn't touch the tag links"""
+
+        self.seed(1)
+        payload = {
+            "title": "Updated",
+            "tags": [{"name": tag.name} for tag in self.recipe.tags.all()],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                get_recipe_url(self.recipe.id), payload, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            query["sql"]
+            for query in queries
+            if '"core_recipe_tags"' in query["sql"]
+            and query["sql"].startswith(("INSERT", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_destroy_recipe(self):
+        """Test deleting a recipe has a fixed query cost"""
+
+        self.assertQueryBudgetHolds(
+            7, self.seed, lambda: self.client.delete(get_recipe_url(self.recipe.id))
+        )
+
+    def test_list_tags(self):
+        """Test listing tags takes auth, version and tags queries"""
+
+        self.assertQueryBudgetHolds(3, self.seed, lambda: self.client.get(TAGS_URL))
+
+    def test_update_tag(self):
+        """Test renaming a tag has a fixed query cost"""
+
+        def request():
+            payload = {"name": f"Renamed {next(self.sequence)}"}
+            return self.client.patch(get_tag_url(self.tag.id), payload)
+
+        self.assertQueryBudgetHolds(6, self.seed, request)
+
+    def test_destroy_tag(self):
+        """Test deleting a tag has a fixed query cost"""
+
+        self.assertQueryBudgetHolds(
+            6, self.seed, lambda: self.client.delete(get_tag_url(self.tag.id))
+        )
+
+    def test_recipe_stats(self):
+        """Test the stats take auth, version, stats and tags queries"""
+
+        self.assertQueryBudgetHolds(
+            4, self.seed, lambda: self.client.get(reverse("recipes:recipe-stats"))
+        )
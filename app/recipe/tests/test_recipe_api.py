@@ -73,7 +73,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test retrieving a list depends on authentication"""
@@ -88,7 +88,27 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
+
+    def test_recipe_list_paginated_by_cursor(self):
+        """Test recipes are paged newest first with an opaque cursor"""
+
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        response = self.client.get(RECIPES_URL, {"page_size": 2})
+        next_response = self.client.get(response.data["next"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]],
+            [recipes[2].id, recipes[1].id],
+        )
+        self.assertIsNone(response.data["previous"])
+        self.assertEqual(
+            [recipe["id"] for recipe in next_response.data["results"]],
+            [recipes[0].id],
+        )
+        self.assertIsNone(next_response.data["next"])
 
     def test_get_recipe_detail(self):
         """Test get recipe detail"""
@@ -101,6 +121,26 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_nested_tags_ordered_by_id(self):
+        """Test list and detail render a recipe's tags by id, as they used to"""
+
+        recipe = create_recipe(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Vegan", "Breakfast", "Dinner")
+        ]
+        recipe.tags.add(tags[2])
+        recipe.tags.add(tags[0], tags[1])
+
+        list_response = self.client.get(RECIPES_URL)
+        detail_response = self.client.get(get_detail_url(recipe.id))
+
+        expected = ["Vegan", "Breakfast", "Dinner"]
+        self.assertEqual(
+            [tag["name"] for tag in list_response.data["results"][0]["tags"]], expected
+        )
+        self.assertEqual([tag["name"] for tag in detail_response.data["tags"]], expected)
+
     def test_create_recipe(self):
         """Test creating a recipe"""
 
@@ -222,6 +262,26 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(recipe.tags.count(), 1)
         self.assertEqual(len(tag), 1)
 
+    def test_create_recipe_with_many_tags_query_count(self):
+        """Test tags are resolved and linked in bulk, not one by one"""
+
+        Tag.objects.create(name="Tag 0", user=self.user)
+        payload = {
+            "title": "Feast",
+            "time_minutes": 30,
+            "price": Decimal("4.2"),
+            "tags": [{"name": f"Tag {number}"} for number in range(20)],
+        }
+
+        with self.assertNumQueries(15):
+            response = self.client.post(RECIPES_URL, payload, format="json")
+
+        recipe = Recipe.objects.get(title=payload["title"])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(recipe.tags.count(), 20)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 20)
+
     def test_update_recipe_with_new_tags(self):
         """Test updating recipe with new tag"""
 
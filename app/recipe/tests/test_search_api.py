@@ -0,0 +1,155 @@
+"""Tests for recipe full-text search"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from core.models import Recipe, RecipeQuerySet
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+
+unranked_search = RecipeQuerySet.search
+
+
+def ranked_search(queryset, text):
+    """Search ranking matches by time_minutes, with ties, like PostgreSQL ranks"""
+
+    return (
+        unranked_search(queryset, text)
+        .annotate(rank=Cast(F("time_minutes"), FloatField()))
+        .order_by("-rank", "-id")
+    )
+
+
+class RecipeSearchTests(TestCase):
+    """Test the search parameter of the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, description="", user=None, time_minutes=10):
+        return Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            description=description,
+            time_minutes=time_minutes,
+            price=Decimal("2.50"),
+        )
+
+    def search_pages(self, text, page_size):
+        """Follow the next links of a search, returning the ids of each page"""
+
+        pages = []
+        response = self.client.get(RECIPES_URL, {"search": text, "page_size": page_size})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([recipe["id"] for recipe in response.data["results"]])
+            if not response.data["next"]:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def search(self, text):
+        response = self.client.get(RECIPES_URL, {"search": text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_search_title_and_description(self):
+        """Test words are matched in the title and the description"""
+
+        curry = self.create_recipe("Thai curry", "Spicy coconut sauce")
+        soup = self.create_recipe("Pumpkin soup", "With coconut milk")
+        self.create_recipe("Pancakes", "Sweet breakfast")
+
+        self.assertEqual(self.search("coconut"), [soup.id, curry.id])
+        self.assertEqual(self.search("curry"), [curry.id])
+
+    def test_search_requires_all_words(self):
+        """Test every word of the search has to match"""
+
+        curry = self.create_recipe("Thai curry", "Spicy coconut sauce")
+        self.create_recipe("Pumpkin soup", "With coconut milk")
+
+        self.assertEqual(self.search("coconut spicy"), [curry.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never found"""
+
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com", password="somepassword"
+        )
+        self.create_recipe("Thai curry", user=other_user)
+
+        self.assertEqual(self.search("curry"), [])
+
+    def test_search_paginated(self):
+        """Test search results are paged by cursor, newest first without rank"""
+
+        curries = [self.create_recipe(f"Curry {number}") for number in range(3)]
+
+        pages = self.search_pages("curry", page_size=2)
+
+        self.assertEqual(pages, [[curries[2].id, curries[1].id], [curries[0].id]])
+
+    @patch.object(RecipeQuerySet, "search", ranked_search)
+    def test_ranked_search_paginated(self):
+        """Test ranked results are paged by rank then id, ties included"""
+
+        recipes = [
+            self.create_recipe(f"Curry {number}", time_minutes=minutes)
+            for number, minutes in enumerate([5, 30, 5, 30, 30, 10, 5])
+        ]
+        expected = [
+            recipe.id
+            for recipe in sorted(recipes, key=lambda recipe: (recipe.time_minutes, recipe.id))
+        ][::-1]
+
+        pages = self.search_pages("curry", page_size=2)
+
+        self.assertEqual([recipe_id for page in pages for recipe_id in page], expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    @patch.object(RecipeQuerySet, "search", ranked_search)
+    def test_search_page_does_not_count(self):
+        """Test a search page is one recipe query, without COUNT or OFFSET scans"""
+
+        for number in range(5):
+            self.create_recipe(f"Curry {number}", time_minutes=number)
+        first = self.client.get(RECIPES_URL, {"search": "curry", "page_size": 2})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(first.data["next"])
+
+        recipe_queries = [
+            query["sql"] for query in context.captured_queries
+            if 'FROM "core_recipe"' in query["sql"]
+        ]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertFalse(
+            [query for query in context.captured_queries if "COUNT(" in query["sql"]]
+        )
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertIn("AS real) < 3.0", recipe_queries[0])
+        self.assertNotIn("OFFSET", recipe_queries[0])
+
+    def test_blank_search_lists_everything(self):
+        """Test a blank search keeps the keyset paginated list"""
+
+        self.create_recipe("Thai curry")
+
+        response = self.client.get(RECIPES_URL, {"search": " "})
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotIn("count", response.data)
@@ -0,0 +1,94 @@
+"""Tests for sparse fieldsets on recipe reads"""
+
+from decimal import Decimal
+
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+
+
+def get_detail_url(recipe_id):
+    return reverse("recipes:recipe-detail", args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """Test the fields parameter of recipe list and detail"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="Curry",
+            time_minutes=30,
+            price=Decimal("5.00"),
+            description="A very long description",
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+    def get(self, url, fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": fields})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe_queries = [
+            query["sql"] for query in queries if '"core_recipe"' in query["sql"]
+        ]
+        return response, recipe_queries
+
+    def test_list_renders_requested_fields(self):
+        """Test only the requested fields are rendered and selected"""
+
+        response, queries = self.get(RECIPES_URL, "id,title")
+
+        self.assertEqual(response.data["results"], [{"id": self.recipe.id, "title": "Curry"}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("time_minutes", queries[0])
+        self.assertNotIn("description", queries[0])
+
+    def test_tags_prefetch_skipped(self):
+        """Test the tag query only runs when tags are requested"""
+
+        without_tags = self.client.get(RECIPES_URL, {"fields": "id"})
+        with self.assertNumQueries(2):
+            self.client.get(RECIPES_URL, {"fields": "id"})
+        with self.assertNumQueries(3):
+            with_tags = self.client.get(RECIPES_URL, {"fields": "id,tags"})
+
+        self.assertNotIn("tags", without_tags.data["results"][0])
+        self.assertEqual(with_tags.data["results"][0]["tags"][0]["name"], "Vegan")
+
+    def test_detail_renders_requested_fields(self):
+        """Test the detail view honours fields, description included"""
+
+        response, queries = self.get(get_detail_url(self.recipe.id), "description")
+
+        self.assertEqual(response.data, {"description": "A very long description"})
+        self.assertNotIn("title", queries[-1])
+
+    def test_list_never_selects_description(self):
+        """Test the default list does not load the description column"""
+
+        response, queries = self.get(RECIPES_URL, "")
+
+        self.assertNotIn("description", response.data["results"][0])
+        self.assertNotIn("description", queries[0])
+
+    def test_unknown_field_rejected(self):
+        """Test unknown fields, including detail only ones on the list, fail"""
+
+        response = self.client.get(RECIPES_URL, {"fields": "id,description"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("description", str(response.data["fields"]))
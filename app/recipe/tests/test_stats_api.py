@@ -0,0 +1,111 @@
+"""Tests for the recipe stats endpoint"""
+
+from decimal import Decimal
+
+from core.models import Recipe, RecipeStats, Tag
+from django.contrib.auth import get_user_model
+from django.db.models import Avg
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+STATS_URL = reverse("recipes:recipe-stats")
+
+
+def create_recipe(user, price, time_minutes, *tags):
+    recipe = Recipe.objects.create(
+        user=user, title="Sample", time_minutes=time_minutes, price=Decimal(price)
+    )
+    recipe.tags.add(*[Tag.objects.get_or_create(user=user, name=name)[0] for name in tags])
+
+    return recipe
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated stats requests"""
+
+    def test_auth_required(self):
+        response = APIClient().get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test the stats of the authenticated user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_empty_stats(self):
+        """Test users without recipes get zeros and nulls"""
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "recipe_count": 0,
+                "average_price": None,
+                "min_price": None,
+                "max_price": None,
+                "average_time_minutes": None,
+                "tags": [],
+            },
+        )
+
+    def test_missing_stats_row(self):
+        """Test users without a stats row get empty stats"""
+
+        RecipeStats.objects.filter(user=self.user).delete()
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["recipe_count"], 0)
+
+    def test_stats(self):
+        """Test figures match aggregates and tags are ranked by usage"""
+
+        create_recipe(self.user, "1.00", 3, "Vegan", "Quick")
+        create_recipe(self.user, "2.00", 4, "Vegan")
+        create_recipe(self.user, "2.01", 4, "Vegan", "Cheap")
+        Tag.objects.create(user=self.user, name="Unused")
+        other = get_user_model().objects.create_user("other@example.com", "somepassword")
+        create_recipe(other, "50.00", 60, "Vegan")
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = Recipe.objects.filter(user=self.user).aggregate(
+            Avg("price"), Avg("time_minutes")
+        )
+        self.assertEqual(response.data["recipe_count"], 3)
+        self.assertEqual(response.data["average_price"], str(expected["price__avg"]))
+        self.assertEqual(response.data["min_price"], "1.00")
+        self.assertEqual(response.data["max_price"], "2.01")
+        self.assertEqual(
+            response.data["average_time_minutes"], expected["time_minutes__avg"]
+        )
+        self.assertEqual(
+            [(tag["name"], tag["usage_count"]) for tag in response.data["tags"]],
+            [("Vegan", 3), ("Cheap", 1), ("Quick", 1)],
+        )
+
+    def test_stats_refreshed(self):
+        """Test cached stats are invalidated when a recipe changes"""
+
+        recipe = create_recipe(self.user, "1.00", 3)
+        response = self.client.get(STATS_URL)
+
+        recipe.price = Decimal("3.00")
+        recipe.save()
+        fresh = self.client.get(STATS_URL, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertEqual(fresh.data["max_price"], "3.00")
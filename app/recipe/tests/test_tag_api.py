@@ -2,7 +2,7 @@ from core.models import Tag
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
-from recipe.serializers import TagSerializer
+from recipe.serializers import TagUsageSerializer
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -50,16 +50,16 @@ class PrivateTagApiTests(TestCase):
     def test_retrieving_tags_list(self):
         """Test retrieving a tag list"""
 
-        for _ in range(2):
-            create_tag(user=self.user, name="name")
+        for name in ["Vegan", "Dessert"]:
+            create_tag(user=self.user, name=name)
 
-        tags = Tag.objects.all().order_by("-name")
-        serializer = TagSerializer(tags, many=True)
+        tags = Tag.objects.all().order_by("name")
+        serializer = TagUsageSerializer(tags, many=True)
 
         response = self.client.get(TAGS_API_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_retrieving_tag_limited_to_user(self):
         """Test retrieving tag list is limited to authenticated user"""
@@ -72,10 +72,26 @@ class PrivateTagApiTests(TestCase):
 
         response = self.client.get(TAGS_API_URL)
         tags = Tag.objects.filter(user=self.user)
-        serializer = TagSerializer(tags, many=True)
+        serializer = TagUsageSerializer(tags, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(serializer.data, response.data["results"])
+
+    def test_tag_list_paginated_by_cursor(self):
+        """Test tags are paged alphabetically with an opaque cursor"""
+
+        for name in ["Vegan", "Breakfast", "Dessert"]:
+            create_tag(user=self.user, name=name)
+
+        response = self.client.get(TAGS_API_URL, {"page_size": 2})
+        next_response = self.client.get(response.data["next"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag["name"] for tag in response.data["results"]], ["Breakfast", "Dessert"]
+        )
+        self.assertEqual([tag["name"] for tag in next_response.data["results"]], ["Vegan"])
+        self.assertIsNone(next_response.data["next"])
 
     def test_update_tag(self):
         """Update a tag."""
@@ -90,6 +106,18 @@ class PrivateTagApiTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_to_existing_name_fails(self):
+        """Renaming a tag to a name already in use is rejected."""
+
+        create_tag(user=self.user, name="Vegan")
+        tag = create_tag(user=self.user, name="Italian")
+
+        response = self.client.patch(get_tag_url(tag.id), {"name": "Vegan"})
+        tag.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(tag.name, "Italian")
+
     def test_destroy_tag(self):
         """Delete a tag."""
 
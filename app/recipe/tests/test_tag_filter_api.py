@@ -0,0 +1,93 @@
+"""Tests for filtering recipes by tags"""
+
+from decimal import Decimal
+
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+
+
+class RecipeTagFilterTests(TestCase):
+    """Test the tags parameter of the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.dessert = Tag.objects.create(user=self.user, name="Dessert")
+        self.quick = Tag.objects.create(user=self.user, name="Quick")
+
+    def create_recipe(self, title, *tags, user=None):
+        recipe = Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal("2.50"),
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def filter(self, tags, match=None):
+        params = {"tags": ",".join(str(tag.id) for tag in tags)}
+        if match:
+            params["tags_match"] = match
+        response = self.client.get(RECIPES_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_filter_any_tag(self):
+        """Test recipes with any of the tags are listed once"""
+
+        sorbet = self.create_recipe("Sorbet", self.vegan, self.dessert)
+        salad = self.create_recipe("Salad", self.vegan)
+        self.create_recipe("Toast", self.quick)
+
+        self.assertEqual(self.filter([self.vegan, self.dessert]), [salad.id, sorbet.id])
+
+    def test_filter_all_tags(self):
+        """Test tags_match=all keeps only recipes with every tag"""
+
+        sorbet = self.create_recipe("Sorbet", self.vegan, self.dessert)
+        self.create_recipe("Salad", self.vegan)
+        self.create_recipe("Cake", self.dessert, self.quick)
+
+        self.assertEqual(self.filter([self.vegan, self.dessert], "all"), [sorbet.id])
+
+    def test_filter_limited_to_user(self):
+        """Test other users' recipes are never listed"""
+
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com", password="somepassword"
+        )
+        self.create_recipe("Sorbet", self.vegan, user=other_user)
+
+        self.assertEqual(self.filter([self.vegan]), [])
+
+    def test_filter_query_count(self):
+        """Test filtering does not add queries to the list"""
+
+        for number in range(5):
+            self.create_recipe(f"Sorbet {number}", self.vegan, self.dessert)
+
+        with self.assertNumQueries(3):
+            self.filter([self.vegan, self.dessert], "all")
+
+    def test_invalid_filter(self):
+        """Test malformed tag ids and match modes are rejected"""
+
+        response = self.client.get(RECIPES_URL, {"tags": "1,vegan"})
+        match_response = self.client.get(
+            RECIPES_URL, {"tags": str(self.vegan.id), "tags_match": "most"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(match_response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,145 @@
+"""Tests for tag usage counts in the tag API"""
+
+import json
+from unittest.mock import patch
+
+from core.models import RecipeTag, Tag
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import Count
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPES_URL = reverse("recipes:recipe-list")
+TAGS_URL = reverse("recipes:tag-list")
+
+
+def recipe_payload(title, *tags):
+    return {
+        "title": title,
+        "time_minutes": 5,
+        "price": "2.00",
+        "tags": [{"name": name} for name in tags],
+    }
+
+
+class TagUsageApiTests(TestCase):
+    """Test counts stay right through the recipe endpoints and sort tags"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, *tags):
+        response = self.client.post(RECIPES_URL, recipe_payload(title, *tags), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return response.data["id"]
+
+    def get_counts(self, **params):
+        response = self.client.get(TAGS_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [(tag["name"], tag["usage_count"]) for tag in response.data["results"]]
+
+    def assertCountsMatchLinks(self):
+        actual = dict(
+            Tag.objects.annotate(total=Count("recipetag")).values_list("name", "total")
+        )
+
+        self.assertEqual(dict(self.get_counts()), actual)
+
+    def test_counts_follow_writes(self):
+        """Test create, update, delete, import and batch keep counts exact"""
+
+        soup = self.create_recipe("Soup", "Vegan", "Quick")
+        stew = self.create_recipe("Stew", "Vegan")
+        self.client.patch(
+            reverse("recipes:recipe-detail", args=[soup]),
+            {"tags": [{"name": "Quick"}, {"name": "Cheap"}]},
+            format="json",
+        )
+        self.client.post(
+            reverse("recipes:recipe-import"),
+            json.dumps(recipe_payload("Salad", "Vegan", "Cheap")),
+            content_type="application/x-ndjson",
+        )
+        self.assertCountsMatchLinks()
+
+        response = self.client.post(
+            reverse("recipes:recipe-batch"),
+            [
+                {"op": "create", "data": recipe_payload("Curry", "Quick")},
+                {"op": "update", "id": soup, "data": {"tags": [{"name": "Vegan"}]}},
+                {"op": "delete", "id": stew},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertCountsMatchLinks()
+
+        self.client.delete(reverse("recipes:recipe-detail", args=[soup]))
+        self.assertCountsMatchLinks()
+
+    def test_racing_link_not_counted(self):
+        """Test a link added behind an update's back fails it, not the count"""
+
+        soup = self.create_recipe("Soup")
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        bulk_create = RecipeTag.objects.bulk_create
+
+        def racing_bulk_create(links, *args, **kwargs):
+            RecipeTag.objects.create(recipe_id=soup, tag=vegan)
+            Tag.objects.change_usage_counts({vegan.id: 1})
+            return bulk_create(links, *args, **kwargs)
+
+        with patch.object(RecipeTag.objects, "bulk_create", racing_bulk_create):
+            with self.assertRaises(IntegrityError):
+                self.client.patch(
+                    reverse("recipes:recipe-detail", args=[soup]),
+                    {"tags": [{"name": "Vegan"}]},
+                    format="json",
+                )
+
+        self.assertCountsMatchLinks()
+
+    def test_tag_list_refreshed(self):
+        """Test cached tag lists are invalidated when a count changes"""
+
+        self.create_recipe("Soup", "Vegan")
+        response = self.client.get(TAGS_URL)
+
+        self.create_recipe("Stew", "Vegan")
+        fresh = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertEqual(fresh.data["results"][0]["usage_count"], 2)
+
+    def test_order_by_popularity(self):
+        """Test tags sort by usage, then name, across pages"""
+
+        self.create_recipe("Soup", "Vegan", "Quick", "Cheap")
+        self.create_recipe("Stew", "Vegan", "Quick")
+        self.create_recipe("Salad", "Vegan")
+
+        response = self.client.get(TAGS_URL, {"ordering": "-usage_count", "page_size": 2})
+        following = self.client.get(response.data["next"])
+
+        self.assertEqual(
+            [tag["name"] for tag in response.data["results"] + following.data["results"]],
+            ["Vegan", "Quick", "Cheap"],
+        )
+        self.assertEqual(self.get_counts(), [("Cheap", 1), ("Quick", 2), ("Vegan", 3)])
+
+    def test_unknown_ordering(self):
+        """Test unsupported orderings are rejected"""
+
+        response = self.client.get(TAGS_URL, {"ordering": "id"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ordering", response.data)
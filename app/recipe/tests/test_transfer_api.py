@@ -0,0 +1,332 @@
+"""Tests for bulk recipe import and export"""
+
+import csv
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from app.asgi import application
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from core.models import Recipe, Tag
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from recipe.transfer import RecipeImporter
+from recipe.views import RecipeViewSet
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+IMPORT_URL = reverse("recipes:recipe-import")
+EXPORT_URL = reverse("recipes:recipe-export")
+
+
+def to_ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+
+def create_recipe(user, title, tags=()):
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=Decimal("2.50"),
+        description="Sample description",
+    )
+    recipe.tags.add(*Tag.objects.get_or_create_for_names(user, tags).values())
+    return recipe
+
+
+class PublicTransferAPITests(TestCase):
+    """Test unauthenticated bulk requests"""
+
+    def test_import_auth_required(self):
+        """Test auth is required to import recipes"""
+
+        response = APIClient().post(IMPORT_URL, "", content_type="text/csv")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_auth_required(self):
+        """Test auth is required to export recipes"""
+
+        response = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateTransferAPITests(TestCase):
+    """Test authenticated bulk requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Test importing recipes from NDJSON reuses and creates tags"""
+
+        Tag.objects.create(user=self.user, name="Dinner")
+        rows = [
+            {
+                "title": "Curry",
+                "time_minutes": 30,
+                "price": "4.20",
+                "tags": [{"name": "Dinner"}, {"name": "Thai"}],
+            },
+            {"title": "Toast", "time_minutes": 3, "price": "0.50", "description": "Crisp"},
+        ]
+
+        response = self.client.post(
+            IMPORT_URL, to_ndjson(rows), content_type="application/x-ndjson"
+        )
+        curry = Recipe.objects.get(title="Curry")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 2, "failed": 0, "errors": []})
+        self.assertEqual(curry.price, Decimal("4.20"))
+        self.assertEqual(
+            sorted(curry.tags.values_list("name", flat=True)), ["Dinner", "Thai"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Recipe.objects.get(title="Toast").description, "Crisp")
+
+    def test_import_reports_row_errors(self):
+        """Test invalid rows are reported while valid rows are imported"""
+
+        body = "\n".join(
+            [
+                json.dumps({"title": "Valid", "time_minutes": 5, "price": "1.00"}),
+                "",
+                "{not json",
+                json.dumps({"title": "No price", "time_minutes": 5}),
+            ]
+        )
+
+        response = self.client.post(
+            IMPORT_URL, body, content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3, 4])
+        self.assertIn("price", response.data["errors"][1]["errors"])
+        self.assertTrue(Recipe.objects.filter(title="Valid").exists())
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV with pipe separated tags"""
+
+        body = (
+            "title,time_minutes,price,description,link,tags\n"
+            'Salad,10,3.50,"Fresh, green",,Vegan|Lunch\n'
+            "Soup,20,2.00,,,\n"
+        )
+
+        response = self.client.post(IMPORT_URL, body, content_type="text/csv")
+        salad = Recipe.objects.get(title="Salad")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(salad.description, "Fresh, green")
+        self.assertEqual(
+            sorted(salad.tags.values_list("name", flat=True)), ["Lunch", "Vegan"]
+        )
+        self.assertEqual(Recipe.objects.get(title="Soup").tags.count(), 0)
+
+    def test_import_csv_reports_unreadable_records(self):
+        """Test records the csv module rejects are reported as row errors"""
+
+        body = (
+            "title,time_minutes,price,description,link,tags\n"
+            "Salad,10,3.50,,,\n"
+            f"Soup,20,2.00,{'x' * 200},,\n"
+            "Toast,3,0.50,,,\n"
+        )
+        limit = csv.field_size_limit(100)
+        try:
+            response = self.client.post(IMPORT_URL, body, content_type="text/csv")
+        finally:
+            csv.field_size_limit(limit)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            response.data["errors"], [{"row": 2, "errors": {"non_field_errors": ["Invalid CSV"]}}]
+        )
+        self.assertFalse(Recipe.objects.filter(title="Soup").exists())
+
+    def test_csv_tag_names_round_trip(self):
+        """Test tag names with the separator or backslashes survive export and import"""
+
+        names = ["Sweet|Sour", "Back\\slash", "Trailing\\", "Plain"]
+        self.create_recipe("Salad", tags=names)
+        content = b"".join(
+            self.client.get(EXPORT_URL, {"output": "csv"}).streaming_content
+        ).decode()
+        Recipe.objects.all().delete()
+        Tag.objects.all().delete()
+
+        response = self.client.post(IMPORT_URL, content, content_type="text/csv")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            sorted(Recipe.objects.get(title="Salad").tags.values_list("name", flat=True)),
+            sorted(names),
+        )
+
+    def test_import_unsupported_media_type(self):
+        """Test bodies other than NDJSON or CSV are rejected"""
+
+        response = self.client.post(IMPORT_URL, {"title": "Soup"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_importer_inserts_in_batches(self):
+        """Test the importer flushes rows once a batch is full"""
+
+        rows = [
+            (row, {"title": f"Recipe {row}", "time_minutes": 1, "price": "1.00"}, None)
+            for row in range(1, 6)
+        ]
+        importer = RecipeImporter(self.user, context={}, batch_size=2)
+
+        with patch.object(importer, "_insert", wraps=importer._insert) as patched:
+            report = importer.run(rows)
+
+        self.assertEqual([len(call.args[0]) for call in patched.call_args_list], [2, 2, 1])
+        self.assertEqual(report["created"], 5)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def create_recipe(self, title, tags=(), user=None):
+        return create_recipe(user or self.user, title, tags)
+
+    def test_export_ndjson(self):
+        """Test exporting streams the user's recipes with their tags"""
+
+        first = self.create_recipe("First", tags=["Vegan", "Dinner"])
+        second = self.create_recipe("Second")
+        other_user = get_user_model().objects.create_user(
+            email="other@example.com", password="somepassword"
+        )
+        self.create_recipe("Other", user=other_user)
+
+        response = self.client.get(EXPORT_URL)
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["id"] for row in rows], [first.id, second.id])
+        self.assertEqual(
+            rows[0],
+            {
+                "id": first.id,
+                "title": "First",
+                "time_minutes": 10,
+                "price": "2.50",
+                "description": "Sample description",
+                "link": "",
+                "tags": [{"name": "Dinner"}, {"name": "Vegan"}],
+            },
+        )
+        self.assertEqual(rows[1]["tags"], [])
+
+    def test_export_csv(self):
+        """Test exporting as CSV in the column layout of the import"""
+
+        recipe = self.create_recipe("Salad, green", tags=["Vegan", "Lunch"])
+
+        response = self.client.get(EXPORT_URL, {"output": "csv"})
+        content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "id,title,time_minutes,price,description,link,tags",
+                f'{recipe.id},"Salad, green",10,2.50,Sample description,,Lunch|Vegan',
+            ],
+        )
+
+    def test_export_unknown_output(self):
+        """Test unknown export formats are rejected"""
+
+        response = self.client.get(EXPORT_URL, {"output": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(RecipeViewSet, "export_chunk_size", 2)
+    def test_export_queries_per_chunk(self):
+        """Test export runs the recipe cursor plus one tag query per chunk"""
+
+        for number in range(5):
+            self.create_recipe(f"Recipe {number}", tags=["Vegan"])
+
+        response = self.client.get(EXPORT_URL)
+
+        with self.assertNumQueries(4):
+            content = b"".join(response.streaming_content)
+
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+class AsgiExportTests(TransactionTestCase):
+    """Test exports streamed through the ASGI application"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="somepassword"
+        )
+        self.token = Token.objects.create(user=self.user)
+        for number in range(5):
+            create_recipe(self.user, f"Recipe {number}", tags=["Vegan", "Lunch"])
+
+    async def export(self, query_string=b""):
+        """Return the start message and the whole body of an ASGI export"""
+
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": EXPORT_URL,
+                "query_string": query_string,
+                "server": ("testserver", 80),
+                "headers": [(b"authorization", f"Token {self.token.key}".encode())],
+            },
+        )
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output(timeout=5)
+        body = b""
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await communicator.wait(timeout=5)
+
+        return start, body
+
+    def sync_export(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return b"".join(client.get(EXPORT_URL, params).streaming_content)
+
+    @patch.object(RecipeViewSet, "export_chunk_size", 2)
+    async def test_export_body_is_complete(self):
+        """Test the ASGI export streams every chunk, as the WSGI export does"""
+
+        for query_string, params in ((b"", {}), (b"output=csv", {"output": "csv"})):
+            with self.subTest(query_string=query_string):
+                start, body = await self.export(query_string)
+                expected = await sync_to_async(self.sync_export)(**params)
+
+                self.assertEqual(start["status"], status.HTTP_200_OK)
+                self.assertEqual(body, expected)
+                self.assertIn(b"Recipe 4", body)
@@ -0,0 +1,279 @@
+"""Bulk import and export of recipes streamed as NDJSON or CSV"""
+
+import csv
+import json
+from collections import Counter, defaultdict
+from itertools import count, islice
+
+from core.models import CollectionVersion, Recipe, RecipeStats, RecipeTag, Tag
+from django.db import connection, transaction
+from django.utils.translation import gettext_lazy as translate
+from recipe.serializers import RecipeDetailsSerializer
+from rest_framework import serializers
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+CSV_COLUMNS = ["title", "time_minutes", "price", "description", "link", "tags"]
+CSV_TAG_SEPARATOR = "|"
+CSV_TAG_ESCAPE = "\\"
+EXPORT_COLUMNS = ["id", "title", "time_minutes", "price", "description", "link"]
+
+
+def read_ndjson(lines):
+    """Yield ``(row, data, error)`` for every non-blank JSON line"""
+
+    for row, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row, None, {"non_field_errors": [translate("Invalid JSON")]}
+            continue
+
+        if not isinstance(data, dict):
+            yield row, None, {"non_field_errors": [translate("Expected an object")]}
+            continue
+
+        yield row, data, None
+
+
+def join_tag_names(names) -> str:
+    """Join tag names with ``|``, escaping ``|`` and ``\\`` in them by ``\\``"""
+
+    return CSV_TAG_SEPARATOR.join(
+        name.replace(CSV_TAG_ESCAPE, CSV_TAG_ESCAPE * 2).replace(
+            CSV_TAG_SEPARATOR, CSV_TAG_ESCAPE + CSV_TAG_SEPARATOR
+        )
+        for name in names
+    )
+
+
+def split_tag_names(value: str) -> list:
+    """Split tag names joined by ``join_tag_names``
+
+    A backslash before any other character is kept as it is.
+    """
+
+    names = [""]
+    chars = iter(value)
+    for char in chars:
+        if char == CSV_TAG_ESCAPE:
+            following = next(chars, "")
+            escaped = following in (CSV_TAG_ESCAPE, CSV_TAG_SEPARATOR)
+            names[-1] += following if escaped else char + following
+        elif char == CSV_TAG_SEPARATOR:
+            names.append("")
+        else:
+            names[-1] += char
+
+    return names
+
+
+def read_csv(lines):
+    """Yield ``(row, data, error)`` for every CSV record after the header
+
+    Tags are given by name in one column, separated by ``|``, see
+    ``split_tag_names``. Records the csv module can't read, e.g. fields
+    over ``csv.field_size_limit()``, are reported. A header it can't read
+    ends the import.
+    """
+
+    records = csv.DictReader(lines)
+    try:
+        records.fieldnames
+    except csv.Error:
+        yield 1, None, {"non_field_errors": [translate("Invalid CSV header")]}
+        return
+
+    for row in count(start=1):
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield row, None, {"non_field_errors": [translate("Invalid CSV")]}
+            continue
+
+        data = {key: value for key, value in record.items() if key in CSV_COLUMNS}
+        tags = data.pop("tags", None) or ""
+        data["tags"] = [
+            {"name": name.strip()} for name in split_tag_names(tags) if name.strip()
+        ]
+
+        yield row, data, None
+
+
+ROW_READERS = {
+    "application/x-ndjson": read_ndjson,
+    "application/jsonl": read_ndjson,
+    "text/csv": read_csv,
+}
+
+
+class RecipeImporter:
+    """Validate streamed recipe rows and insert them in batches
+
+    Only one batch of validated rows is held in memory. Each batch is
+    written in its own transaction with a bulk insert of the recipes, one
+    lookup/insert of its tags and a bulk insert of the tag links.
+    """
+
+    def __init__(self, user, context, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.validator = RecipeDetailsSerializer(context=context)
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows) -> dict:
+        """Import ``(row, data, error)`` items and return a summary"""
+
+        batch = []
+        for row, data, error in rows:
+            if error is None:
+                try:
+                    batch.append(self.validator.run_validation(data))
+                except serializers.ValidationError as exc:
+                    error = exc.detail
+
+            if error is not None:
+                self._report(row, error)
+
+            if len(batch) >= self.batch_size:
+                self._insert(batch)
+                batch = []
+
+        if batch:
+            self._insert(batch)
+
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+    def _report(self, row, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": error})
+
+    def _insert(self, batch):
+        tag_names = [[tag["name"] for tag in data.pop("tags", [])] for data in batch]
+        recipes = [Recipe(user=self.user, **data) for data in batch]
+
+        with transaction.atomic():
+            tags = Tag.objects.get_or_create_for_names(
+                self.user, [name for names in tag_names for name in names]
+            )
+            bulk_create_recipes(recipes)
+            links = RecipeTag.objects.bulk_create(
+                [
+                    RecipeTag(recipe_id=recipe.id, tag_id=tags[name].id)
+                    for recipe, names in zip(recipes, tag_names)
+                    for name in dict.fromkeys(names)
+                ],
+                ignore_conflicts=True,
+            )
+            Tag.objects.change_usage_counts(Counter(link.tag_id for link in links))
+            CollectionVersion.objects.bump(
+                self.user.pk, [CollectionVersion.RECIPES, CollectionVersion.TAGS]
+            )
+
+        self.created += len(recipes)
+
+
+def bulk_create_recipes(recipes):
+    """Insert recipes with one query where the backend returns primary keys
+
+    Backends without ``INSERT ... RETURNING`` support (SQLite on Django 3.2)
+    fall back to one insert per recipe, as the ids are needed for tag links.
+    Recipe stats are updated either way, the bulk insert sends no signals.
+    """
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        by_user = defaultdict(list)
+        for recipe in recipes:
+            by_user[recipe.user_id].append(recipe.get_stats_values())
+        for user_id, values in by_user.items():
+            RecipeStats.objects.change(user_id, added=values)
+    else:
+        for recipe in recipes:
+            recipe.save(force_insert=True)
+
+
+def iter_recipe_chunks(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of recipe dicts of ``user`` with their tags, oldest first
+
+    Recipes come from a server-side cursor and the tags of each chunk are
+    fetched with one query, so memory use is bounded by ``chunk_size``.
+    """
+
+    recipes = (
+        Recipe.objects.filter(user=user)
+        .order_by("id")
+        .values(*EXPORT_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    while True:
+        chunk = list(islice(recipes, chunk_size))
+        if not chunk:
+            return
+
+        tag_names = defaultdict(list)
+        recipe_tags = (
+            RecipeTag.objects.filter(recipe_id__in=[recipe["id"] for recipe in chunk])
+            .order_by("tag__name")
+            .values_list("recipe_id", "tag__name")
+        )
+        for recipe_id, name in recipe_tags:
+            tag_names[recipe_id].append(name)
+
+        for recipe in chunk:
+            recipe["price"] = str(recipe["price"])
+            recipe["tags"] = tag_names[recipe["id"]]
+
+        yield chunk
+
+
+def export_ndjson(chunks):
+    """Render recipe chunks as NDJSON, the format accepted by the import"""
+
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(
+                {**recipe, "tags": [{"name": name} for name in recipe["tags"]]}
+            )
+            + "\n"
+            for recipe in chunk
+        )
+
+
+class _EchoBuffer:
+    """File-like object handing back what ``csv.writer`` writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(chunks):
+    """Render recipe chunks as CSV, the format accepted by the import"""
+
+    writer = csv.writer(_EchoBuffer())
+    yield writer.writerow(EXPORT_COLUMNS + ["tags"])
+
+    for chunk in chunks:
+        yield "".join(
+            writer.writerow(
+                [recipe[column] for column in EXPORT_COLUMNS]
+                + [join_tag_names(recipe["tags"])]
+            )
+            for recipe in chunk
+        )
+
+
+EXPORTERS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
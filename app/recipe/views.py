@@ -2,24 +2,157 @@
 
 # Create your views here.
 
-from core.models import Recipe, Tag
-from recipe.serializers import RecipeDetailsSerializer, RecipeSerializer, TagSerializer
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+import codecs
+
+from core.db.replicas import ReplicaReadsMixin
+from core.models import CollectionVersion, Recipe, RecipeStats, Tag
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from recipe.batch import RecipeBatch
+from recipe.caching import cached_response
+from recipe.conditional import collection_condition, object_condition
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeSearchCursorPagination,
+    TagCursorPagination,
+    TagPopularityCursorPagination,
+)
+from recipe.serializers import (
+    RecipeDetailsSerializer,
+    RecipeSerializer,
+    RecipeStatsSerializer,
+    TagSerializer,
+    TagUsageSerializer,
+)
+from recipe.transfer import (
+    EXPORT_CHUNK_SIZE,
+    EXPORTERS,
+    ROW_READERS,
+    RecipeImporter,
+    iter_recipe_chunks,
+)
+from rest_framework import exceptions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from user.authentication import CachedTokenAuthentication
+
+TAGS_PREFETCH = Prefetch(
+    "tags",
+    queryset=Tag.objects.only("id", "name").order_by(*TagSerializer.Meta.ordering),
+)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """Viewset for recipe CRUD operations"""
 
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    export_chunk_size = EXPORT_CHUNK_SIZE
+    stats_tag_limit = 50
 
     def get_queryset(self):
-        """Retrieves recipes for authenticated users"""
+        """Retrieves recipes for authenticated users
+
+        Reads load only the columns of the rendered fields, plus one query
+        for the tags of the whole page when tags are rendered. The list
+        renders plain ``values()`` rows, see ``ValuesListSerializer``. Writes
+        fetch the bare row since the tags get replaced anyway.
+        """
+
+        queryset = self.queryset.filter(user=self.request.user).order_by("-id")
+
+        if self.action == "list":
+            if self.search_text:
+                queryset = queryset.search(self.search_text)
+            if self.tag_filter:
+                queryset = queryset.with_tags(*self.tag_filter)
+        if self.action not in ("list", "retrieve"):
+            return queryset.defer("search_vector")
+
+        fields = self.rendered_fields
+        columns = [field for field in fields if field != "tags"]
+        if self.action == "list":
+            # Annotations, such as the search rank, position the cursor
+            return queryset.values("id", *columns, *queryset.query.annotations)
+
+        queryset = queryset.only(*columns)
+        if "tags" in fields:
+            queryset = queryset.prefetch_related(TAGS_PREFETCH)
+
+        return queryset
+
+    @property
+    def search_text(self):
+        return self.request.query_params.get("search", "").strip()
+
+    @property
+    def tag_filter(self):
+        """Parse ``?tags=1,2&tags_match=any|all`` into with_tags arguments"""
+
+        value = self.request.query_params.get("tags", "")
+        match = self.request.query_params.get("tags_match", "any")
+        if not value.strip():
+            return None
+
+        try:
+            tag_ids = [int(tag_id) for tag_id in value.split(",") if tag_id.strip()]
+        except ValueError:
+            raise exceptions.ValidationError(
+                {"tags": ["Expected comma separated tag ids"]}
+            )
+        if match not in ("any", "all"):
+            raise exceptions.ValidationError({"tags_match": ["Choose any or all"]})
+
+        return tag_ids, match == "all"
+
+    @property
+    def rendered_fields(self):
+        """Fields named by ``?fields=id,title,tags``, all of them by default"""
+
+        fields = self.get_serializer_class().Meta.fields
+        value = self.request.query_params.get("fields", "")
+        if not value.strip():
+            return fields
+
+        requested = [field.strip() for field in value.split(",") if field.strip()]
+        unknown = sorted(set(requested) - set(fields))
+        if unknown:
+            raise exceptions.ValidationError(
+                {"fields": [f"Unknown fields: {', '.join(unknown)}"]}
+            )
+
+        return requested
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve"):
+            kwargs["fields"] = self.rendered_fields
+
+        return super().get_serializer(*args, **kwargs)
+
+    @property
+    def paginator(self):
+        """Page search results by rank and id, everything else by id"""
+
+        if not hasattr(self, "_paginator"):
+            if self.action == "list" and self.search_text:
+                self._paginator = RecipeSearchCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+
+        return self._paginator
+
+    @collection_condition(CollectionVersion.RECIPES)
+    @cached_response(CollectionVersion.RECIPES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-        return self.queryset.filter(user=self.request.user).order_by("-id")
+    @object_condition(Recipe)
+    @cached_response(Recipe)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -31,14 +164,126 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["post"], url_path="import", url_name="import")
+    def import_recipes(self, request):
+        """Create recipes from an NDJSON or CSV body, reporting failed rows
 
-class TagViewSet(viewsets.ModelViewSet):
+        The body is read line by line, so the upload is never held in memory.
+        """
+
+        media_type = request.content_type.split(";")[0].strip()
+        reader = ROW_READERS.get(media_type)
+        if reader is None:
+            raise exceptions.UnsupportedMediaType(media_type)
+
+        importer = RecipeImporter(request.user, self.get_serializer_context())
+        lines = codecs.iterdecode(request.stream or [], "utf-8")
+        try:
+            report = importer.run(reader(lines))
+        except UnicodeDecodeError:
+            raise exceptions.ParseError("Request body must be UTF-8 encoded")
+
+        return Response(report)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Apply a list of create, update and delete operations atomically
+
+        Returns a result per operation. If any operation is invalid nothing
+        is written and the response is a 400 with the errors of each one.
+        """
+
+        results, applied = RecipeBatch(request.user, self.get_serializer_context()).run(
+            request.data
+        )
+
+        return Response(
+            {"results": results},
+            status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["get"])
+    @collection_condition(CollectionVersion.RECIPES)
+    @cached_response(CollectionVersion.RECIPES)
+    def stats(self, request):
+        """Recipe count, price and time figures and the most used tags
+
+        Read from the running totals in ``RecipeStats`` and the tag usage
+        counters, so the cost doesn't grow with the number of recipes.
+        """
+
+        stats = RecipeStats.objects.with_averages().filter(user=request.user).first()
+        if stats is None:
+            stats = RecipeStats(user=request.user)
+            stats.average_price = stats.average_time_minutes = None
+        stats.tags = (
+            Tag.objects.filter(user=request.user, usage_count__gt=0)
+            .order_by("-usage_count", "name")
+            .values(*TagUsageSerializer.Meta.fields)[:self.stats_tag_limit]
+        )
+
+        return Response(RecipeStatsSerializer(stats).data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream all recipes of the user as NDJSON or CSV (``?output=csv``)"""
+
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORTERS:
+            raise exceptions.ValidationError(
+                {"output": [f"Choose one of: {', '.join(EXPORTERS)}"]}
+            )
+
+        exporter, content_type = EXPORTERS[output]
+        response = StreamingHttpResponse(
+            exporter(iter_recipe_chunks(request.user, self.export_chunk_size)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="recipes.{output}"'
+
+        return response
+
+
+class TagViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """Viewset for tag CRUD operation"""
 
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
-    authentication_classes = [TokenAuthentication]
+    serializer_class = TagUsageSerializer
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TagCursorPagination
+    orderings = {
+        "name": TagCursorPagination,
+        "-usage_count": TagPopularityCursorPagination,
+    }
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("name")
+        queryset = self.queryset.filter(user=self.request.user).order_by("name")
+        if self.action == "list":
+            return queryset.values(*TagUsageSerializer.Meta.fields)
+
+        return queryset
+
+    @property
+    def paginator(self):
+        """Page by name, or by usage with ``?ordering=-usage_count``"""
+
+        if not hasattr(self, "_paginator"):
+            ordering = self.request.query_params.get("ordering", "name")
+            if ordering not in self.orderings:
+                raise exceptions.ValidationError(
+                    {"ordering": [f"Choose one of: {', '.join(self.orderings)}"]}
+                )
+            self._paginator = self.orderings[ordering]()
+
+        return self._paginator
+
+    @collection_condition(CollectionVersion.TAGS)
+    @cached_response(CollectionVersion.TAGS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @object_condition(Tag)
+    @cached_response(Tag)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,161 @@
+"""Authentication classes for the REST API"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+
+
+# Seconds a worker trusts its own entries, unless TOKEN_AUTH_CACHE sets it
+DEFAULT_LOCAL_TTL = 5
+
+
+class TokenCache:
+    """Bounded LRU mapping token keys to ``(user, token)`` for ``ttl`` seconds"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._keys_by_user.setdefault(value[0].pk, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        user_id = entry[1][0].pk
+        keys = self._keys_by_user.get(user_id)
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_user[user_id]
+
+
+_token_cache = None
+
+
+def get_token_cache() -> TokenCache:
+    """Return the in-process token cache configured by ``TOKEN_AUTH_CACHE``"""
+
+    global _token_cache
+    if _token_cache is None:
+        config = settings.TOKEN_AUTH_CACHE
+        ttl = min(config["TTL"], config.get("LOCAL_TTL", DEFAULT_LOCAL_TTL))
+        _token_cache = TokenCache(config["MAX_SIZE"], ttl)
+
+    return _token_cache
+
+
+def get_shared_cache():
+    """Return the Django cache backing the token cache, if one is configured"""
+
+    alias = settings.TOKEN_AUTH_CACHE.get("CACHE_ALIAS")
+    return caches[alias] if alias else None
+
+
+def get_shared_cache_key(key: str) -> str:
+    return f"auth-token:{key}"
+
+
+def invalidate_token(key: str):
+    """Drop a token from the in-process and shared caches"""
+
+    get_token_cache().delete(key)
+
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete(get_shared_cache_key(key))
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == "TOKEN_AUTH_CACHE":
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication remembering which user a token belongs to
+
+    Resolved tokens are kept in a per-process LRU for ``LOCAL_TTL`` seconds
+    and, when ``TOKEN_AUTH_CACHE["CACHE_ALIAS"]`` is set, in that Django
+    cache for ``TTL`` seconds, so most requests skip the token/user query.
+    Entries are dropped when the token is deleted or the user is saved, see
+    ``user.signals``. Other processes only drop their shared entries, so
+    their local ones serve a deleted token or deactivated user for at most
+    ``LOCAL_TTL`` seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        shared_cache = get_shared_cache()
+
+        cached = token_cache.get(key)
+        if cached is None and shared_cache is not None:
+            cached = shared_cache.get(get_shared_cache_key(key))
+            if cached is not None:
+                token_cache.set(key, cached)
+
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+            if shared_cache is not None:
+                shared_cache.set(
+                    get_shared_cache_key(key),
+                    cached,
+                    timeout=settings.TOKEN_AUTH_CACHE["TTL"],
+                )
+
+        user, token = cached
+        # Views may modify request.user, so each request gets its own copy.
+        return copy.copy(user), token
@@ -0,0 +1,21 @@
+"""System checks of the token authentication cache settings"""
+
+from core.checks import is_shared_cache
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_token_cache(app_configs, **kwargs):
+    alias = settings.TOKEN_AUTH_CACHE.get("CACHE_ALIAS")
+    if not alias or is_shared_cache(alias):
+        return []
+
+    return [
+        Error(
+            f"TOKEN_AUTH_CACHE['CACHE_ALIAS'] {alias!r} is not a cache shared by all workers.",
+            hint="Its entries would outlive invalidations on the other workers. Point it "
+            "at a shared cache in CACHES or leave it empty.",
+            id="user.E001",
+        )
+    ]
@@ -1,9 +1,10 @@
+from core.timing import TimedSerializerMixin
 from django.contrib.auth import authenticate, get_user_model
 from django.utils.translation import gettext_lazy as translate
 from rest_framework import serializers
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for user data"""
 
     class Meta:
@@ -0,0 +1,23 @@
+"""Signal handlers keeping the token authentication cache in sync"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from user.authentication import get_shared_cache, get_token_cache, invalidate_token
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Forget cached tokens so the next request sees the saved user"""
+
+    get_token_cache().delete_user(instance.pk)
+
+    if get_shared_cache() is not None:
+        for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+            invalidate_token(key)
@@ -0,0 +1,188 @@
+"""Tests for cached token authentication"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user.authentication import TokenCache, get_token_cache
+from user.checks import check_token_cache
+
+ME_URL = reverse("user:me")
+LOCAL_ONLY = {"MAX_SIZE": 100, "TTL": 300, "LOCAL_TTL": 5, "CACHE_ALIAS": ""}
+
+
+class TokenCacheTests(SimpleTestCase):
+    """Tests for the in-process token LRU"""
+
+    def make_entry(self, user_id):
+        user = get_user_model()(id=user_id, email=f"{user_id}@example.com")
+        return user, Token(key=str(user_id), user=user)
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays bounded and keeps recently used keys"""
+
+        token_cache = TokenCache(max_size=2, ttl=60)
+        token_cache.set("a", self.make_entry(1))
+        token_cache.set("b", self.make_entry(2))
+        token_cache.get("a")
+        token_cache.set("c", self.make_entry(3))
+
+        self.assertEqual(len(token_cache), 2)
+        self.assertIsNotNone(token_cache.get("a"))
+        self.assertIsNone(token_cache.get("b"))
+
+    @patch("user.authentication.time.monotonic")
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries are dropped once their TTL passed"""
+
+        patched_monotonic.return_value = 100
+        token_cache = TokenCache(max_size=2, ttl=60)
+        token_cache.set("a", self.make_entry(1))
+
+        patched_monotonic.return_value = 161
+
+        self.assertIsNone(token_cache.get("a"))
+        self.assertEqual(len(token_cache), 0)
+
+    def test_delete_user(self):
+        """Test all keys of one user can be dropped at once"""
+
+        token_cache = TokenCache(max_size=5, ttl=60)
+        token_cache.set("a", self.make_entry(1))
+        token_cache.set("b", self.make_entry(2))
+
+        token_cache.delete_user(1)
+
+        self.assertIsNone(token_cache.get("a"))
+        self.assertIsNotNone(token_cache.get("b"))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests for authenticating API requests through the token cache"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpassword", name="Test Name"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeated_requests_skip_token_query(self):
+        """Test the token is resolved from the database only once"""
+
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cached entry"""
+
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates the cached entry"""
+
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_served_fresh(self):
+        """Test changes to the user are visible on the next request"""
+
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {"name": "New Name"})
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.data["name"], "New Name")
+
+    @override_settings(TOKEN_AUTH_CACHE=LOCAL_ONLY)
+    @patch("user.authentication.time.monotonic")
+    def test_token_deleted_by_other_process(self, patched_monotonic):
+        """Test a token deleted by another process is rejected after LOCAL_TTL"""
+
+        patched_monotonic.return_value = 100
+        self.client.get(ME_URL)
+        # The other process's receivers only clear its own caches
+        with patch("user.signals.invalidate_token"):
+            self.token.delete()
+
+        patched_monotonic.return_value = 106
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE=LOCAL_ONLY)
+    @patch("user.authentication.time.monotonic")
+    def test_user_deactivated_by_other_process(self, patched_monotonic):
+        """Test a user deactivated by another process is rejected after LOCAL_TTL"""
+
+        patched_monotonic.return_value = 100
+        self.client.get(ME_URL)
+        with patch("user.signals.get_token_cache", return_value=TokenCache(100, 5)):
+            self.user.is_active = False
+            self.user.save()
+
+        patched_monotonic.return_value = 106
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        TOKEN_AUTH_CACHE={"MAX_SIZE": 100, "TTL": 60, "CACHE_ALIAS": "default"}
+    )
+    def test_shared_cache_used_across_processes(self):
+        """Test another process can reuse the entry from the Django cache"""
+
+        self.client.get(ME_URL)
+        get_token_cache().clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        get_token_cache().clear()
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        cache.clear()
+
+
+class TokenCacheCheckTests(SimpleTestCase):
+    """Test the check of the shared token cache layer"""
+
+    @override_settings(TOKEN_AUTH_CACHE={**LOCAL_ONLY, "CACHE_ALIAS": "default"})
+    def test_process_local_cache(self):
+        """Test a cache local to each worker is refused as shared layer"""
+
+        self.assertEqual([error.id for error in check_token_cache(None)], ["user.E001"])
+
+    @override_settings(TOKEN_AUTH_CACHE={**LOCAL_ONLY, "CACHE_ALIAS": "shared"})
+    def test_shared_cache(self):
+        """Test a shared cache or none at all passes"""
+
+        self.assertEqual(check_token_cache(None), [])
+        with override_settings(TOKEN_AUTH_CACHE=LOCAL_ONLY):
+            self.assertEqual(check_token_cache(None), [])
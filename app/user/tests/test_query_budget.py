@@ -0,0 +1,76 @@
+"""Tests for SQL query budgets of the user API"""
+
+from itertools import count
+
+from core.tests.query_budget import QueryBudgetMixin
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+CREATE_USER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token")
+ME_URL = reverse("user:me")
+
+
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test user endpoints don't scale queries with the number of users"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.sequence = count()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com", password="testpassword", name="Test Name"
+        )
+
+    def seed(self, size):
+        """Create ``size`` other users with tokens"""
+
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{next(self.sequence)}@example.com")
+            for _ in range(size)
+        )
+        emails = [user.email for user in users]
+        Token.objects.bulk_create(
+            Token(key=Token.generate_key(), user=user)
+            for user in get_user_model().objects.filter(email__in=emails)
+        )
+
+    def authenticate(self):
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_create_user(self):
+        """Test signing up checks the email and inserts the user and its stats"""
+
+        def request():
+            payload = {
+                "email": f"new{next(self.sequence)}@example.com",
+                "password": "testpassword",
+            }
+            return self.client.post(CREATE_USER_URL, payload)
+
+        self.assertQueryBudgetHolds(3, self.seed, request)
+
+    def test_create_token(self):
+        """Test obtaining a token authenticates and gets or creates the token"""
+
+        payload = {"email": self.user.email, "password": "testpassword"}
+        self.assertQueryBudgetHolds(
+            5, self.seed, lambda: self.client.post(TOKEN_URL, payload)
+        )
+
+    def test_retrieve_me(self):
+        """Test the me endpoint costs a single auth query"""
+
+        self.authenticate()
+        self.assertQueryBudgetHolds(1, self.seed, lambda: self.client.get(ME_URL))
+
+    def test_update_me(self):
+        """Test updating the me endpoint has a fixed query cost"""
+
+        self.authenticate()
+        self.assertQueryBudgetHolds(
+            2, self.seed, lambda: self.client.patch(ME_URL, {"name": "new name"})
+        )
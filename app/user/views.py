@@ -1,6 +1,8 @@
-from rest_framework import authentication, generics, permissions
+from core.db.replicas import ReplicaReadsMixin
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
 from user.serializers import CreateTokenSerializer, UserSerializer
 
 
@@ -13,9 +15,9 @@ class AuthTokenView(ObtainAuthToken):
     renderer_class = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class MangeUserView(generics.RetrieveUpdateAPIView):
+class MangeUserView(ReplicaReadsMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):